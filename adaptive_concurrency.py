@@ -0,0 +1,117 @@
+"""
+Adaptive Concurrency - Per-provider in-flight request window, tuned by AIMD
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Dict
+from hedging import LatencyTracker
+from config import settings
+
+# Statuses that mean the provider is throttling or overloaded
+THROTTLE_STATUS_CODES = {429, 503, 529}
+
+
+class AdaptiveConcurrency:
+    """
+    How many requests a provider gets at once, shared by every translation
+    that uses it.
+    
+    Additive increase, multiplicative decrease: while the window is in full
+    use and requests come back healthy it grows by AIMD_INCREASE per window
+    of requests; a throttling error or a latency spike (AIMD_LATENCY_FACTOR
+    times the median) shrinks it by AIMD_DECREASE. Requests that were already
+    in flight when the window shrank don't shrink it again, so one burst of
+    429s counts as one congestion signal.
+    """
+    
+    _controllers: Dict[str, "AdaptiveConcurrency"] = {}
+    
+    def __init__(self, provider_name: str):
+        self.provider_name = provider_name
+        self.window = float(settings.AIMD_INITIAL_WINDOW)
+        self.in_flight = 0
+        self.last_decrease = 0.0
+        self.increases = 0
+        self.decreases = 0
+        self.latency = LatencyTracker.for_provider(provider_name)
+        self._waiters = deque()
+    
+    @classmethod
+    def for_provider(cls, provider_name: str) -> "AdaptiveConcurrency":
+        controller = cls._controllers.get(provider_name)
+        if controller is None:
+            controller = cls._controllers[provider_name] = cls(provider_name)
+        return controller
+    
+    @classmethod
+    def all_status(cls) -> Dict[str, dict]:
+        return {name: controller.status() for name, controller in cls._controllers.items()}
+    
+    @property
+    def limit(self) -> int:
+        return int(self.window)
+    
+    async def acquire(self) -> float:
+        """Wait for a free slot; returns the start time to pass to release()"""
+        while self.in_flight >= self.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # A wake-up this waiter can no longer use goes to the next one
+                self._waiters.remove(waiter)
+                self._wake()
+                raise
+            self._waiters.remove(waiter)
+        
+        self.in_flight += 1
+        return time.monotonic()
+    
+    def release(self, started: float, succeeded: bool = False, throttled: bool = False):
+        """
+        Free a slot and adjust the window: throttled for 429/overload errors,
+        succeeded for answers (checked for latency spikes). Anything else,
+        e.g. a cancelled request, leaves the window as it is.
+        """
+        duration = time.monotonic() - started
+        saturated = self.in_flight >= self.limit
+        self.in_flight -= 1
+        
+        if throttled:
+            self._decrease(started, "throttled")
+        elif succeeded:
+            median = self.latency.percentile(50)
+            if median is not None and duration > median * settings.AIMD_LATENCY_FACTOR:
+                self._decrease(started, f"{duration:.1f}s vs {median:.1f}s median")
+            elif saturated and self.window < settings.AIMD_MAX_WINDOW:
+                # About +AIMD_INCREASE once a whole window of requests succeeded
+                self.window = min(self.window + settings.AIMD_INCREASE / self.window, settings.AIMD_MAX_WINDOW)
+                self.increases += 1
+        
+        self._wake()
+    
+    def _decrease(self, started: float, reason: str):
+        if started < self.last_decrease:
+            return
+        self.window = max(self.window * settings.AIMD_DECREASE, settings.AIMD_MIN_WINDOW)
+        self.last_decrease = time.monotonic()
+        self.decreases += 1
+        print(f"📉 {self.provider_name} concurrency down to {self.limit} ({reason})")
+    
+    def _wake(self):
+        free = self.limit - self.in_flight
+        for waiter in list(self._waiters)[:max(free, 0)]:
+            if not waiter.done():
+                waiter.set_result(None)
+    
+    def status(self) -> dict:
+        return {
+            'window': round(self.window, 2),
+            'limit': self.limit,
+            'in_flight': self.in_flight,
+            'waiting': len(self._waiters),
+            'increases': self.increases,
+            'decreases': self.decreases
+        }
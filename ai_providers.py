@@ -1,27 +1,188 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable
+import asyncio
+import time
 import openai
+import anthropic
+import groq
 import google.generativeai as genai
-from anthropic import Anthropic
-from groq import Groq
+from anthropic import AsyncAnthropic
+from groq import AsyncGroq
 import httpx
 from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 import deepl
+from rate_limiter import ProviderRateLimiter
+from hedging import LatencyTracker
+from adaptive_concurrency import AdaptiveConcurrency, THROTTLE_STATUS_CODES
+
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+
+# Timeouts and dropped connections raised by the SDKs and HTTP clients
+TRANSIENT_ERRORS = (
+    httpx.TimeoutException,
+    httpx.TransportError,
+    openai.APIConnectionError,
+    anthropic.APIConnectionError,
+    groq.APIConnectionError,
+    deepl.exceptions.ConnectionException,
+    TimeoutError,
+    ConnectionError
+)
+
+
+class ProviderError(Exception):
+    """A failed provider request, classified for the retry policy"""
+    
+    def __init__(self, message: str, retryable: bool = False, retry_after: float = None,
+                 status_code: int = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+        self.status_code = status_code
+    
+    @classmethod
+    def wrap(cls, prefix: str, error: Exception) -> "ProviderError":
+        """Wrap an SDK/HTTP error as "<prefix>: <error>", recording whether it is worth retrying"""
+        status_code = cls._status_code(error)
+        
+        if getattr(error, 'code', None) == 'insufficient_quota':
+            # OpenAI answers an exhausted balance with a 429 too
+            retryable = False
+        elif isinstance(error, deepl.DeepLException) and error.should_retry:
+            retryable = True
+        else:
+            retryable = isinstance(error, TRANSIENT_ERRORS) or status_code in RETRYABLE_STATUS_CODES
+        
+        return cls(f"{prefix}: {str(error)}", retryable=retryable,
+                   retry_after=cls._retry_after(error), status_code=status_code)
+    
+    @staticmethod
+    def _status_code(error: Exception) -> Optional[int]:
+        response = getattr(error, 'response', None)
+        for value in (getattr(error, 'status_code', None), getattr(error, 'http_status_code', None),
+                      getattr(response, 'status_code', None), getattr(error, 'code', None)):
+            if isinstance(value, int) and not isinstance(value, bool) and 100 <= value < 600:
+                return value
+        return None
+    
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        """Seconds from the response's Retry-After (or OpenAI's retry-after-ms) header"""
+        headers = getattr(getattr(error, 'response', None), 'headers', None)
+        if not headers:
+            return None
+        
+        try:
+            if headers.get('retry-after-ms'):
+                return max(float(headers['retry-after-ms']) / 1000, 0.0)
+            
+            value = headers.get('retry-after')
+            if not value:
+                return None
+            try:
+                return max(float(value), 0.0)
+            except ValueError:
+                # HTTP-date form
+                retry_at = parsedate_to_datetime(value)
+                return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+        except (TypeError, ValueError):
+            return None
 
 
 class AIProvider(ABC):
     """Base class for AI providers"""
     
+    # False for machine translation APIs that receive the bare text, not a prompt
+    uses_prompt = True
+    
+    # Conservative characters per token for reserving rate limit budget before a request
+    RESERVE_CHARS_PER_TOKEN = 3.0
+    
     def __init__(self, api_key: str, model: str = None, **kwargs):
         self.api_key = api_key
         self.model = model
         self.config = kwargs
+        self.rate_limiter: Optional[ProviderRateLimiter] = None
+        self.latency: Optional[LatencyTracker] = None
+        self.concurrency: Optional[AdaptiveConcurrency] = None
     
     @abstractmethod
     async def translate(self, text: str, source_lang: str, target_lang: str, 
                        glossary: Dict[str, str] = None, context: str = None, extract_terms: bool = False) -> Dict:
-        """Translate text using the AI provider"""
+        """Translate text; the result carries translation, terms and provider-reported usage (or None)"""
         pass
     
+    async def limited_translate(self, text: str, source_lang: str, target_lang: str,
+                                glossary: Dict[str, str] = None, context: str = None,
+                                extract_terms: bool = False, on_admitted: Callable[[], None] = None) -> Dict:
+        """
+        translate() within the provider's RPM/TPM budget, when one is configured.
+        on_admitted is called once the request is actually sent, after any wait
+        for quota or a concurrency slot.
+        """
+        args = (text, source_lang, target_lang, glossary, context, extract_terms)
+        if self.rate_limiter is None:
+            return await self._timed_translate(*args, on_admitted=on_admitted)
+        
+        # Prompt plus an expected output a little longer than the text, capped at max_tokens
+        prompt_chars = len(text)
+        if self.uses_prompt:
+            prompt_chars = len(self._build_translation_prompt(
+                text, source_lang, target_lang, glossary, context, extract_terms
+            ))
+        expected_output = min(int(len(text) * 1.2 / self.RESERVE_CHARS_PER_TOKEN),
+                              self.config.get('max_tokens') or 4000)
+        reserved = await self.rate_limiter.acquire(
+            int(prompt_chars / self.RESERVE_CHARS_PER_TOKEN) + expected_output
+        )
+        
+        try:
+            result = await self._timed_translate(*args, on_admitted=on_admitted)
+        except ProviderError as e:
+            if e.status_code == 429:
+                # Rejected requests use no tokens, and everyone sharing the quota should back off
+                self.rate_limiter.reconcile(reserved, 0)
+                if e.retry_after:
+                    self.rate_limiter.pause(e.retry_after)
+            raise
+        
+        usage = result.get('usage') if isinstance(result, dict) else None
+        if usage:
+            self.rate_limiter.reconcile(reserved, usage['input_tokens'] + usage['output_tokens'])
+        
+        return result
+    
+    async def _timed_translate(self, *args, on_admitted: Callable[[], None] = None) -> Dict:
+        """
+        translate() in one of the provider's adaptive concurrency slots,
+        recording the latency of successful requests for hedging
+        """
+        if self.concurrency is None:
+            started = time.monotonic()
+            if on_admitted:
+                on_admitted()
+            result = await self.translate(*args)
+        else:
+            started = await self.concurrency.acquire()
+            try:
+                if on_admitted:
+                    on_admitted()
+                result = await self.translate(*args)
+            except ProviderError as e:
+                self.concurrency.release(started, throttled=e.status_code in THROTTLE_STATUS_CODES)
+                raise
+            except BaseException:
+                self.concurrency.release(started)
+                raise
+            self.concurrency.release(started, succeeded=True)
+        
+        if self.latency is not None:
+            self.latency.record(time.monotonic() - started)
+        return result
+    
     def _parse_translation_with_terms(self, result: str) -> Dict:
         """Parse translation and extract terms from AI response"""
         import json
@@ -58,7 +219,25 @@ class AIProvider(ABC):
             "terms": terms
         }
     
-    def _build_translation_prompt(self, text: str, source_lang: str, 
+    def _with_usage(self, result: str, extract_terms: bool, input_tokens: Optional[int],
+                    output_tokens: Optional[int]) -> Dict:
+        """
+        Build the translate() result, including the token usage the provider
+        reported for this request (usage is None when it reported none)
+        """
+        translation = self._parse_translation_with_terms(result) if extract_terms else {"translation": result, "terms": {}}
+        
+        translation["usage"] = None
+        if input_tokens is not None and output_tokens is not None:
+            translation["usage"] = {
+                "input_tokens": int(input_tokens),
+                "output_tokens": int(output_tokens)
+            }
+        
+        return translation
+    
+    @staticmethod
+    def _build_translation_prompt(text: str, source_lang: str, 
                                   target_lang: str, glossary: Dict[str, str] = None,
                                   context: str = None, extract_terms: bool = False) -> str:
         """Build a comprehensive translation prompt"""
@@ -116,14 +295,14 @@ class OpenAIProvider(AIProvider):
     
     def __init__(self, api_key: str, model: str = "gpt-4-turbo-preview", **kwargs):
         super().__init__(api_key, model, **kwargs)
-        self.client = openai.OpenAI(api_key=api_key)
+        self.client = openai.AsyncOpenAI(api_key=api_key, max_retries=0)
     
     async def translate(self, text: str, source_lang: str, target_lang: str,
                        glossary: Dict[str, str] = None, context: str = None, extract_terms: bool = False) -> Dict:
         prompt = self._build_translation_prompt(text, source_lang, target_lang, glossary, context, extract_terms)
         
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "You are a professional novel translator."},
@@ -133,12 +312,13 @@ class OpenAIProvider(AIProvider):
                 max_tokens=self.config.get('max_tokens', 4000)
             )
             result = response.choices[0].message.content.strip()
+            usage = getattr(response, 'usage', None)
             
-            if extract_terms:
-                return self._parse_translation_with_terms(result)
-            return {"translation": result, "terms": {}}
+            return self._with_usage(result, extract_terms,
+                                    getattr(usage, 'prompt_tokens', None),
+                                    getattr(usage, 'completion_tokens', None))
         except Exception as e:
-            raise Exception(f"OpenAI translation error: {str(e)}")
+            raise ProviderError.wrap("OpenAI translation error", e) from e
 
 
 class GeminiProvider(AIProvider):
@@ -154,7 +334,7 @@ class GeminiProvider(AIProvider):
         prompt = self._build_translation_prompt(text, source_lang, target_lang, glossary, context, extract_terms)
         
         try:
-            response = self.client.generate_content(
+            response = await self.client.generate_content_async(
                 prompt,
                 generation_config={
                     'temperature': self.config.get('temperature', 0.7),
@@ -162,12 +342,13 @@ class GeminiProvider(AIProvider):
                 }
             )
             result = response.text.strip()
+            usage = getattr(response, 'usage_metadata', None)
             
-            if extract_terms:
-                return self._parse_translation_with_terms(result)
-            return {"translation": result, "terms": {}}
+            return self._with_usage(result, extract_terms,
+                                    getattr(usage, 'prompt_token_count', None),
+                                    getattr(usage, 'candidates_token_count', None))
         except Exception as e:
-            raise Exception(f"Gemini translation error: {str(e)}")
+            raise ProviderError.wrap("Gemini translation error", e) from e
 
 
 class ClaudeProvider(AIProvider):
@@ -175,14 +356,14 @@ class ClaudeProvider(AIProvider):
     
     def __init__(self, api_key: str, model: str = "claude-3-sonnet-20240229", **kwargs):
         super().__init__(api_key, model, **kwargs)
-        self.client = Anthropic(api_key=api_key)
+        self.client = AsyncAnthropic(api_key=api_key, max_retries=0)
     
     async def translate(self, text: str, source_lang: str, target_lang: str,
                        glossary: Dict[str, str] = None, context: str = None, extract_terms: bool = False) -> Dict:
         prompt = self._build_translation_prompt(text, source_lang, target_lang, glossary, context, extract_terms)
         
         try:
-            response = self.client.messages.create(
+            response = await self.client.messages.create(
                 model=self.model,
                 max_tokens=self.config.get('max_tokens', 4000),
                 temperature=self.config.get('temperature', 0.7),
@@ -191,12 +372,13 @@ class ClaudeProvider(AIProvider):
                 ]
             )
             result = response.content[0].text.strip()
+            usage = getattr(response, 'usage', None)
             
-            if extract_terms:
-                return self._parse_translation_with_terms(result)
-            return {"translation": result, "terms": {}}
+            return self._with_usage(result, extract_terms,
+                                    getattr(usage, 'input_tokens', None),
+                                    getattr(usage, 'output_tokens', None))
         except Exception as e:
-            raise Exception(f"Claude translation error: {str(e)}")
+            raise ProviderError.wrap("Claude translation error", e) from e
 
 
 class GroqProvider(AIProvider):
@@ -204,14 +386,14 @@ class GroqProvider(AIProvider):
     
     def __init__(self, api_key: str, model: str = "mixtral-8x7b-32768", **kwargs):
         super().__init__(api_key, model, **kwargs)
-        self.client = Groq(api_key=api_key)
+        self.client = AsyncGroq(api_key=api_key, max_retries=0)
     
     async def translate(self, text: str, source_lang: str, target_lang: str,
                        glossary: Dict[str, str] = None, context: str = None, extract_terms: bool = False) -> Dict:
         prompt = self._build_translation_prompt(text, source_lang, target_lang, glossary, context, extract_terms)
         
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "You are a professional novel translator."},
@@ -221,12 +403,13 @@ class GroqProvider(AIProvider):
                 max_tokens=self.config.get('max_tokens', 4000)
             )
             result = response.choices[0].message.content.strip()
+            usage = getattr(response, 'usage', None)
             
-            if extract_terms:
-                return self._parse_translation_with_terms(result)
-            return {"translation": result, "terms": {}}
+            return self._with_usage(result, extract_terms,
+                                    getattr(usage, 'prompt_tokens', None),
+                                    getattr(usage, 'completion_tokens', None))
         except Exception as e:
-            raise Exception(f"Groq translation error: {str(e)}")
+            raise ProviderError.wrap("Groq translation error", e) from e
 
 
 class DeepSeekProvider(AIProvider):
@@ -263,12 +446,13 @@ class DeepSeekProvider(AIProvider):
                 response.raise_for_status()
                 result_json = response.json()
                 result = result_json['choices'][0]['message']['content'].strip()
+                usage = result_json.get('usage') or {}
                 
-                if extract_terms:
-                    return self._parse_translation_with_terms(result)
-                return {"translation": result, "terms": {}}
+                return self._with_usage(result, extract_terms,
+                                        usage.get('prompt_tokens'),
+                                        usage.get('completion_tokens'))
         except Exception as e:
-            raise Exception(f"DeepSeek translation error: {str(e)}")
+            raise ProviderError.wrap("DeepSeek translation error", e) from e
 
 
 class PerplexityProvider(AIProvider):
@@ -305,17 +489,20 @@ class PerplexityProvider(AIProvider):
                 response.raise_for_status()
                 result_json = response.json()
                 result = result_json['choices'][0]['message']['content'].strip()
+                usage = result_json.get('usage') or {}
                 
-                if extract_terms:
-                    return self._parse_translation_with_terms(result)
-                return {"translation": result, "terms": {}}
+                return self._with_usage(result, extract_terms,
+                                        usage.get('prompt_tokens'),
+                                        usage.get('completion_tokens'))
         except Exception as e:
-            raise Exception(f"Perplexity translation error: {str(e)}")
+            raise ProviderError.wrap("Perplexity translation error", e) from e
 
 
 class DeepLProvider(AIProvider):
     """DeepL Professional Translation Provider"""
     
+    uses_prompt = False
+    
     def __init__(self, api_key: str, model: str = None, **kwargs):
         super().__init__(api_key, model, **kwargs)
         self.translator = deepl.Translator(api_key)
@@ -344,8 +531,9 @@ class DeepLProvider(AIProvider):
             source = lang_map.get(source_lang, source_lang.upper())
             target = lang_map.get(target_lang, target_lang.upper())
             
-            # DeepL translation
-            result = self.translator.translate_text(
+            # DeepL translation (the SDK is blocking - keep it off the event loop)
+            result = await asyncio.to_thread(
+                self.translator.translate_text,
                 text,
                 source_lang=source if source != 'AUTO' else None,
                 target_lang=target,
@@ -381,16 +569,19 @@ class DeepLProvider(AIProvider):
             
             return {
                 "translation": translated_text,
-                "terms": extracted_terms
+                "terms": extracted_terms,
+                "usage": None
             }
             
         except Exception as e:
-            raise Exception(f"DeepL translation error: {str(e)}")
+            raise ProviderError.wrap("DeepL translation error", e) from e
 
 
 class GoogleCloudTranslateProvider(AIProvider):
     """Google Cloud Translation API Provider"""
     
+    uses_prompt = False
+    
     def __init__(self, api_key: str, model: str = None, **kwargs):
         super().__init__(api_key, model, **kwargs)
         self.api_key = api_key
@@ -427,16 +618,19 @@ class GoogleCloudTranslateProvider(AIProvider):
                 
                 return {
                     "translation": translated_text,
-                    "terms": {}
+                    "terms": {},
+                    "usage": None
                 }
                 
         except Exception as e:
-            raise Exception(f"Google Cloud Translate error: {str(e)}")
+            raise ProviderError.wrap("Google Cloud Translate error", e) from e
 
 
 class MicrosoftTranslatorProvider(AIProvider):
     """Microsoft Azure Translator Provider"""
     
+    uses_prompt = False
+    
     def __init__(self, api_key: str, model: str = None, **kwargs):
         super().__init__(api_key, model, **kwargs)
         self.api_key = api_key
@@ -478,16 +672,19 @@ class MicrosoftTranslatorProvider(AIProvider):
                 
                 return {
                     "translation": translated_text,
-                    "terms": {}
+                    "terms": {},
+                    "usage": None
                 }
                 
         except Exception as e:
-            raise Exception(f"Microsoft Translator error: {str(e)}")
+            raise ProviderError.wrap("Microsoft Translator error", e) from e
 
 
 class LibreTranslateProvider(AIProvider):
     """LibreTranslate - Open Source Translation Provider"""
     
+    uses_prompt = False
+    
     def __init__(self, api_key: str = None, model: str = None, **kwargs):
         super().__init__(api_key or "", model, **kwargs)
         self.base_url = kwargs.get('base_url', 'https://libretranslate.com')
@@ -528,16 +725,19 @@ class LibreTranslateProvider(AIProvider):
                 
                 return {
                     "translation": translated_text,
-                    "terms": {}
+                    "terms": {},
+                    "usage": None
                 }
                 
         except Exception as e:
-            raise Exception(f"LibreTranslate error: {str(e)}")
+            raise ProviderError.wrap("LibreTranslate error", e) from e
 
 
 class MyMemoryProvider(AIProvider):
     """MyMemory Translation - World's Largest Translation Memory"""
     
+    uses_prompt = False
+    
     def __init__(self, api_key: str = None, model: str = None, **kwargs):
         super().__init__(api_key or "", model, **kwargs)
         self.base_url = "https://api.mymemory.translated.net"
@@ -579,16 +779,19 @@ class MyMemoryProvider(AIProvider):
                 
                 return {
                     "translation": translated_text,
-                    "terms": {}
+                    "terms": {},
+                    "usage": None
                 }
                 
         except Exception as e:
-            raise Exception(f"MyMemory translation error: {str(e)}")
+            raise ProviderError.wrap("MyMemory translation error", e) from e
 
 
 class YandexTranslateProvider(AIProvider):
     """Yandex Translate Provider"""
     
+    uses_prompt = False
+    
     def __init__(self, api_key: str, model: str = None, **kwargs):
         super().__init__(api_key, model, **kwargs)
         self.api_key = api_key
@@ -629,11 +832,12 @@ class YandexTranslateProvider(AIProvider):
                 
                 return {
                     "translation": translated_text,
-                    "terms": {}
+                    "terms": {},
+                    "usage": None
                 }
                 
         except Exception as e:
-            raise Exception(f"Yandex Translate error: {str(e)}")
+            raise ProviderError.wrap("Yandex Translate error", e) from e
 
 
 # Provider Factory
@@ -658,15 +862,19 @@ class AIProviderFactory:
     
     @classmethod
     def create_provider(cls, provider_name: str, api_key: str, 
-                       model: str = None, **kwargs) -> AIProvider:
-        """Create an AI provider instance"""
+                       model: str = None, rate_limits: dict = None, **kwargs) -> AIProvider:
+        """Create an AI provider instance (rate_limits: rpm/tpm from APIConfig.extra_config)"""
         provider_name = provider_name.lower()
         
         if provider_name not in cls.PROVIDERS:
             raise ValueError(f"Unknown provider: {provider_name}. Available: {list(cls.PROVIDERS.keys())}")
         
         provider_class = cls.PROVIDERS[provider_name]
-        return provider_class(api_key=api_key, model=model, **kwargs)
+        provider = provider_class(api_key=api_key, model=model, **kwargs)
+        provider.rate_limiter = ProviderRateLimiter.for_provider(provider_name, rate_limits)
+        provider.latency = LatencyTracker.for_provider(provider_name)
+        provider.concurrency = AdaptiveConcurrency.for_provider(provider_name)
+        return provider
     
     @classmethod
     def get_available_providers(cls):
@@ -2,21 +2,104 @@
 Backup Service - Automatic and manual project backups
 """
 import os
+import io
+import gzip
+import hashlib
 import json
+import itertools
+import threading
+import time
 import zipfile
 from datetime import datetime
+from typing import Iterable, Iterator, Tuple
+import schedule
+from sqlalchemy import func, case, insert
 from sqlalchemy.orm import Session
-from database import Project, Chapter, GlossaryEntry, ProjectBackup
+from database import SessionLocal, Project, Chapter, GlossaryEntry, ProjectBackup, BackupSchedule
+from config import settings
+
+
+class Throttle:
+    """Caps the write rate of a backup by sleeping once it runs ahead of the budget"""
+    
+    def __init__(self, mb_per_sec: float):
+        self.bytes_per_sec = mb_per_sec * 1024 * 1024
+        self.started = time.monotonic()
+        self.written = 0
+    
+    def consume(self, nbytes: int):
+        self.written += nbytes
+        ahead = self.written / self.bytes_per_sec - (time.monotonic() - self.started)
+        if ahead > 0:
+            time.sleep(ahead)
+
+
+class ThrottledFile(io.RawIOBase):
+    """Seekable file wrapper for zipfile that writes through a Throttle"""
+    
+    def __init__(self, path: str, throttle: Throttle):
+        super().__init__()
+        self.file = open(path, 'wb')
+        self.throttle = throttle
+    
+    def writable(self):
+        return True
+    
+    def seekable(self):
+        return True
+    
+    def write(self, data) -> int:
+        written = self.file.write(data)
+        self.throttle.consume(written)
+        return written
+    
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self.file.seek(offset, whence)
+    
+    def tell(self):
+        return self.file.tell()
+    
+    def flush(self):
+        self.file.flush()
+    
+    def close(self):
+        # RawIOBase.close() flushes, so the wrapped file must still be open
+        super().close()
+        self.file.close()
 
 
 class BackupService:
-    """Service for creating and managing project backups"""
+    """
+    Service for creating and managing project backups.
+    
+    Backups (format 2.0) hold project.json plus one NDJSON entry per record
+    type (chapters.ndjson, glossary.ndjson), written and read line by line so
+    memory use does not grow with the project. Older backups with a single
+    project_data.json can still be restored.
+    
+    Incremental backups store every chapter record and glossary block once,
+    as a gzipped blob named by its SHA-256 (backups/blobs/), and write a
+    manifest (backups/manifests/<project_id>/) listing only what changed
+    since the previous manifest.
+    """
     
-    def __init__(self, db: Session):
+    FORMAT_VERSION = '2.0'
+    INCREMENTAL_VERSION = 'incremental-1'
+    BATCH_SIZE = 50
+    GLOSSARY_BLOCK_SIZE = 1000
+    # A manifest chain is restarted with a full manifest after this many deltas
+    INCREMENTAL_CHAIN_MAX = 50
+    # Unreferenced blobs younger than this may belong to a backup still being written
+    GC_GRACE_SECONDS = 3600
+    
+    def __init__(self, db: Session, throttle_mb_per_sec: float = None):
         self.db = db
+        self.throttle = Throttle(throttle_mb_per_sec) if throttle_mb_per_sec else None
         self.backup_dir = "backups"
         if not os.path.exists(self.backup_dir):
             os.makedirs(self.backup_dir)
+        self.blob_dir = os.path.join(self.backup_dir, "blobs")
+        self.manifest_dir = os.path.join(self.backup_dir, "manifests")
     
     def create_backup(self, project_id: int, backup_type: str = "manual") -> str:
         """Create a backup of a project"""
@@ -26,23 +109,29 @@ class BackupService:
         if not project:
             raise ValueError("Project not found")
         
-        # Create backup filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        # Create backup filename (microseconds, so back-to-back auto backups don't collide)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
         safe_name = "".join(c for c in project.name if c.isalnum() or c in (' ', '-', '_')).rstrip()
         filename = f"{safe_name}_{timestamp}.zip"
         filepath = os.path.join(self.backup_dir, filename)
+        change_counter = self._change_counter(project_id)
         
-        # Create backup data
-        backup_data = self._export_project_data(project_id)
-        
-        # Create ZIP file
-        with zipfile.ZipFile(filepath, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # Add project data as JSON
-            zipf.writestr('project_data.json', json.dumps(backup_data, ensure_ascii=False, indent=2))
+        # Create ZIP file, streaming records straight into their entries
+        target = ThrottledFile(filepath, self.throttle) if self.throttle else filepath
+        with zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            zipf.writestr('project.json', json.dumps(self._project_record(project), ensure_ascii=False))
+            
+            with zipf.open('chapters.ndjson', 'w', force_zip64=True) as entry:
+                self._write_ndjson(entry, self._iter_chapter_records(project_id))
+            
+            with zipf.open('glossary.ndjson', 'w', force_zip64=True) as entry:
+                self._write_ndjson(entry, self._iter_glossary_records(project_id))
             
             # Add README
-            readme = self._generate_backup_readme(project, backup_data)
+            readme = self._generate_backup_readme(project, self._backup_statistics(project_id))
             zipf.writestr('README.txt', readme)
+        if self.throttle:
+            target.close()
         
         # Get file size
         file_size = os.path.getsize(filepath)
@@ -55,20 +144,128 @@ class BackupService:
             backup_type=backup_type
         )
         self.db.add(backup_record)
+        self._mark_backed_up(project_id, change_counter)
+        self.db.commit()
+        
+        return filepath
+    
+    def create_incremental_backup(self, project_id: int, backup_type: str = "incremental") -> str:
+        """Back up only the chapters and glossary blocks changed since the project's last manifest"""
+        
+        project = self.db.query(Project).filter(Project.id == project_id).first()
+        if not project:
+            raise ValueError("Project not found")
+        
+        project_dir = os.path.join(self.manifest_dir, str(project_id))
+        if not os.path.exists(project_dir):
+            os.makedirs(project_dir)
+        
+        change_counter = self._change_counter(project_id)
+        parent = self._latest_manifest(project_id)
+        if parent and parent['depth'] + 1 >= self.INCREMENTAL_CHAIN_MAX:
+            parent = None
+        previous = self._resolve_manifest(parent)['chapters'] if parent else {}
+        
+        written = 0
+        changed = {}
+        current = set()
+        for row in self._iter_chapter_rows(project_id):
+            key = str(row.id)
+            current.add(key)
+            
+            digest, size = self._write_blob(self._encode_record(self._chapter_record(row)))
+            written += size
+            if previous.get(key) != digest:
+                changed[key] = digest
+        
+        glossary = []
+        for block in self._iter_glossary_blocks(project_id):
+            digest, size = self._write_blob(block)
+            written += size
+            glossary.append(digest)
+        
+        manifest = {
+            'version': self.INCREMENTAL_VERSION,
+            'project_id': project_id,
+            'parent': parent['name'] if parent else None,
+            'depth': parent['depth'] + 1 if parent else 0,
+            'created_at': datetime.now().isoformat(),
+            'project': self._project_record(project),
+            'chapters': {
+                'changed': changed,
+                'removed': sorted(set(previous) - current)
+            },
+            'glossary': glossary,
+            'statistics': self._backup_statistics(project_id)
+        }
+        
+        filepath = os.path.join(project_dir, f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.json")
+        self._save_manifest(filepath, manifest)
+        written += os.path.getsize(filepath)
+        
+        # Save backup record (size = what this backup added to disk)
+        backup_record = ProjectBackup(
+            project_id=project_id,
+            backup_path=filepath,
+            backup_size=written,
+            backup_type=backup_type
+        )
+        self.db.add(backup_record)
+        self._mark_backed_up(project_id, change_counter)
         self.db.commit()
         
+        print(f"💾 Incremental backup: {len(changed)} chapters changed, {len(manifest['chapters']['removed'])} removed, {written} bytes written")
+        
         return filepath
     
     def restore_backup(self, backup_path: str) -> int:
-        """Restore a project from backup"""
+        """Restore a project from backup (ZIP archive or incremental manifest)"""
         
         if not os.path.exists(backup_path):
             raise ValueError("Backup file not found")
         
-        # Extract backup
+        if backup_path.endswith('.json'):
+            return self._restore_manifest(backup_path)
+        
         with zipfile.ZipFile(backup_path, 'r') as zipf:
-            # Read project data
-            project_data = json.loads(zipf.read('project_data.json').decode('utf-8'))
+            names = zipf.namelist()
+            
+            if 'project.json' in names:
+                project_data = json.loads(zipf.read('project.json').decode('utf-8'))
+                return self._restore_records(project_data, itertools.chain(
+                    (('chapters', record) for record in self._read_ndjson(zipf, 'chapters.ndjson', names)),
+                    (('glossary', record) for record in self._read_ndjson(zipf, 'glossary.ndjson', names))
+                ))
+            
+            # Format 1.0: everything in one JSON document, parsed record by record
+            if 'project_data.json' not in names:
+                raise ValueError("Invalid backup file")
+            with zipf.open('project_data.json') as entry:
+                events = self._iter_legacy_json(io.TextIOWrapper(entry, encoding='utf-8'))
+                
+                # Project fields precede the chapter and glossary arrays
+                project_data = {}
+                first = None
+                for section, key, value in events:
+                    if section != 'project':
+                        first = (section, value)
+                        break
+                    project_data[key] = value
+                
+                records = itertools.chain(
+                    [first] if first else [],
+                    ((section, value) for section, _, value in events if section != 'project')
+                )
+                return self._restore_records(project_data, records)
+    
+    def _restore_records(self, project_data: dict, records: Iterable[Tuple[str, dict]]) -> int:
+        """
+        Create the restored project from its project record and a stream of
+        ('chapters' | 'glossary', record) pairs.
+        
+        Records are bulk-inserted in batches inside one transaction, so a
+        failed restore leaves nothing behind.
+        """
         
         # Create project
         project = Project(
@@ -79,56 +276,62 @@ class BackupService:
             ai_provider=project_data['ai_provider'],
             ai_model=project_data.get('ai_model')
         )
-        self.db.add(project)
-        self.db.commit()
-        self.db.refresh(project)
-        
-        # Restore chapters
-        for chapter_data in project_data.get('chapters', []):
-            chapter = Chapter(
-                project_id=project.id,
-                chapter_number=chapter_data['chapter_number'],
-                title=chapter_data.get('title'),
-                original_text=chapter_data['original_text'],
-                translated_text=chapter_data.get('translated_text'),
-                status=chapter_data.get('status', 'pending')
-            )
-            self.db.add(chapter)
-        
-        # Restore glossary
-        for entry_data in project_data.get('glossary', []):
-            entry = GlossaryEntry(
-                project_id=project.id,
-                original_term=entry_data['original_term'],
-                translated_term=entry_data['translated_term'],
-                term_type=entry_data.get('term_type', 'general'),
-                context=entry_data.get('context'),
-                confirmed=entry_data.get('confirmed', True)
-            )
-            self.db.add(entry)
-        
-        self.db.commit()
+        try:
+            self.db.add(project)
+            self.db.flush()
+            
+            batches = {'chapters': [], 'glossary': []}
+            tables = {'chapters': Chapter, 'glossary': GlossaryEntry}
+            limits = {'chapters': self.BATCH_SIZE, 'glossary': self.GLOSSARY_BLOCK_SIZE}
+            
+            # Older backups may contain duplicate terms
+            seen_terms = set()
+            
+            for section, record in records:
+                if section == 'chapters':
+                    row = {
+                        'project_id': project.id,
+                        'chapter_number': record['chapter_number'],
+                        'title': record.get('title'),
+                        'original_text': record['original_text'],
+                        'translated_text': record.get('translated_text'),
+                        'status': record.get('status', 'pending')
+                    }
+                elif section == 'glossary':
+                    if record['original_term'] in seen_terms:
+                        continue
+                    seen_terms.add(record['original_term'])
+                    
+                    row = {
+                        'project_id': project.id,
+                        'original_term': record['original_term'],
+                        'translated_term': record['translated_term'],
+                        'term_type': record.get('term_type', 'general'),
+                        'context': record.get('context'),
+                        'confirmed': record.get('confirmed', True)
+                    }
+                else:
+                    continue
+                
+                batch = batches[section]
+                batch.append(row)
+                if len(batch) >= limits[section]:
+                    self.db.execute(insert(tables[section]), batch)
+                    batch.clear()
+            
+            for section, batch in batches.items():
+                if batch:
+                    self.db.execute(insert(tables[section]), batch)
+            
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
         
         return project.id
     
-    def _export_project_data(self, project_id: int) -> dict:
-        """Export all project data"""
-        
-        # Get project
-        project = self.db.query(Project).filter(Project.id == project_id).first()
-        
-        # Get chapters
-        chapters = self.db.query(Chapter).filter(
-            Chapter.project_id == project_id
-        ).order_by(Chapter.chapter_number).all()
-        
-        # Get glossary
-        glossary = self.db.query(GlossaryEntry).filter(
-            GlossaryEntry.project_id == project_id
-        ).all()
-        
-        # Build data structure
-        data = {
+    def _project_record(self, project: Project) -> dict:
+        return {
             'project_name': project.name,
             'name': project.name,
             'description': project.description,
@@ -138,38 +341,175 @@ class BackupService:
             'ai_model': project.ai_model,
             'created_at': project.created_at.isoformat(),
             'backup_created_at': datetime.now().isoformat(),
-            'version': '1.0',
-            'chapters': [
-                {
-                    'chapter_number': c.chapter_number,
-                    'title': c.title,
-                    'original_text': c.original_text,
-                    'translated_text': c.translated_text,
-                    'status': c.status
-                }
-                for c in chapters
-            ],
-            'glossary': [
-                {
-                    'original_term': g.original_term,
-                    'translated_term': g.translated_term,
-                    'term_type': g.term_type,
-                    'context': g.context,
-                    'confirmed': g.confirmed,
-                    'usage_count': g.usage_count
-                }
-                for g in glossary
-            ],
-            'statistics': {
-                'total_chapters': len(chapters),
-                'completed_chapters': sum(1 for c in chapters if c.status == 'completed'),
-                'glossary_terms': len(glossary)
-            }
+            'version': self.FORMAT_VERSION
+        }
+    
+    def _iter_chapter_rows(self, project_id: int):
+        return self.db.query(
+            Chapter.id,
+            Chapter.chapter_number,
+            Chapter.title,
+            Chapter.original_text,
+            Chapter.translated_text,
+            Chapter.status
+        ).filter(
+            Chapter.project_id == project_id
+        ).order_by(Chapter.chapter_number).yield_per(self.BATCH_SIZE)
+    
+    @staticmethod
+    def _chapter_record(row) -> dict:
+        return {
+            'chapter_number': row.chapter_number,
+            'title': row.title,
+            'original_text': row.original_text,
+            'translated_text': row.translated_text,
+            'status': row.status
+        }
+    
+    def _iter_chapter_records(self, project_id: int) -> Iterator[dict]:
+        for row in self._iter_chapter_rows(project_id):
+            yield self._chapter_record(row)
+    
+    def _iter_glossary_rows(self, project_id: int):
+        return self.db.query(
+            GlossaryEntry.id,
+            GlossaryEntry.original_term,
+            GlossaryEntry.translated_term,
+            GlossaryEntry.term_type,
+            GlossaryEntry.context,
+            GlossaryEntry.confirmed,
+            GlossaryEntry.usage_count
+        ).filter(
+            GlossaryEntry.project_id == project_id
+        ).order_by(GlossaryEntry.id).yield_per(self.GLOSSARY_BLOCK_SIZE)
+    
+    @staticmethod
+    def _glossary_record(row) -> dict:
+        return {
+            'original_term': row.original_term,
+            'translated_term': row.translated_term,
+            'term_type': row.term_type,
+            'context': row.context,
+            'confirmed': row.confirmed,
+            'usage_count': row.usage_count
         }
+    
+    def _iter_glossary_records(self, project_id: int) -> Iterator[dict]:
+        for row in self._iter_glossary_rows(project_id):
+            yield self._glossary_record(row)
+    
+    def _backup_statistics(self, project_id: int) -> dict:
+        total, completed = self.db.query(
+            func.count(Chapter.id),
+            func.count(case((Chapter.status == 'completed', 1)))
+        ).filter(Chapter.project_id == project_id).one()
         
-        return data
+        glossary_terms = self.db.query(func.count(GlossaryEntry.id)).filter(
+            GlossaryEntry.project_id == project_id
+        ).scalar()
+        
+        return {
+            'total_chapters': total,
+            'completed_chapters': completed,
+            'glossary_terms': glossary_terms
+        }
+    
+    @staticmethod
+    def _encode_record(record: dict) -> bytes:
+        return json.dumps(record, ensure_ascii=False).encode('utf-8')
+    
+    @classmethod
+    def _write_ndjson(cls, entry, records: Iterable[dict]):
+        """Write one compact JSON document per line"""
+        for record in records:
+            entry.write(cls._encode_record(record))
+            entry.write(b'\n')
     
-    def _generate_backup_readme(self, project, backup_data: dict) -> str:
+    @staticmethod
+    def _iter_legacy_json(stream, chunk_size: int = 1024 * 1024) -> Iterator[Tuple[str, str, object]]:
+        """
+        Walk a format 1.0 project_data.json without loading it whole.
+        
+        Yields ('project', key, value) for top-level fields and
+        ('chapters' | 'glossary', None, record) for each array element;
+        only one record (plus a read chunk) is held in memory at a time.
+        """
+        decoder = json.JSONDecoder()
+        buffer = ''
+        pos = 0
+        eof = False
+        
+        def fill() -> bool:
+            nonlocal buffer, pos, eof
+            if eof:
+                return False
+            data = stream.read(chunk_size)
+            if not data:
+                eof = True
+                return False
+            buffer = buffer[pos:] + data
+            pos = 0
+            return True
+        
+        def peek() -> str:
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos].isspace():
+                    pos += 1
+                if pos < len(buffer) or not fill():
+                    return buffer[pos:pos + 1]
+        
+        def expect(char: str):
+            nonlocal pos
+            if peek() != char:
+                raise ValueError("Invalid backup file")
+            pos += 1
+        
+        def value():
+            nonlocal pos
+            peek()
+            while True:
+                try:
+                    result, end = decoder.raw_decode(buffer, pos)
+                    # A number cut off at the end of the buffer would decode short
+                    if end < len(buffer) or eof:
+                        pos = end
+                        return result
+                except json.JSONDecodeError:
+                    if eof:
+                        raise ValueError("Invalid backup file")
+                if not fill():
+                    result, pos = decoder.raw_decode(buffer, pos)
+                    return result
+        
+        expect('{')
+        while peek() != '}':
+            key = value()
+            expect(':')
+            
+            if key in ('chapters', 'glossary') and peek() == '[':
+                expect('[')
+                while peek() != ']':
+                    yield key, None, value()
+                    if peek() == ',':
+                        expect(',')
+                expect(']')
+            else:
+                yield 'project', key, value()
+            
+            if peek() == ',':
+                expect(',')
+    
+    @staticmethod
+    def _read_ndjson(zipf: zipfile.ZipFile, name: str, names: list) -> Iterator[dict]:
+        if name not in names:
+            return
+        with zipf.open(name) as entry:
+            for line in io.TextIOWrapper(entry, encoding='utf-8'):
+                if line.strip():
+                    yield json.loads(line)
+    
+    def _generate_backup_readme(self, project, statistics: dict) -> str:
         """Generate README for backup"""
         
         readme = f"""
@@ -179,7 +519,7 @@ NOVEL TRANSLATOR - PROJECT BACKUP
 
 Project Name: {project.name}
 Backup Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-Version: 1.0
+Version: {self.FORMAT_VERSION}
 
 PROJECT INFORMATION:
 -------------------
@@ -189,13 +529,15 @@ AI Provider: {project.ai_provider}
 
 STATISTICS:
 ----------
-Total Chapters: {backup_data['statistics']['total_chapters']}
-Completed Chapters: {backup_data['statistics']['completed_chapters']}
-Glossary Terms: {backup_data['statistics']['glossary_terms']}
+Total Chapters: {statistics['total_chapters']}
+Completed Chapters: {statistics['completed_chapters']}
+Glossary Terms: {statistics['glossary_terms']}
 
 CONTENTS:
 --------
-- project_data.json: Complete project data (can be imported back)
+- project.json: Project settings
+- chapters.ndjson: Chapters, one JSON record per line
+- glossary.ndjson: Glossary terms, one JSON record per line
 
 RESTORE INSTRUCTIONS:
 --------------------
@@ -232,6 +574,15 @@ Generated by Novel Translator v1.0.0
             for b in backups
         ]
     
+    def restore_backup_record(self, backup_id: int) -> int:
+        """Restore a project from one of the stored backups"""
+        
+        backup = self.db.query(ProjectBackup).filter(ProjectBackup.id == backup_id).first()
+        if not backup:
+            raise ValueError("Backup not found")
+        
+        return self.restore_backup(backup.backup_path)
+    
     def delete_backup(self, backup_id: int):
         """Delete a backup"""
         
@@ -239,11 +590,375 @@ Generated by Novel Translator v1.0.0
         if not backup:
             raise ValueError("Backup not found")
         
-        # Delete file
-        if os.path.exists(backup.backup_path):
+        # Delete file (a manifest is folded into its successor first, keeping the chain intact)
+        if backup.backup_path.endswith('.json'):
+            self._drop_manifest(backup.backup_path)
+        elif os.path.exists(backup.backup_path):
             os.remove(backup.backup_path)
         
         # Delete record
         self.db.delete(backup)
         self.db.commit()
+    
+    def get_schedule(self, project_id: int) -> dict:
+        """Automatic backup settings and state of a project"""
+        backup_schedule = self.db.query(BackupSchedule).filter(BackupSchedule.project_id == project_id).first()
+        if not backup_schedule:
+            return {'project_id': project_id, 'enabled': False}
+        
+        return {
+            'project_id': project_id,
+            'enabled': backup_schedule.enabled,
+            'interval_hours': backup_schedule.interval_hours,
+            'keep': backup_schedule.keep,
+            'incremental': backup_schedule.incremental,
+            'dirty': backup_schedule.change_counter != backup_schedule.backed_up_counter,
+            'last_backup_at': backup_schedule.last_backup_at.isoformat() if backup_schedule.last_backup_at else None,
+            'last_error': backup_schedule.last_error
+        }
+    
+    def set_schedule(self, project_id: int, enabled: bool = True, interval_hours: float = None,
+                     keep: int = None, incremental: bool = None) -> dict:
+        """Create or update a project's automatic backup schedule"""
+        if not self.db.query(Project).filter(Project.id == project_id).first():
+            raise ValueError("Project not found")
+        if interval_hours is not None and interval_hours <= 0:
+            raise ValueError("interval_hours must be positive")
+        if keep is not None and keep < 1:
+            raise ValueError("keep must be at least 1")
+        
+        backup_schedule = self.db.query(BackupSchedule).filter(BackupSchedule.project_id == project_id).first()
+        if not backup_schedule:
+            # New schedules start dirty so the first run takes a backup
+            backup_schedule = BackupSchedule(project_id=project_id, change_counter=1, backed_up_counter=0)
+            self.db.add(backup_schedule)
+        
+        backup_schedule.enabled = enabled
+        if interval_hours is not None:
+            backup_schedule.interval_hours = interval_hours
+        if keep is not None:
+            backup_schedule.keep = keep
+        if incremental is not None:
+            backup_schedule.incremental = incremental
+        self.db.commit()
+        
+        return self.get_schedule(project_id)
+    
+    def run_due_backups(self) -> list:
+        """Back up every project whose schedule is due and that changed since its last backup"""
+        now = datetime.utcnow()
+        done = []
+        
+        for backup_schedule in self.db.query(BackupSchedule).filter(BackupSchedule.enabled == True).all():
+            project_id = backup_schedule.project_id
+            
+            if not self.db.query(Project.id).filter(Project.id == project_id).first():
+                self.db.delete(backup_schedule)
+                self.db.commit()
+                continue
+            
+            if backup_schedule.change_counter == backup_schedule.backed_up_counter:
+                continue
+            if backup_schedule.last_backup_at and \
+                    (now - backup_schedule.last_backup_at).total_seconds() < backup_schedule.interval_hours * 3600:
+                continue
+            
+            try:
+                if backup_schedule.incremental:
+                    self.create_incremental_backup(project_id, backup_type="auto")
+                else:
+                    self.create_backup(project_id, backup_type="auto")
+                self._rotate_auto_backups(project_id, backup_schedule.keep)
+                backup_schedule.last_error = None
+                done.append(project_id)
+            except Exception as e:
+                self.db.rollback()
+                backup_schedule.last_error = str(e)
+                # Retry after the next interval rather than on every check
+                backup_schedule.last_backup_at = now
+                print(f"❌ Auto backup of project {project_id} failed: {e}")
+            self.db.commit()
+        
+        return done
+    
+    def _rotate_auto_backups(self, project_id: int, keep: int):
+        """Keep only the newest `keep` automatic backups of a project"""
+        old_backups = self.db.query(ProjectBackup).filter(
+            ProjectBackup.project_id == project_id,
+            ProjectBackup.backup_type == "auto"
+        ).order_by(ProjectBackup.created_at.desc(), ProjectBackup.id.desc()).offset(keep).all()
+        
+        # Oldest first, so incremental manifests fold forward into the kept ones
+        for backup in reversed(old_backups):
+            self.delete_backup(backup.id)
+    
+    def _change_counter(self, project_id: int):
+        return self.db.query(BackupSchedule.change_counter).filter(
+            BackupSchedule.project_id == project_id
+        ).scalar()
+    
+    def _mark_backed_up(self, project_id: int, change_counter):
+        """Record that the project state up to change_counter is backed up"""
+        if change_counter is None:
+            return
+        self.db.query(BackupSchedule).filter(BackupSchedule.project_id == project_id).update({
+            'backed_up_counter': change_counter,
+            'last_backup_at': datetime.utcnow()
+        }, synchronize_session=False)
+    
+    def collect_garbage(self, keep_last: int = None) -> dict:
+        """
+        Compact incremental backups and delete blobs no manifest references.
+        
+        With keep_last, only the newest keep_last manifests of each project
+        are kept; the oldest kept one is rewritten as a full manifest.
+        """
+        
+        removed_manifests = 0
+        if keep_last is not None and os.path.exists(self.manifest_dir):
+            for project_dir in os.listdir(self.manifest_dir):
+                names = self._manifest_names(os.path.join(self.manifest_dir, project_dir))
+                for name in names[:max(len(names) - keep_last, 0)]:
+                    path = os.path.join(self.manifest_dir, project_dir, name)
+                    self._drop_manifest(path)
+                    self.db.query(ProjectBackup).filter(
+                        ProjectBackup.backup_path == path
+                    ).delete(synchronize_session=False)
+                    removed_manifests += 1
+            self.db.commit()
+        
+        referenced = set()
+        if os.path.exists(self.manifest_dir):
+            for project_dir in os.listdir(self.manifest_dir):
+                directory = os.path.join(self.manifest_dir, project_dir)
+                for name in self._manifest_names(directory):
+                    manifest = self._load_manifest(os.path.join(directory, name))
+                    referenced.update(manifest['chapters']['changed'].values())
+                    referenced.update(manifest['glossary'])
+        
+        removed_blobs = 0
+        freed = 0
+        cutoff = time.time() - self.GC_GRACE_SECONDS
+        if os.path.exists(self.blob_dir):
+            for dirpath, _, filenames in os.walk(self.blob_dir):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    digest = filename.split('.')[0]
+                    stat = os.stat(path)
+                    if digest in referenced or stat.st_mtime > cutoff:
+                        continue
+                    os.remove(path)
+                    removed_blobs += 1
+                    freed += stat.st_size
+        
+        print(f"🧹 Backup GC: {removed_manifests} manifests compacted, {removed_blobs} blobs removed ({freed} bytes)")
+        
+        return {
+            'manifests_removed': removed_manifests,
+            'blobs_removed': removed_blobs,
+            'bytes_freed': freed
+        }
+    
+    def _iter_glossary_blocks(self, project_id: int) -> Iterator[bytes]:
+        """Glossary as NDJSON blocks keyed on id ranges of GLOSSARY_BLOCK_SIZE.
+        
+        Block boundaries don't move when terms are added or deleted, so an
+        edit only rewrites the block holding that term.
+        """
+        rows = self._iter_glossary_rows(project_id)
+        for _, block in itertools.groupby(rows, key=lambda row: row.id // self.GLOSSARY_BLOCK_SIZE):
+            yield b''.join(self._encode_record(self._glossary_record(row)) + b'\n' for row in block)
+    
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, digest[:2], f"{digest}.gz")
+    
+    def _write_blob(self, data: bytes) -> tuple:
+        """Store data under its SHA-256 unless already present; returns (digest, bytes written)"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        
+        if os.path.exists(path):
+            # Refresh so a concurrent GC treats it as in use
+            os.utime(path)
+            return digest, 0
+        
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        compressed = gzip.compress(data)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(compressed)
+        os.replace(temp_path, path)
+        if self.throttle:
+            self.throttle.consume(len(compressed))
+        
+        return digest, os.path.getsize(path)
+    
+    def _read_blob(self, digest: str) -> bytes:
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            raise ValueError(f"Backup blob missing: {digest}")
+        with open(path, 'rb') as f:
+            return gzip.decompress(f.read())
+    
+    @staticmethod
+    def _manifest_names(directory: str) -> list:
+        if not os.path.exists(directory):
+            return []
+        return sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+    
+    def _load_manifest(self, path: str) -> dict:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        manifest['name'] = os.path.basename(path)
+        manifest['path'] = path
+        return manifest
+    
+    @staticmethod
+    def _save_manifest(path: str, manifest: dict):
+        data = {key: value for key, value in manifest.items() if key not in ('name', 'path')}
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+    
+    def _latest_manifest(self, project_id: int):
+        directory = os.path.join(self.manifest_dir, str(project_id))
+        names = self._manifest_names(directory)
+        return self._load_manifest(os.path.join(directory, names[-1])) if names else None
+    
+    def _resolve_manifest(self, manifest: dict) -> dict:
+        """Full chapter id -> blob map at a manifest's point in time, replayed from its chain"""
+        directory = os.path.dirname(manifest['path'])
+        chain = [manifest]
+        while chain[-1]['parent']:
+            parent_path = os.path.join(directory, chain[-1]['parent'])
+            if not os.path.exists(parent_path):
+                raise ValueError(f"Backup manifest chain broken at {chain[-1]['parent']}")
+            chain.append(self._load_manifest(parent_path))
+        
+        chapters = {}
+        for link in reversed(chain):
+            for key in link['chapters']['removed']:
+                chapters.pop(key, None)
+            chapters.update(link['chapters']['changed'])
+        
+        return {'chapters': chapters, 'glossary': manifest['glossary']}
+    
+    def _restore_manifest(self, path: str) -> int:
+        manifest = self._load_manifest(path)
+        state = self._resolve_manifest(manifest)
+        
+        def chapters():
+            for digest in state['chapters'].values():
+                yield json.loads(self._read_blob(digest))
+        
+        def glossary():
+            for digest in state['glossary']:
+                for line in self._read_blob(digest).splitlines():
+                    if line.strip():
+                        yield json.loads(line)
+        
+        return self._restore_records(manifest['project'], itertools.chain(
+            (('chapters', record) for record in chapters()),
+            (('glossary', record) for record in glossary())
+        ))
+    
+    def _drop_manifest(self, path: str):
+        """Delete a manifest, folding its changes into the manifests built on top of it"""
+        if not os.path.exists(path):
+            return
+        
+        directory = os.path.dirname(path)
+        manifests = {
+            name: self._load_manifest(os.path.join(directory, name))
+            for name in self._manifest_names(directory)
+        }
+        manifest = manifests.pop(os.path.basename(path))
+        rewrite = set()
+        
+        for child in manifests.values():
+            if child['parent'] != manifest['name']:
+                continue
+            
+            changed = {
+                key: digest for key, digest in manifest['chapters']['changed'].items()
+                if key not in child['chapters']['removed']
+            }
+            changed.update(child['chapters']['changed'])
+            removed = set(manifest['chapters']['removed']) | set(child['chapters']['removed'])
+            
+            child['parent'] = manifest['parent']
+            child['chapters'] = {
+                'changed': changed,
+                # A root manifest lists everything, so it needs no removals
+                'removed': sorted(removed - set(changed)) if manifest['parent'] else []
+            }
+            rewrite.add(child['name'])
+        
+        # Everything built on the dropped manifest moved one step closer to its root
+        # (names sort by creation time, so parents come first)
+        depths = {}
+        for name, other in manifests.items():
+            if not other['parent']:
+                depth = 0
+            elif other['parent'] in depths:
+                depth = depths[other['parent']] + 1
+            else:
+                depth = other['depth']
+            if depth != other['depth']:
+                other['depth'] = depth
+                rewrite.add(name)
+            depths[name] = depth
+        
+        for name in rewrite:
+            self._save_manifest(manifests[name]['path'], manifests[name])
+        
+        os.remove(path)
+
 
+class AutoBackupScheduler:
+    """Checks backup schedules every few minutes and runs due backups in a daemon thread"""
+    
+    _scheduler: schedule.Scheduler = None
+    _thread: threading.Thread = None
+    _stop: threading.Event = None
+    
+    @classmethod
+    def start(cls):
+        if cls._thread is not None:
+            return
+        
+        cls._scheduler = schedule.Scheduler()
+        cls._scheduler.every(settings.AUTO_BACKUP_CHECK_MINUTES).minutes.do(cls.run_once)
+        cls._stop = threading.Event()
+        
+        def run():
+            while not cls._stop.wait(30):
+                cls._scheduler.run_pending()
+        
+        cls._thread = threading.Thread(target=run, daemon=True)
+        cls._thread.start()
+    
+    @classmethod
+    def stop(cls):
+        if cls._thread is None:
+            return
+        cls._stop.set()
+        cls._thread.join(timeout=5)
+        cls._thread = None
+        cls._scheduler = None
+    
+    @staticmethod
+    def run_once() -> list:
+        db = SessionLocal()
+        try:
+            service = BackupService(db, throttle_mb_per_sec=settings.AUTO_BACKUP_THROTTLE_MB_PER_SEC)
+            done = service.run_due_backups()
+            if done:
+                print(f"💾 Auto backup: {len(done)} projects backed up")
+            return done
+        except Exception as e:
+            print(f"❌ Auto backup check failed: {e}")
+            return []
+        finally:
+            db.close()
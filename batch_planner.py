@@ -0,0 +1,253 @@
+"""
+Batch Planner - Pre-flight token, cost and duration estimates for batch translations
+"""
+from typing import Dict, List, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from database import Project, Chapter, APIConfig, CostTracking, TranslationCache
+from ai_providers import AIProviderFactory
+from translation_engine import TranslationEngine
+from config import settings
+
+
+class BatchPlanner:
+    """
+    Estimates what a batch translation will cost and how long it will take,
+    using the same chunking, prompt and glossary the translation engine uses
+    and the output ratios and throughput measured on earlier translations.
+    """
+    
+    # Chapters whose chunks are tokenized in one count_tokens_batch call
+    COUNT_BATCH = 64
+    # Recent translations used for measured ratios and throughput
+    HISTORY_LIMIT = 200
+    # Fewer project translations than this fall back to provider-wide history
+    MIN_PROJECT_HISTORY = 5
+    # CostTracker's fixed assumption when nothing has been measured yet
+    DEFAULT_OUTPUT_RATIO = 1.2
+    # translate_chapter passes at most this much of the previous chapter as context
+    CONTEXT_CHARS = 500
+    
+    def __init__(self, db: Session):
+        self.db = db
+        self.engine = TranslationEngine(db)
+        self.cost_tracker = self.engine.cost_tracker
+    
+    def plan(self, project_id: int, chapter_ids: List[int] = None, provider: str = None,
+             model: str = None, concurrency: int = 1, extract_terms: bool = True) -> Dict:
+        """
+        Plan translating chapter_ids (default: every chapter not yet completed)
+        with the given provider/model (default: the project's).
+        
+        concurrency is the number of chapters translated at the same time.
+        """
+        project = self.db.query(Project).filter(Project.id == project_id).first()
+        if not project:
+            raise ValueError("Project not found")
+        
+        if concurrency < 1:
+            raise ValueError("Concurrency must be at least 1")
+        
+        provider = (provider or project.ai_provider).lower()
+        if provider not in AIProviderFactory.PROVIDERS:
+            raise ValueError(f"Unknown provider: {provider}. Available: {AIProviderFactory.get_available_providers()}")
+        
+        if not model:
+            api_config = self.db.query(APIConfig).filter(APIConfig.provider_name == provider).first()
+            model = (api_config.model if api_config else None) or project.ai_model or ""
+        
+        query = self.db.query(Chapter.id, Chapter.chapter_number, Chapter.original_text).filter(
+            Chapter.project_id == project_id
+        )
+        if chapter_ids is not None:
+            found = self.db.query(func.count(Chapter.id)).filter(
+                Chapter.project_id == project_id,
+                Chapter.id.in_(chapter_ids)
+            ).scalar()
+            if found != len(set(chapter_ids)):
+                raise ValueError("Some chapters not found or don't belong to this project")
+            query = query.filter(Chapter.id.in_(chapter_ids))
+        else:
+            query = query.filter(Chapter.status != "completed")
+        
+        first_chapter_number = self.db.query(func.min(Chapter.chapter_number)).filter(
+            Chapter.project_id == project_id
+        ).scalar()
+        
+        overhead = self._prompt_overhead(project, provider, model, extract_terms)
+        cached_hashes = self._cached_hashes(project)
+        
+        output_ratio, ratio_source = self.output_ratio(project_id, provider)
+        seconds_per_token, throughput_samples = self.seconds_per_output_token(provider)
+        
+        totals = {
+            'chapters': 0,
+            'cached_chapters': 0,
+            'chunks': 0,
+            'text_tokens': 0,
+            'prompt_tokens': 0
+        }
+        longest_chapter_tokens = 0
+        pending: List[Tuple[bool, List[str]]] = []
+        
+        def count_pending():
+            nonlocal longest_chapter_tokens
+            counts = self.cost_tracker.count_tokens_batch(
+                [chunk for _, chunks in pending for chunk in chunks], provider, model
+            )
+            position = 0
+            for has_context, chunks in pending:
+                chunk_counts = counts[position:position + len(chunks)]
+                position += len(chunks)
+                
+                text_tokens = sum(chunk_counts)
+                prompt_tokens = overhead['per_chunk'] * len(chunks)
+                if overhead['per_chunk'] and chunks:
+                    prompt_tokens += overhead['first_chunk']
+                    if has_context:
+                        # Context density follows the chapter's own chars per token
+                        chars = sum(len(chunk) for chunk in chunks) or 1
+                        prompt_tokens += overhead['context'] + int(
+                            self.CONTEXT_CHARS * text_tokens / chars
+                        )
+                
+                totals['chunks'] += len(chunks)
+                totals['text_tokens'] += text_tokens
+                totals['prompt_tokens'] += prompt_tokens
+                longest_chapter_tokens = max(longest_chapter_tokens, text_tokens + prompt_tokens)
+            pending.clear()
+        
+        for _, chapter_number, original_text in query.order_by(Chapter.chapter_number).yield_per(self.COUNT_BATCH):
+            totals['chapters'] += 1
+            
+            # translate_chapter serves these from the translation cache at no cost
+            if self.engine._get_text_hash(original_text) in cached_hashes:
+                totals['cached_chapters'] += 1
+                continue
+            
+            pending.append((
+                chapter_number != first_chapter_number,
+                self.engine._split_into_chunks(original_text)
+            ))
+            if len(pending) >= self.COUNT_BATCH:
+                count_pending()
+        
+        if pending:
+            count_pending()
+        
+        input_tokens = totals['text_tokens'] + totals['prompt_tokens']
+        output_tokens = int(input_tokens * output_ratio)
+        
+        # Chunks of one chapter run one after another, chapters run side by side
+        translated_chapters = totals['chapters'] - totals['cached_chapters']
+        effective_concurrency = max(min(concurrency, translated_chapters), 1)
+        estimated_seconds = max(
+            output_tokens * seconds_per_token / effective_concurrency,
+            longest_chapter_tokens * output_ratio * seconds_per_token
+        )
+        
+        cost = self.cost_tracker.estimate_cost(provider, model, input_tokens, output_tokens)
+        cost['is_estimate'] = True
+        
+        return {
+            'project_id': project_id,
+            'provider': provider,
+            'model': model or None,
+            'chapters': totals['chapters'],
+            'cached_chapters': totals['cached_chapters'],
+            'chunks': totals['chunks'],
+            'tokenizer': self.cost_tracker.get_tokenizer(provider, model)[0],
+            'input_tokens': input_tokens,
+            'text_tokens': totals['text_tokens'],
+            'prompt_overhead_tokens': totals['prompt_tokens'],
+            'glossary_terms': overhead['glossary_terms'],
+            'expected_output_tokens': output_tokens,
+            'output_ratio': round(output_ratio, 3),
+            'output_ratio_source': ratio_source,
+            'cost': cost,
+            'throughput': {
+                'output_tokens_per_second': round(1 / seconds_per_token, 2),
+                'samples': throughput_samples,
+                'source': 'measured' if throughput_samples else 'default'
+            },
+            'concurrency': concurrency,
+            'effective_concurrency': effective_concurrency,
+            'estimated_seconds': round(estimated_seconds, 1)
+        }
+    
+    def _prompt_overhead(self, project: Project, provider: str, model: str,
+                         extract_terms: bool) -> Dict:
+        """Prompt tokens added around each chunk's text (zero for machine translation APIs)"""
+        glossary = self.engine._get_project_glossary(project.id)
+        overhead = {'per_chunk': 0, 'first_chunk': 0, 'context': 0, 'glossary_terms': len(glossary)}
+        
+        provider_class = AIProviderFactory.PROVIDERS[provider]
+        if not provider_class.uses_prompt:
+            return overhead
+        
+        def prompt(context: str = None, extract: bool = False) -> str:
+            return provider_class._build_translation_prompt(
+                "", project.source_language, project.target_language, glossary, context, extract
+            )
+        
+        base, with_terms, with_context = self.cost_tracker.count_tokens_batch(
+            [prompt(), prompt(extract=extract_terms), prompt(context=" ")], provider, model
+        )
+        
+        # Chunks beyond the first carry neither context nor term extraction
+        overhead['per_chunk'] = base
+        overhead['first_chunk'] = with_terms - base
+        overhead['context'] = with_context - base
+        
+        return overhead
+    
+    def _cached_hashes(self, project: Project) -> set:
+        rows = self.db.query(TranslationCache.source_text_hash).filter(
+            TranslationCache.project_id == project.id,
+            TranslationCache.source_lang == project.source_language,
+            TranslationCache.target_lang == project.target_language
+        )
+        return {text_hash for text_hash, in rows}
+    
+    def output_ratio(self, project_id: int, provider: str) -> Tuple[float, str]:
+        """Output/input token ratio of recent translations: project first, then provider-wide"""
+        scopes = (
+            ('project', [CostTracking.project_id == project_id, CostTracking.ai_provider == provider]),
+            ('provider', [CostTracking.ai_provider == provider])
+        )
+        
+        for source, filters in scopes:
+            recent = self.db.query(
+                CostTracking.input_tokens, CostTracking.output_tokens
+            ).filter(*filters, CostTracking.input_tokens > 0).order_by(
+                CostTracking.created_at.desc()
+            ).limit(self.HISTORY_LIMIT).subquery()
+            
+            samples, input_tokens, output_tokens = self.db.query(
+                func.count(), func.sum(recent.c.input_tokens), func.sum(recent.c.output_tokens)
+            ).one()
+            
+            if samples >= (self.MIN_PROJECT_HISTORY if source == 'project' else 1):
+                return output_tokens / input_tokens, source
+        
+        return self.DEFAULT_OUTPUT_RATIO, 'default'
+    
+    def seconds_per_output_token(self, provider: str) -> Tuple[float, int]:
+        """Measured provider time per output token over recent translations"""
+        stats = Chapter.translation_stats
+        duration = func.json_extract(stats, '$.duration')
+        output_tokens = func.json_extract(stats, '$.cost.output_tokens')
+        
+        recent = self.db.query(duration.label('duration'), output_tokens.label('output_tokens')).filter(
+            func.json_extract(stats, '$.ai_provider') == provider,
+            duration > 0,
+            output_tokens > 0
+        ).order_by(Chapter.updated_at.desc()).limit(self.HISTORY_LIMIT).subquery()
+        
+        samples, total_duration, total_tokens = self.db.query(
+            func.count(), func.sum(recent.c.duration), func.sum(recent.c.output_tokens)
+        ).one()
+        
+        if not samples:
+            return 1 / settings.PLANNER_DEFAULT_TOKENS_PER_SEC, 0
+        return total_duration / total_tokens, samples
@@ -2,10 +2,17 @@
 Batch Translation Service - Translate multiple chapters at once
 """
 import asyncio
-from typing import List, Dict
+import math
+from collections import deque
+from typing import List, Dict, Optional, Tuple
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from database import Chapter, TranslationJob
+from database import SessionLocal, Project, Chapter, APIConfig, TranslationJob
 from translation_engine import TranslationEngine
+from batch_planner import BatchPlanner
+from adaptive_concurrency import AdaptiveConcurrency
+from circuit_breaker import CircuitBreaker
+from rate_limiter import ProviderRateLimiter
 from datetime import datetime
 
 
@@ -43,8 +50,13 @@ class BatchTranslationService:
         
         return job.id
     
-    async def process_batch_job(self, job_id: int):
-        """Process a batch translation job"""
+    async def process_batch_job(self, job_id: int, providers: List[str] = None, concurrency: int = None):
+        """
+        Process a batch translation job
+        
+        With providers, the chapters are sharded across them (see plan_shards)
+        instead of being translated one by one with the project's provider.
+        """
         
         # Get job
         job = self.db.query(TranslationJob).filter(TranslationJob.id == job_id).first()
@@ -67,34 +79,37 @@ class BatchTranslationService:
         failed = []
         
         try:
-            for chapter_id in job.chapter_ids:
-                try:
-                    # Update current status
-                    self.active_jobs[job_id]['current_chapter'] = chapter_id
-                    
-                    # Translate chapter
-                    result = await self.engine.translate_chapter(chapter_id, extract_terms=True)
+            if providers:
+                completed, failed = await self._process_sharded(job, providers, concurrency)
+            else:
+                for chapter_id in job.chapter_ids:
+                    try:
+                        # Update current status
+                        self.active_jobs[job_id]['current_chapter'] = chapter_id
+                        
+                        # Translate chapter
+                        result = await self.engine.translate_chapter(chapter_id, extract_terms=True)
+                        
+                        if result['success']:
+                            completed += 1
+                        else:
+                            failed.append({
+                                'chapter_id': chapter_id,
+                                'error': result.get('error', 'Unknown error')
+                            })
+                        
+                        # Update progress
+                        progress = int((completed / job.total_chapters) * 100)
+                        job.progress = progress
+                        job.completed_chapters = completed
+                        self.active_jobs[job_id]['progress'] = progress
+                        self.db.commit()
                     
-                    if result['success']:
-                        completed += 1
-                    else:
+                    except Exception as e:
                         failed.append({
                             'chapter_id': chapter_id,
-                            'error': result.get('error', 'Unknown error')
+                            'error': str(e)
                         })
-                    
-                    # Update progress
-                    progress = int((completed / job.total_chapters) * 100)
-                    job.progress = progress
-                    job.completed_chapters = completed
-                    self.active_jobs[job_id]['progress'] = progress
-                    self.db.commit()
-                    
-                except Exception as e:
-                    failed.append({
-                        'chapter_id': chapter_id,
-                        'error': str(e)
-                    })
             
             # Update final status
             job.completed_chapters = completed
@@ -102,7 +117,7 @@ class BatchTranslationService:
             job.status = "completed" if len(failed) == 0 else "failed"
             job.completed_at = datetime.utcnow()
             job.progress = 100
-            
+        
         except Exception as e:
             job.status = "failed"
             job.failed_chapters = failed + [{'error': str(e)}]
@@ -112,6 +127,139 @@ class BatchTranslationService:
             if job_id in self.active_jobs:
                 del self.active_jobs[job_id]
     
+    def plan_shards(self, project_id: int, providers: List[str],
+                    concurrency: int = None) -> Dict[str, Optional[int]]:
+        """
+        Most chapters each provider may translate at once (None: no limit of
+        its own, its adaptive concurrency window decides - see _process_sharded).
+        
+        A provider with a TPM limit gets no more chapters than the quota it has
+        left this minute can keep busy (less when other translations are
+        already using it), and providers whose circuit is open get none. With
+        concurrency, that many chapters are split across the providers instead,
+        each going to the one with the highest measured throughput per chapter.
+        """
+        if concurrency is not None and concurrency < 1:
+            raise ValueError("Concurrency must be at least 1")
+        if not providers:
+            raise ValueError("At least one provider is required")
+        
+        configs = {
+            config.provider_name: config
+            for config in self.db.query(APIConfig).filter(
+                APIConfig.provider_name.in_(providers),
+                APIConfig.enabled == True
+            )
+            if config.api_key
+        }
+        missing = [name for name in providers if name not in configs]
+        if missing:
+            raise ValueError(f"Providers not configured or disabled: {', '.join(missing)}")
+        
+        planner = BatchPlanner(self.db)
+        throughput = {}
+        lane_limits = {}
+        
+        for name in providers:
+            if CircuitBreaker.for_provider(name).is_open:
+                continue
+            
+            # Output tokens per second of one chapter at a time
+            seconds_per_token, _ = planner.seconds_per_output_token(name)
+            throughput[name] = 1 / seconds_per_token
+            lane_limits[name] = None
+            
+            limiter = ProviderRateLimiter.for_provider(name, configs[name].extra_config)
+            if limiter and limiter.tokens:
+                # Input and output tokens both count against the TPM quota
+                output_ratio, _ = planner.output_ratio(project_id, name)
+                output_rate = limiter.tokens.remaining() / 60 * output_ratio / (1 + output_ratio)
+                lane_limits[name] = max(math.ceil(output_rate / throughput[name]), 1)
+        
+        if not throughput:
+            raise ValueError("No provider available - every circuit is open")
+        if concurrency is None:
+            return lane_limits
+        
+        # One lane each first, so providers without history get measured too
+        lanes = dict.fromkeys(throughput, 0)
+        for name in sorted(throughput, key=throughput.get, reverse=True)[:concurrency]:
+            lanes[name] = 1
+        for _ in range(concurrency - sum(lanes.values())):
+            candidates = [name for name in lanes if lane_limits[name] is None or lanes[name] < lane_limits[name]]
+            if not candidates:
+                break
+            best = max(candidates, key=lambda name: throughput[name] / (lanes[name] + 1))
+            lanes[best] += 1
+        
+        return {name: count for name, count in lanes.items() if count}
+    
+    async def _process_sharded(self, job: TranslationJob, providers: List[str],
+                               concurrency: int = None) -> Tuple[int, List[Dict]]:
+        """
+        Translate the job's chapters on several providers at once; returns (completed, failed).
+        
+        Each provider keeps one chapter more going than its adaptive concurrency
+        window, up to its plan_shards limit. A chapter sends its chunks one at a
+        time, so the extra chapter keeps the window in full use and lets it grow
+        while the provider stays healthy; as it grows or shrinks, so does the
+        number of chapters in flight. Faster providers therefore translate more
+        chapters. Chapters run side by side, so a chapter only gets the previous
+        chapter as context if that one was translated earlier.
+        """
+        limits = self.plan_shards(job.project_id, providers, concurrency)
+        self.active_jobs[job.id]['lanes'] = limits
+        print(f"🔀 Batch job {job.id} sharded: " + ", ".join(
+            name if limit is None else f"{name} (max {limit})" for name, limit in limits.items()
+        ))
+        
+        queue = deque(job.chapter_ids)
+        completed = 0
+        failed = []
+        
+        async def translate(provider_name: str, chapter_id: int):
+            nonlocal completed
+            # One session per chapter - their translations interleave on the event loop
+            db = SessionLocal()
+            try:
+                result = await TranslationEngine(db).translate_chapter(
+                    chapter_id, extract_terms=True, provider=provider_name
+                )
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
+            finally:
+                db.close()
+            
+            if result['success']:
+                completed += 1
+            else:
+                failed.append({
+                    'chapter_id': chapter_id,
+                    'provider': provider_name,
+                    'error': result.get('error', 'Unknown error')
+                })
+            
+            job.progress = int((completed / job.total_chapters) * 100)
+            job.completed_chapters = completed
+            self.db.commit()
+        
+        async def dispatch(provider_name: str, limit: Optional[int]):
+            window = AdaptiveConcurrency.for_provider(provider_name)
+            running = set()
+            try:
+                while queue or running:
+                    target = window.limit + 1 if limit is None else min(window.limit + 1, limit)
+                    while queue and len(running) < target:
+                        running.add(asyncio.ensure_future(translate(provider_name, queue.popleft())))
+                    # Woken now and then too, to follow a window that grew meanwhile
+                    _, running = await asyncio.wait(running, timeout=1.0, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for task in running:
+                    task.cancel()
+        
+        await asyncio.gather(*(dispatch(name, limit) for name, limit in limits.items()))
+        return completed, failed
+    
     def get_job_status(self, job_id: int) -> Dict:
         """Get status of a batch job"""
         
@@ -124,6 +272,15 @@ class BatchTranslationService:
         if not job:
             return None
         
+        # Provider that translated each chapter (they differ in sharded jobs)
+        chapter_providers = {
+            chapter_id: provider
+            for chapter_id, provider in self.db.query(
+                Chapter.id, func.json_extract(Chapter.translation_stats, '$.ai_provider')
+            ).filter(Chapter.id.in_(job.chapter_ids))
+            if provider
+        }
+        
         return {
             'id': job.id,
             'status': job.status,
@@ -131,6 +288,7 @@ class BatchTranslationService:
             'total_chapters': job.total_chapters,
             'completed_chapters': job.completed_chapters,
             'failed_chapters': job.failed_chapters,
+            'chapter_providers': chapter_providers,
             'started_at': job.started_at.isoformat() if job.started_at else None,
             'completed_at': job.completed_at.isoformat() if job.completed_at else None
         }
@@ -0,0 +1,153 @@
+"""
+Circuit Breaker - Stop sending requests to a provider that keeps failing or stalling
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, TypeVar
+from ai_providers import ProviderError
+from config import settings
+
+T = TypeVar('T')
+
+
+class CircuitOpenError(ProviderError):
+    """
+    Raised instead of calling a provider whose circuit is open. Retryable,
+    with retry_after set to when a probe may go through.
+    """
+
+
+class CircuitBreaker:
+    """
+    Per-provider breaker over the outcomes of the last CIRCUIT_WINDOW requests.
+    
+    closed: requests flow; too many failures or slow calls open the circuit.
+    open: requests are refused for CIRCUIT_OPEN_SECONDS.
+    half_open: a single probe request is let through; its outcome closes
+    the circuit again or re-opens it.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    _breakers: Dict[str, "CircuitBreaker"] = {}
+    
+    def __init__(self, provider_name: str):
+        self.provider_name = provider_name
+        self.state = self.CLOSED
+        self.outcomes = deque(maxlen=settings.CIRCUIT_WINDOW)  # (failed, slow) per request
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.probe_in_flight = False
+    
+    @classmethod
+    def for_provider(cls, provider_name: str) -> "CircuitBreaker":
+        breaker = cls._breakers.get(provider_name)
+        if breaker is None:
+            breaker = cls._breakers[provider_name] = cls(provider_name)
+        return breaker
+    
+    @classmethod
+    def all_status(cls) -> Dict[str, dict]:
+        return {name: breaker.status() for name, breaker in cls._breakers.items()}
+    
+    @property
+    def is_open(self) -> bool:
+        """Refusing requests right now (once CIRCUIT_OPEN_SECONDS pass, a probe may go through)"""
+        return self.state == self.OPEN and time.monotonic() - self.opened_at < settings.CIRCUIT_OPEN_SECONDS
+    
+    @property
+    def retry_in(self) -> float:
+        """Seconds until an open circuit lets a probe through"""
+        return max(settings.CIRCUIT_OPEN_SECONDS - (time.monotonic() - self.opened_at), 0.0)
+    
+    def allow_request(self) -> bool:
+        if self.state == self.OPEN:
+            if self.is_open:
+                return False
+            self.state = self.HALF_OPEN
+            self.probe_in_flight = False
+        
+        if self.state == self.HALF_OPEN:
+            if self.probe_in_flight:
+                return False
+            self.probe_in_flight = True
+        
+        return True
+    
+    def record(self, failed: bool, duration: float):
+        slow = duration >= settings.CIRCUIT_SLOW_CALL_SECONDS
+        
+        if self.state == self.HALF_OPEN:
+            self.probe_in_flight = False
+            if failed or slow:
+                self._open()
+            else:
+                self.state = self.CLOSED
+                self.outcomes.clear()
+                print(f"✅ {self.provider_name} circuit closed - provider recovered")
+            return
+        
+        self.outcomes.append((failed, slow))
+        if self.state == self.CLOSED and len(self.outcomes) >= settings.CIRCUIT_MIN_CALLS:
+            failure_rate = sum(f for f, _ in self.outcomes) / len(self.outcomes)
+            slow_rate = sum(s for _, s in self.outcomes) / len(self.outcomes)
+            if failure_rate >= settings.CIRCUIT_FAILURE_RATE or slow_rate >= settings.CIRCUIT_SLOW_CALL_RATE:
+                self._open()
+    
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        print(f"⛔ {self.provider_name} circuit open for {settings.CIRCUIT_OPEN_SECONDS}s")
+    
+    async def call(self, request: Callable[[Callable[[], None]], Awaitable[T]]) -> T:
+        """
+        Await request(admitted) if the circuit allows it, recording its outcome.
+        
+        request calls admitted() when the provider call really starts, so time
+        spent waiting for the provider's own quota or concurrency slots doesn't
+        count as a slow call.
+        """
+        if not self.allow_request():
+            # Half-open with a probe out: back off and see how the probe went
+            raise CircuitOpenError(
+                f"{self.provider_name} circuit open",
+                retryable=True,
+                retry_after=self.retry_in if self.state == self.OPEN else None
+            )
+        
+        started = time.monotonic()
+        
+        def admitted():
+            nonlocal started
+            started = time.monotonic()
+        
+        try:
+            result = await request(admitted)
+        except ProviderError as e:
+            # Fatal errors (bad request, auth) say nothing about availability
+            self.record(e.retryable, time.monotonic() - started)
+            raise
+        except asyncio.CancelledError:
+            # Abandoned, no outcome - let the next request probe instead
+            if self.state == self.HALF_OPEN:
+                self.probe_in_flight = False
+            raise
+        
+        self.record(False, time.monotonic() - started)
+        return result
+    
+    def status(self) -> dict:
+        calls = len(self.outcomes)
+        
+        return {
+            'state': self.state,
+            'calls': calls,
+            'failure_rate': round(sum(f for f, _ in self.outcomes) / calls, 3) if calls else 0.0,
+            'slow_rate': round(sum(s for _, s in self.outcomes) / calls, 3) if calls else 0.0,
+            'times_opened': self.times_opened,
+            'retry_in': round(self.retry_in, 1) if self.state == self.OPEN else None
+        }
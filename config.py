@@ -14,6 +14,69 @@ class Settings(BaseSettings):
     # API Keys (will be stored in database per user)
     DEFAULT_AI_PROVIDER: str = "gemini"
     
+    # Local token counting (cost estimates, fallback when providers report no usage)
+    TOKEN_COUNT_THREADS: int = 8
+    TOKEN_COUNT_MEMO_SIZE: int = 100000
+    # Output tokens per second assumed by the batch planner before any translation was timed
+    PLANNER_DEFAULT_TOKENS_PER_SEC: float = 40.0
+    
+    # Share of each provider's rpm/tpm quota (APIConfig.extra_config) the rate limiter uses
+    RATE_LIMIT_HEADROOM: float = 0.95
+    
+    # Retries of transient provider errors (timeouts, 429, 5xx)
+    RETRY_MAX_ATTEMPTS: int = 5
+    RETRY_BASE_DELAY: float = 1.0
+    RETRY_MAX_DELAY: float = 60.0
+    RETRY_AFTER_MAX: float = 300.0  # longest Retry-After honored
+    
+    # Circuit breakers and failover (Project.settings_data["failover_providers"])
+    CIRCUIT_WINDOW: int = 20  # recent requests per provider the breaker looks at
+    CIRCUIT_MIN_CALLS: int = 5
+    CIRCUIT_FAILURE_RATE: float = 0.5
+    CIRCUIT_SLOW_CALL_SECONDS: float = 60.0
+    CIRCUIT_SLOW_CALL_RATE: float = 0.8
+    CIRCUIT_OPEN_SECONDS: float = 30.0
+    FAILOVER_MAX_ATTEMPTS: int = 2  # attempts on a provider before failing over to the next
+    
+    # Hedged requests (interactive translations only)
+    HEDGE_ENABLED: bool = False  # default for /api/translate when the request doesn't say
+    HEDGE_PERCENTILE: float = 95.0  # hedge a chunk still running past this latency percentile
+    HEDGE_MIN_SAMPLES: int = 20
+    HEDGE_MIN_DELAY: float = 2.0
+    HEDGE_LATENCY_WINDOW: int = 200
+    HEDGE_BUDGET_RATIO: float = 0.1  # at most one hedge per 10 hedge-eligible requests
+    HEDGE_BUDGET_BURST: int = 5
+    
+    # Adaptive concurrency per provider (AIMD)
+    AIMD_INITIAL_WINDOW: int = 4  # requests in flight per provider to start with
+    AIMD_MIN_WINDOW: float = 1.0
+    AIMD_MAX_WINDOW: float = 64.0
+    AIMD_INCREASE: float = 1.0  # added per window of healthy requests
+    AIMD_DECREASE: float = 0.5  # factor applied on 429/503/529 or a latency spike
+    AIMD_LATENCY_FACTOR: float = 3.0  # slower than this many times the median is a spike
+    
+    # Exports (PDF/EPUB/DOCX run in a process pool)
+    EXPORT_WORKERS: int = 2
+    EXPORT_PDF_PARALLEL_MIN_CHAPTERS: int = 100
+    EXPORT_PDF_RANGE_SIZE: int = 25
+    EXPORT_CACHE_MAX_MB: int = 2048
+    EXPORT_CACHE_MAX_AGE_DAYS: int = 30
+    
+    # Scheduled project backups (per-project intervals in backup_schedules)
+    AUTO_BACKUP_CHECK_MINUTES: int = 5
+    AUTO_BACKUP_THROTTLE_MB_PER_SEC: float = 10.0
+    
+    # Whole-database snapshots (SQLite online backup API)
+    SNAPSHOT_DIR: str = "snapshots"
+    SNAPSHOT_INTERVAL_HOURS: int = 24  # 0 disables the scheduler
+    SNAPSHOT_COMPRESSION: str = "zstd"  # zstd or none
+    SNAPSHOT_KEEP_LAST: int = 3
+    SNAPSHOT_KEEP_DAILY: int = 7
+    SNAPSHOT_KEEP_WEEKLY: int = 4
+    
+    # Finished background jobs (consistency analyses, imports, exports) are kept this long
+    JOB_RETENTION_MINUTES: int = 60
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
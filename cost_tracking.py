@@ -1,13 +1,66 @@
 """
 Cost Tracking Service - Token counting and cost estimation
 """
-from typing import Dict
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+import hashlib
+import threading
 import tiktoken
+from config import settings
+
+
+# Loaded tiktoken encodings by name. None marks an encoding that could not be
+# loaded (e.g. its BPE file cannot be downloaded), so it is not retried per instance
+_encodings: Dict[str, Optional[tiktoken.Encoding]] = {}
+_encodings_lock = threading.Lock()
+
+
+def _get_encoding(name: str) -> Optional[tiktoken.Encoding]:
+    with _encodings_lock:
+        if name not in _encodings:
+            try:
+                _encodings[name] = tiktoken.get_encoding(name)
+            except Exception as e:
+                print(f"⚠️ Tokenizer {name} unavailable: {e}")
+                _encodings[name] = None
+        return _encodings[name]
 
 
 class CostTracker:
     """Track translation costs and token usage"""
     
+    # Tokenizer per provider (and model): a tiktoken encoding name, or the
+    # average characters per token for models tiktoken does not cover
+    TOKENIZERS = {
+        'openai': {
+            'gpt-4o': 'o200k_base',
+            'gpt-4': 'cl100k_base',
+            'gpt-3.5': 'cl100k_base',
+        },
+        'gemini': 4.0,
+        'claude': 3.5,
+        'groq': 3.7,  # Llama / Mixtral
+        'deepseek': 3.3,
+        'perplexity': 3.7,  # Llama based Sonar models
+        # Character-billed translation APIs (see PRICING)
+        'deepl': 4.0,
+        'google-translate': 4.0,
+        'microsoft-translator': 4.0,
+        'yandex': 4.0,
+        'libretranslate': 4.0,
+        'mymemory': 4.0,
+    }
+    PROVIDER_ALIASES = {'chatgpt': 'openai'}
+    DEFAULT_ENCODING = 'cl100k_base'
+    DEFAULT_CHARS_PER_TOKEN = 4.0
+    
+    # Texts per encode_batch call; keeps the token lists of a whole project out of memory
+    BATCH_SLICE = 256
+    
+    # Token counts keyed by (tokenizer, text hash), shared by all instances
+    _memo: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+    _memo_lock = threading.Lock()
+    
     # Token pricing per 1K tokens (as of 2025)
     PRICING = {
         # AI Models
@@ -80,18 +133,84 @@ class CostTracker:
     }
     
     def __init__(self):
-        try:
-            self.encoding = tiktoken.get_encoding("cl100k_base")
-        except:
-            self.encoding = None
+        self.encoding = _get_encoding(self.DEFAULT_ENCODING)
     
-    def count_tokens(self, text: str) -> int:
+    def get_tokenizer(self, provider: str = None,
+                      model: str = None) -> Tuple[str, Union[tiktoken.Encoding, float]]:
+        """Tokenizer key and tokenizer (tiktoken encoding or chars-per-token ratio) for a provider/model"""
+        tokenizer = self.DEFAULT_ENCODING
+        
+        if provider:
+            provider = provider.lower()
+            tokenizer = self.TOKENIZERS.get(self.PROVIDER_ALIASES.get(provider, provider), tokenizer)
+            
+            if isinstance(tokenizer, dict):
+                model = (model or '').lower()
+                tokenizer = next(
+                    (name for key, name in tokenizer.items() if key in model),
+                    self.DEFAULT_ENCODING
+                )
+        
+        # Encodings missing from the installed tiktoken fall back to the default one
+        for name in ((tokenizer, self.DEFAULT_ENCODING) if isinstance(tokenizer, str) else ()):
+            encoding = _get_encoding(name)
+            if encoding is not None:
+                return f"tiktoken:{name}", encoding
+        if isinstance(tokenizer, str):
+            tokenizer = self.DEFAULT_CHARS_PER_TOKEN
+        
+        return f"chars:{tokenizer}", tokenizer
+    
+    def count_tokens(self, text: str, provider: str = None, model: str = None) -> int:
         """Count tokens in text"""
-        if self.encoding:
-            return len(self.encoding.encode(text))
-        else:
-            # Fallback: rough estimation (1 token ≈ 4 characters)
-            return len(text) // 4
+        return self.count_tokens_batch([text], provider, model)[0]
+    
+    def count_tokens_batch(self, texts: List[str], provider: str = None,
+                           model: str = None) -> List[int]:
+        """
+        Count tokens for many texts at once, in order.
+        
+        tiktoken counts run through the multithreaded encode_batch and are
+        memoized by text hash, so re-estimating a project only encodes
+        chapters whose text changed.
+        """
+        key, tokenizer = self.get_tokenizer(provider, model)
+        
+        if isinstance(tokenizer, float):
+            return [int(len(text) / tokenizer) for text in texts]
+        
+        hashes = [hashlib.sha256(text.encode()).hexdigest() for text in texts]
+        counts: Dict[str, int] = {}
+        missing: Dict[str, str] = {}
+        
+        with self._memo_lock:
+            for text_hash, text in zip(hashes, texts):
+                count = self._memo.get((key, text_hash))
+                if count is not None:
+                    self._memo.move_to_end((key, text_hash))
+                    counts[text_hash] = count
+                else:
+                    missing[text_hash] = text
+        
+        if missing:
+            missing_hashes = list(missing)
+            for start in range(0, len(missing_hashes), self.BATCH_SLICE):
+                batch = missing_hashes[start:start + self.BATCH_SLICE]
+                # Special-token markers in novel text are counted as plain text
+                encoded = tokenizer.encode_batch(
+                    [missing[text_hash] for text_hash in batch],
+                    num_threads=settings.TOKEN_COUNT_THREADS,
+                    disallowed_special=()
+                )
+                counts.update(zip(batch, (len(tokens) for tokens in encoded)))
+            
+            with self._memo_lock:
+                for text_hash in missing_hashes:
+                    self._memo[(key, text_hash)] = counts[text_hash]
+                while len(self._memo) > settings.TOKEN_COUNT_MEMO_SIZE:
+                    self._memo.popitem(last=False)
+        
+        return [counts[text_hash] for text_hash in hashes]
     
     def estimate_cost(self, provider: str, model: str, input_tokens: int, 
                      output_tokens: int) -> Dict[str, float]:
@@ -105,7 +224,10 @@ class CostTracker:
                 'input_cost': 0.0,
                 'output_cost': 0.0,
                 'total_cost': 0.0,
-                'currency': 'USD'
+                'currency': 'USD',
+                'input_tokens': input_tokens,
+                'output_tokens': output_tokens,
+                'total_tokens': input_tokens + output_tokens
             }
         
         # Calculate costs (pricing is per 1K tokens)
@@ -147,7 +269,7 @@ class CostTracker:
     def estimate_chapter_cost(self, provider: str, model: str, 
                              original_text: str, estimated_output_ratio: float = 1.2) -> Dict:
         """Estimate cost for translating a chapter"""
-        input_tokens = self.count_tokens(original_text)
+        input_tokens = self.count_tokens(original_text, provider, model)
         estimated_output_tokens = int(input_tokens * estimated_output_ratio)
         
         cost_info = self.estimate_cost(provider, model, input_tokens, estimated_output_tokens)
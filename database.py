@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey, JSON, Boolean, Float
+from sqlalchemy import create_engine, event, Column, Integer, String, Text, DateTime, ForeignKey, JSON, Boolean, Float, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -7,6 +7,15 @@ from config import settings
 # Database setup
 engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# WAL lets readers (exports, database snapshots) run alongside writers
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _enable_wal(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
 Base = declarative_base()
 
 # Database Models
@@ -49,6 +58,9 @@ class Chapter(Base):
 
 class GlossaryEntry(Base):
     __tablename__ = "glossary_entries"
+    __table_args__ = (
+        Index("uq_glossary_project_term", "project_id", "original_term", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
@@ -95,6 +107,24 @@ class TranslationCache(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class ChunkCheckpoint(Base):
+    __tablename__ = "chunk_checkpoints"
+    __table_args__ = (
+        Index("uq_chunk_checkpoint_chapter_chunk", "chapter_id", "chunk_index", unique=True),
+    )
+    
+    # Chunks already translated in an unfinished run of a chapter; cleared once it completes
+    id = Column(Integer, primary_key=True, index=True)
+    chapter_id = Column(Integer, ForeignKey("chapters.id"), nullable=False)
+    chunk_index = Column(Integer, nullable=False)
+    source_hash = Column(String(64), nullable=False)
+    translated_text = Column(Text, nullable=False)
+    ai_provider = Column(String(50))
+    input_tokens = Column(Integer, nullable=True)  # None when the provider reported no usage
+    output_tokens = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 class TranslationJob(Base):
     __tablename__ = "translation_jobs"
     
@@ -148,6 +178,22 @@ class ProjectBackup(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class BackupSchedule(Base):
+    __tablename__ = "backup_schedules"
+    
+    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+    enabled = Column(Boolean, default=True)
+    interval_hours = Column(Float, default=24)
+    keep = Column(Integer, default=5)  # rolling auto backups kept per project
+    incremental = Column(Boolean, default=False)
+    # Bumped by triggers on every chapter/glossary/project write; the project is
+    # dirty while it differs from the value captured by the last backup
+    change_counter = Column(Integer, default=1)
+    backed_up_counter = Column(Integer, default=0)
+    last_backup_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+
 class UserSettings(Base):
     __tablename__ = "user_settings"
     
@@ -157,9 +203,30 @@ class UserSettings(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+# Tables whose writes make a project's next scheduled backup due
+CHANGE_TRACKED_TABLES = {
+    "chapters": "project_id",
+    "glossary_entries": "project_id",
+    "projects": "id"
+}
+
+
 # Create all tables
 def init_db():
     Base.metadata.create_all(bind=engine)
+    
+    # Change counters for scheduled backups, kept by the database itself so bulk
+    # statements are counted too
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            for table, key in CHANGE_TRACKED_TABLES.items():
+                for event_name, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+                    conn.exec_driver_sql(
+                        f"CREATE TRIGGER IF NOT EXISTS backup_changes_{table}_{event_name.lower()} "
+                        f"AFTER {event_name} ON {table} BEGIN "
+                        f"UPDATE backup_schedules SET change_counter = change_counter + 1 "
+                        f"WHERE project_id = {row}.{key}; END"
+                    )
 
 
 # Dependency to get DB session
@@ -0,0 +1,335 @@
+"""
+Export Jobs - Run PDF/EPUB/DOCX exports in a process pool with progress
+"""
+import asyncio
+import multiprocessing
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from database import SessionLocal, Project, engine
+from export_service import ExportService, ExportCache, ZipStreamBuffer
+from config import settings
+
+# Fingerprint key of segmented PDFs, whose layout (TOC, page numbers) differs from single-file ones
+PARALLEL_PDF = 'pdf:parallel'
+
+
+def _init_worker():
+    """Drop database connections inherited from the parent process"""
+    engine.dispose(close=False)
+
+
+def _load_project(project_id: int, volume: int = None) -> Tuple[str, dict]:
+    """Export title (with the volume number, if any) and export metadata"""
+    
+    db = SessionLocal()
+    try:
+        project = db.query(Project).filter(Project.id == project_id).first()
+        if not project:
+            raise ValueError("Project not found")
+        
+        name = f"{project.name} - Cilt {volume}" if volume else project.name
+        return name, {
+            "description": project.description,
+            "source_language": project.source_language,
+            "target_language": project.target_language
+        }
+    finally:
+        db.close()
+
+
+def _fingerprint_project(project_id: int, format: str, start_chapter: int = None,
+                         end_chapter: int = None, volume: int = None) -> Tuple[str, str, List[int]]:
+    """Export title, content fingerprint of its current export and the chapter ids it covers"""
+    
+    project_name, metadata = _load_project(project_id, volume)
+    chapter_ids = []
+    
+    def chapters():
+        for chapter in ExportService.iter_chapters(project_id, start_chapter=start_chapter,
+                                                   end_chapter=end_chapter):
+            chapter_ids.append(chapter['id'])
+            yield chapter
+    
+    fingerprint = ExportService.fingerprint(format, project_name, metadata, chapters())
+    
+    return project_name, fingerprint, chapter_ids
+
+
+def _run_export(job_id: str, project_id: int, format: str, progress_map, start_chapter: int = None,
+                end_chapter: int = None, volume: int = None) -> str:
+    """Render one export inside a worker process and return its cached file path"""
+    
+    project_name, metadata = _load_project(project_id, volume)
+    chapters = list(ExportService.iter_chapters(project_id, start_chapter=start_chapter,
+                                                end_chapter=end_chapter))
+    
+    def report(chapters_rendered: int):
+        progress_map[job_id] = chapters_rendered
+    
+    export_service = ExportService()
+    exporters = {
+        'pdf': export_service.export_to_pdf,
+        'epub': export_service.export_to_epub,
+        'docx': export_service.export_to_docx
+    }
+    
+    filepath = exporters[format](project_name, chapters, metadata, progress=report)
+    
+    # Stored under what was actually rendered, even if chapters changed meanwhile
+    fingerprint = ExportService.fingerprint(format, project_name, metadata, chapters)
+    return ExportCache().put(fingerprint, format, filepath)
+
+
+def _render_pdf_range(progress_key: str, project_id: int, chapter_ids: List[int],
+                      progress_map) -> List[dict]:
+    """Render (or reuse) the PDF segments of one chapter range inside a worker process"""
+    
+    export_service = ExportService()
+    segments = []
+    
+    for chapter in ExportService.iter_chapters(project_id, chapter_ids=chapter_ids):
+        segments.append(export_service.render_pdf_segment(chapter))
+        progress_map[progress_key] = len(segments)
+    
+    return segments
+
+
+def _merge_pdf(project_id: int, segments: List[dict], volume: int = None) -> str:
+    """Merge rendered segments into the final PDF and return its cached file path"""
+    
+    project_name, metadata = _load_project(project_id, volume)
+    filepath = ExportService().merge_pdf_segments(project_name, segments, metadata)
+    
+    fingerprint = ExportService.fingerprint(PARALLEL_PDF, project_name, metadata, segments)
+    return ExportCache().put(fingerprint, 'pdf', filepath)
+
+
+class ExportJobService:
+    """Runs exports off the event loop and tracks their progress"""
+    
+    FORMATS = ('pdf', 'epub', 'docx')
+    
+    _executor: Optional[ProcessPoolExecutor] = None
+    _manager = None
+    _progress = None
+    _jobs: Dict[str, Dict] = {}
+    _tasks: Dict[str, asyncio.Future] = {}
+    
+    @classmethod
+    def _get_executor(cls) -> ProcessPoolExecutor:
+        """Start the worker pool (and the shared progress map) on first use"""
+        if cls._executor is None:
+            cls._manager = multiprocessing.Manager()
+            cls._progress = cls._manager.dict()
+            cls._executor = ProcessPoolExecutor(
+                max_workers=settings.EXPORT_WORKERS,
+                initializer=_init_worker
+            )
+        return cls._executor
+    
+    @classmethod
+    def _prune_jobs(cls):
+        """Forget jobs that finished more than JOB_RETENTION_MINUTES ago"""
+        cutoff = datetime.utcnow() - timedelta(minutes=settings.JOB_RETENTION_MINUTES)
+        for job_id, job in list(cls._jobs.items()):
+            if job['completed_at'] and datetime.fromisoformat(job['completed_at']) < cutoff:
+                del cls._jobs[job_id]
+    
+    @classmethod
+    async def start_job(cls, project_id: int, format: str, total_chapters: int,
+                        parallel: bool = None, start_chapter: int = None,
+                        end_chapter: int = None, volume: int = None) -> Dict:
+        """
+        Queue an export (or serve an identical cached one) and return its job record.
+        
+        Large PDFs are rendered as per-chapter segments spread over the pool and
+        merged afterwards; parallel=None picks that mode by chapter count.
+        start_chapter/end_chapter limit the export to a chapter number range,
+        and volume titles it as one volume of a split export.
+        """
+        if format not in cls.FORMATS:
+            raise ValueError(f"Invalid format. Use: {', '.join(cls.FORMATS)}")
+        
+        if format != 'pdf':
+            parallel = False
+        elif parallel is None:
+            parallel = total_chapters >= settings.EXPORT_PDF_PARALLEL_MIN_CHAPTERS
+        
+        project_name, fingerprint, chapter_ids = await asyncio.to_thread(
+            _fingerprint_project, project_id, PARALLEL_PDF if parallel else format,
+            start_chapter, end_chapter, volume
+        )
+        
+        job_id = uuid.uuid4().hex
+        job = {
+            'job_id': job_id,
+            'project_id': project_id,
+            'format': format,
+            'mode': 'parallel' if parallel else 'single',
+            'start_chapter': start_chapter,
+            'end_chapter': end_chapter,
+            'volume': volume,
+            'fingerprint': fingerprint,
+            'filename': f"{project_name}.{format}",
+            'status': 'processing',
+            'cached': False,
+            'progress': 0,
+            'total_chapters': total_chapters,
+            'chapters_rendered': 0,
+            'ranges': 0,
+            'filepath': None,
+            'error': None,
+            'started_at': datetime.utcnow().isoformat(),
+            'completed_at': None
+        }
+        cls._prune_jobs()
+        
+        # Nothing changed since the last export - no rendering needed
+        cached = ExportCache().get(fingerprint, format)
+        if cached:
+            job.update(
+                status='completed',
+                cached=True,
+                filepath=cached,
+                completed_at=datetime.utcnow().isoformat()
+            )
+            cls._jobs[job_id] = job
+            return cls.get_job(job_id)
+        
+        # The same content is already being rendered
+        for other in cls._jobs.values():
+            if other['fingerprint'] == fingerprint and other['status'] == 'processing':
+                return cls.get_job(other['job_id'])
+        
+        cls._get_executor()
+        cls._jobs[job_id] = job
+        cls._tasks[job_id] = asyncio.ensure_future(cls._run_job(job, chapter_ids))
+        
+        return cls.get_job(job_id)
+    
+    @classmethod
+    async def _run_job(cls, job: Dict, chapter_ids: List[int]):
+        """Drive one export through the pool and record its outcome"""
+        job_id = job['job_id']
+        
+        try:
+            if job['mode'] == 'parallel':
+                filepath = await cls._run_parallel_pdf(job, chapter_ids)
+            else:
+                cls._progress[job_id] = 0
+                filepath = await asyncio.wrap_future(cls._executor.submit(
+                    _run_export, job_id, job['project_id'], job['format'], cls._progress,
+                    job['start_chapter'], job['end_chapter'], job['volume']
+                ))
+            
+            job['filepath'] = filepath
+            job['status'] = 'completed'
+            await asyncio.to_thread(ExportCache().evict)
+        except Exception as e:
+            job['status'] = 'failed'
+            job['error'] = str(e)
+        finally:
+            job['completed_at'] = datetime.utcnow().isoformat()
+            cls._tasks.pop(job_id, None)
+            if cls._progress is not None:
+                for key in cls._progress_keys(job):
+                    cls._progress.pop(key, None)
+    
+    @classmethod
+    async def _run_parallel_pdf(cls, job: Dict, chapter_ids: List[int]) -> str:
+        """Render chapter ranges concurrently, then merge their segments in chapter order"""
+        size = settings.EXPORT_PDF_RANGE_SIZE
+        ranges = [chapter_ids[i:i + size] for i in range(0, len(chapter_ids), size)]
+        job['ranges'] = len(ranges)
+        
+        futures = [
+            cls._executor.submit(
+                _render_pdf_range, f"{job['job_id']}:{index}", job['project_id'], ids, cls._progress
+            )
+            for index, ids in enumerate(ranges)
+        ]
+        
+        try:
+            results = await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+        
+        segments = [segment for result in results for segment in result]
+        return await asyncio.wrap_future(cls._executor.submit(
+            _merge_pdf, job['project_id'], segments, job['volume']
+        ))
+    
+    @staticmethod
+    def _progress_keys(job: Dict) -> List[str]:
+        if job['mode'] == 'parallel':
+            return [f"{job['job_id']}:{index}" for index in range(job['ranges'])]
+        return [job['job_id']]
+    
+    @classmethod
+    async def stream_volumes(cls, jobs: List[Dict]) -> AsyncIterator[bytes]:
+        """
+        Yield a ZIP archive of finished volume exports, in volume order.
+        
+        The jobs keep rendering in the pool while earlier volumes are being sent.
+        """
+        buffer = ZipStreamBuffer()
+        
+        # Already compressed formats - stored as-is
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for job in jobs:
+                job = await cls.wait(job['job_id'])
+                if job['status'] != 'completed':
+                    print(f"❌ Volume export failed: {job['error']}")
+                    raise RuntimeError(f"Export of {job['filename']} failed: {job['error']}")
+                
+                with archive.open(job['filename'], 'w') as entry, open(job['filepath'], 'rb') as f:
+                    while True:
+                        chunk = f.read(1024 * 1024)
+                        if not chunk:
+                            break
+                        entry.write(chunk)
+                        yield buffer.drain()
+        
+        yield buffer.drain()
+    
+    @classmethod
+    async def wait(cls, job_id: str) -> Dict:
+        """Await a job without blocking the event loop"""
+        task = cls._tasks.get(job_id)
+        if task is not None:
+            # asyncio.wait leaves the job running if this caller goes away
+            await asyncio.wait({task})
+        return cls.get_job(job_id)
+    
+    @classmethod
+    def get_job(cls, job_id: str) -> Optional[Dict]:
+        """Get a job record with current progress"""
+        job = cls._jobs.get(job_id)
+        if job is None:
+            return None
+        
+        if job['status'] == 'processing' and cls._progress is not None:
+            job['chapters_rendered'] = sum(cls._progress.get(key, 0) for key in cls._progress_keys(job))
+        elif job['status'] == 'completed':
+            job['chapters_rendered'] = job['total_chapters']
+        
+        total = job['total_chapters'] or 1
+        job['progress'] = min(int(job['chapters_rendered'] / total * 100), 100)
+        
+        return dict(job)
+    
+    @classmethod
+    def shutdown(cls):
+        """Stop the worker pool"""
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=False, cancel_futures=True)
+            cls._executor = None
+        if cls._manager is not None:
+            cls._manager.shutdown()
+            cls._manager = None
+            cls._progress = None
@@ -4,120 +4,449 @@ Export Service - PDF, EPUB, DOCX generation
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.lib.enums import TA_JUSTIFY, TA_CENTER
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
 from ebooklib import epub
 from docx import Document
 from docx.shared import Pt, Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
+from typing import Iterable, Iterator, Callable, List, Optional
+from sqlalchemy import func, cast, LargeBinary
+from database import SessionLocal, Chapter
+from config import settings
+import hashlib
+import io
+import json
 import os
+import time
+import zipfile
+import uuid
 from datetime import datetime
 
 
+class ProgressDocTemplate(SimpleDocTemplate):
+    """SimpleDocTemplate that reports every chapter heading once it is laid out"""
+    
+    def __init__(self, filename, progress: Callable[[int], None] = None, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.progress = progress
+        self.chapters_rendered = 0
+    
+    def afterFlowable(self, flowable):
+        if self.progress and isinstance(flowable, Paragraph) and flowable.style.name == 'ChapterTitle':
+            self.chapters_rendered += 1
+            self.progress(self.chapters_rendered)
+
+
+class CachedEpubHtml(epub.EpubHtml):
+    """
+    EpubHtml chapter whose rendered XHTML is kept in a fragment cache.
+    
+    The cache key covers everything that ends up in the document, so an
+    unchanged chapter is copied into the next build without re-rendering.
+    """
+    
+    def __init__(self, fragment_dir: str, text: str, on_render: Callable[[bool], None] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.text = text
+        self.on_render = on_render
+        
+        key = hashlib.sha256(json.dumps([
+            ExportService.TEMPLATE_VERSION, self.title, self.lang, text
+        ]).encode()).hexdigest()
+        self.fragment_path = os.path.join(fragment_dir, f"{key}.xhtml")
+    
+    def get_content(self, default=None):
+        reused = os.path.exists(self.fragment_path)
+        
+        if reused:
+            with open(self.fragment_path, 'rb') as f:
+                content = f.read()
+            os.utime(self.fragment_path)
+        else:
+            # Format content
+            paragraphs = [f'<p>{para.strip()}</p>' for para in self.text.split('\n\n') if para.strip()]
+            self.content = f'<h1>{self.title}</h1>' + ''.join(paragraphs)
+            content = super().get_content(default)
+            
+            temp_path = f"{self.fragment_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(content)
+            os.replace(temp_path, self.fragment_path)
+            self.content = None
+        
+        if self.on_render:
+            self.on_render(reused)
+        
+        return content
+
+
+class ZipStreamBuffer(io.RawIOBase):
+    """Write-only sink for zipfile whose output is handed out piece by piece"""
+    
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+    
+    def writable(self):
+        return True
+    
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+    
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class ExportCache:
+    """Content-addressed store for finished exports, with size/age bounded eviction"""
+    
+    def __init__(self, root: str = "exports"):
+        self.root = root
+        self.cache_dir = os.path.join(root, "cache")
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+    
+    def path_for(self, fingerprint: str, format: str) -> str:
+        return os.path.join(self.cache_dir, f"{fingerprint}.{format}")
+    
+    def get(self, fingerprint: str, format: str) -> Optional[str]:
+        """Cached artifact path, or None; a hit refreshes its eviction age"""
+        path = self.path_for(fingerprint, format)
+        if not os.path.exists(path):
+            return None
+        
+        os.utime(path)
+        return path
+    
+    def put(self, fingerprint: str, format: str, filepath: str) -> str:
+        """Move a freshly rendered file into the cache"""
+        path = self.path_for(fingerprint, format)
+        os.replace(filepath, path)
+        return path
+    
+    def evict(self, max_bytes: int = None, max_age_days: float = None) -> int:
+        """Drop files under exports/ older than max_age_days, then least recently used ones over max_bytes"""
+        if max_bytes is None:
+            max_bytes = settings.EXPORT_CACHE_MAX_MB * 1024 * 1024
+        if max_age_days is None:
+            max_age_days = settings.EXPORT_CACHE_MAX_AGE_DAYS
+        
+        files = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        
+        cutoff = time.time() - max_age_days * 86400
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        
+        # Oldest first
+        for mtime, size, path in sorted(files):
+            if mtime >= cutoff and total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        
+        return removed
+
+
 class ExportService:
     """Service for exporting translations"""
     
+    # Bump whenever the rendered layout changes, so cached exports are rebuilt
+    TEMPLATE_VERSION = "1"
+    
     def __init__(self):
         self.output_dir = "exports"
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
     
-    def export_to_pdf(self, project_name: str, chapters: list, metadata: dict = None) -> str:
-        """Export chapters to PDF"""
-        filename = f"{project_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        filepath = os.path.join(self.output_dir, filename)
-        
-        # Create PDF
-        doc = SimpleDocTemplate(
-            filepath,
-            pagesize=A4,
-            rightMargin=72,
-            leftMargin=72,
-            topMargin=72,
-            bottomMargin=18
-        )
-        
-        # Container for 'Flowable' objects
-        story = []
+    @classmethod
+    def fingerprint(cls, format: str, project_name: str, metadata: dict,
+                    chapters: Iterable[dict]) -> str:
+        """Hash of everything that affects an export's content"""
+        digest = hashlib.sha256()
+        digest.update(json.dumps({
+            'format': format,
+            'template_version': cls.TEMPLATE_VERSION,
+            'project_name': project_name,
+            'metadata': metadata or {}
+        }, sort_keys=True).encode())
         
-        # Define styles
+        for chapter in chapters:
+            text_hash = chapter.get('text_hash')
+            if text_hash is None:
+                text = chapter.get('translated_text') or ''
+                text_hash = hashlib.sha256(text.encode()).hexdigest()
+            digest.update(json.dumps([
+                chapter.get('id'),
+                chapter.get('chapter_number'),
+                chapter.get('title'),
+                text_hash
+            ]).encode())
+        
+        return digest.hexdigest()
+    
+    @staticmethod
+    def _pdf_styles() -> dict:
+        """Paragraph styles shared by single-file and segmented PDF exports"""
         styles = getSampleStyleSheet()
         
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor='#4f46e5',
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-        
-        chapter_title_style = ParagraphStyle(
-            'ChapterTitle',
-            parent=styles['Heading2'],
-            fontSize=16,
-            textColor='#6366f1',
-            spaceAfter=12,
-            spaceBefore=12
-        )
-        
-        body_style = ParagraphStyle(
-            'CustomBody',
-            parent=styles['BodyText'],
-            fontSize=11,
-            alignment=TA_JUSTIFY,
-            spaceAfter=12,
-            leading=16
-        )
-        
-        # Add title
-        story.append(Paragraph(project_name, title_style))
-        story.append(Spacer(1, 12))
+        return {
+            'title': ParagraphStyle(
+                'CustomTitle',
+                parent=styles['Heading1'],
+                fontSize=24,
+                textColor='#4f46e5',
+                spaceAfter=30,
+                alignment=TA_CENTER
+            ),
+            'chapter_title': ParagraphStyle(
+                'ChapterTitle',
+                parent=styles['Heading2'],
+                fontSize=16,
+                textColor='#6366f1',
+                spaceAfter=12,
+                spaceBefore=12
+            ),
+            'body': ParagraphStyle(
+                'CustomBody',
+                parent=styles['BodyText'],
+                fontSize=11,
+                alignment=TA_JUSTIFY,
+                spaceAfter=12,
+                leading=16
+            ),
+            'info': styles['Normal']
+        }
+    
+    @staticmethod
+    def _chapter_heading(chapter: dict) -> str:
+        chapter_heading = f"Bölüm {chapter.get('chapter_number', 'N/A')}"
+        if chapter.get('title'):
+            chapter_heading += f": {chapter['title']}"
+        return chapter_heading
+    
+    def _pdf_title_page(self, project_name: str, metadata: dict, chapter_count: int,
+                        styles: dict) -> list:
+        story = [Paragraph(project_name, styles['title']), Spacer(1, 12)]
         
         # Add metadata if provided
         if metadata:
-            info_style = styles['Normal']
+            info_style = styles['info']
             if metadata.get('description'):
                 story.append(Paragraph(f"<i>{metadata['description']}</i>", info_style))
             story.append(Paragraph(f"<b>Kaynak Dil:</b> {metadata.get('source_language', 'N/A')}", info_style))
             story.append(Paragraph(f"<b>Hedef Dil:</b> {metadata.get('target_language', 'N/A')}", info_style))
-            story.append(Paragraph(f"<b>Bölüm Sayısı:</b> {len(chapters)}", info_style))
+            story.append(Paragraph(f"<b>Bölüm Sayısı:</b> {chapter_count}", info_style))
             story.append(Paragraph(f"<b>Oluşturulma:</b> {datetime.now().strftime('%d.%m.%Y %H:%M')}", info_style))
         
         story.append(Spacer(1, 24))
         story.append(PageBreak())
+        return story
+    
+    def _pdf_chapter_story(self, chapter: dict, styles: dict) -> list:
+        # Chapter title
+        story = [Paragraph(self._chapter_heading(chapter), styles['chapter_title']), Spacer(1, 12)]
+        
+        # Chapter text
+        paragraphs = (chapter.get('translated_text') or '').split('\n\n')
+        for para in paragraphs:
+            if para.strip():
+                story.append(Paragraph(para.strip(), styles['body']))
+                story.append(Spacer(1, 6))
+        
+        return story
+    
+    def export_to_pdf(self, project_name: str, chapters: list, metadata: dict = None,
+                      progress: Callable[[int], None] = None) -> str:
+        """Export chapters to PDF"""
+        filename = f"{project_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+        filepath = os.path.join(self.output_dir, filename)
+        
+        # Create PDF
+        doc = ProgressDocTemplate(
+            filepath,
+            progress=progress,
+            pagesize=A4,
+            rightMargin=72,
+            leftMargin=72,
+            topMargin=72,
+            bottomMargin=18
+        )
+        
+        styles = self._pdf_styles()
+        story = self._pdf_title_page(project_name, metadata, len(chapters), styles)
         
         # Add chapters
         for chapter in chapters:
-            chapter_num = chapter.get('chapter_number', 'N/A')
-            title = chapter.get('title', '')
-            text = chapter.get('translated_text', '')
+            story.extend(self._pdf_chapter_story(chapter, styles))
+            story.append(PageBreak())
+        
+        # Build PDF
+        doc.build(story)
+        
+        return filepath
+    
+    def render_pdf_segment(self, chapter: dict) -> dict:
+        """
+        Render one chapter as a standalone PDF segment for a segmented export.
+        
+        Segments are cached by the hash of their content, so unchanged chapters
+        are reused as-is by the next export of the project.
+        """
+        fragment_dir = os.path.join(self.output_dir, "fragments", "pdf")
+        if not os.path.exists(fragment_dir):
+            os.makedirs(fragment_dir)
+        
+        heading = self._chapter_heading(chapter)
+        text = chapter.get('translated_text') or ''
+        text_hash = hashlib.sha256(text.encode()).hexdigest()
+        key = hashlib.sha256(json.dumps([
+            self.TEMPLATE_VERSION, heading, text_hash
+        ]).encode()).hexdigest()
+        path = os.path.join(fragment_dir, f"{key}.pdf")
+        
+        reused = os.path.exists(path)
+        if reused:
+            os.utime(path)
+        else:
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            # Larger bottom margin leaves room for the page numbers stamped on merge
+            doc = SimpleDocTemplate(
+                temp_path,
+                pagesize=A4,
+                rightMargin=72,
+                leftMargin=72,
+                topMargin=72,
+                bottomMargin=36
+            )
+            doc.build(self._pdf_chapter_story(chapter, self._pdf_styles()))
+            os.replace(temp_path, path)
+        
+        return {
+            'id': chapter.get('id'),
+            'chapter_number': chapter.get('chapter_number'),
+            'title': chapter.get('title'),
+            'text_hash': text_hash,
+            'heading': heading,
+            'path': path,
+            'pages': len(PdfReader(path).pages),
+            'reused': reused
+        }
+    
+    def _pdf_front_matter(self, project_name: str, metadata: dict, segments: list) -> tuple:
+        """Title page plus table of contents; returns (path, page count)"""
+        filepath = os.path.join(self.output_dir, f"front_{uuid.uuid4().hex}.pdf")
+        styles = self._pdf_styles()
+        
+        # TOC page numbers depend on how long the TOC itself is, so lay it out until stable
+        front_pages = 2
+        for _ in range(5):
+            rows = []
+            page = front_pages + 1
+            for segment in segments:
+                rows.append([Paragraph(segment['heading'], styles['info']), str(page)])
+                page += segment['pages']
             
-            # Chapter title
-            chapter_heading = f"Bölüm {chapter_num}"
-            if title:
-                chapter_heading += f": {title}"
+            toc = Table(rows, colWidths=[A4[0] - 144 - 48, 48])
+            toc.setStyle(TableStyle([
+                ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+                ('VALIGN', (0, 0), (-1, -1), 'TOP')
+            ]))
             
-            story.append(Paragraph(chapter_heading, chapter_title_style))
+            story = self._pdf_title_page(project_name, metadata, len(segments), styles)
+            story.append(Paragraph("Bölümler", styles['chapter_title']))
             story.append(Spacer(1, 12))
+            story.append(toc)
             
-            # Chapter text
-            paragraphs = text.split('\n\n')
-            for para in paragraphs:
-                if para.strip():
-                    story.append(Paragraph(para.strip(), body_style))
-                    story.append(Spacer(1, 6))
+            SimpleDocTemplate(
+                filepath,
+                pagesize=A4,
+                rightMargin=72,
+                leftMargin=72,
+                topMargin=72,
+                bottomMargin=36
+            ).build(story)
             
-            story.append(PageBreak())
+            pages = len(PdfReader(filepath).pages)
+            if pages == front_pages:
+                break
+            front_pages = pages
         
-        # Build PDF
-        doc.build(story)
+        return filepath, front_pages
+    
+    def merge_pdf_segments(self, project_name: str, segments: list, metadata: dict = None) -> str:
+        """Join chapter segments behind a title page and TOC, with continuous page numbers"""
+        filename = f"{project_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+        filepath = os.path.join(self.output_dir, filename)
+        
+        front_path, front_pages = self._pdf_front_matter(project_name, metadata, segments)
+        
+        # Page numbers are appended to each page's own content stream; merging
+        # reportlab overlays instead re-parses every page and bloats the file
+        number_font = DictionaryObject({
+            NameObject('/Type'): NameObject('/Font'),
+            NameObject('/Subtype'): NameObject('/Type1'),
+            NameObject('/BaseFont'): NameObject('/Helvetica')
+        })
+        
+        try:
+            writer = PdfWriter()
+            for page in PdfReader(front_path).pages:
+                writer.add_page(page)
+            
+            for segment in segments:
+                start = len(writer.pages)
+                for page in PdfReader(segment['path']).pages:
+                    page = writer.add_page(page)
+                    page_number = str(len(writer.pages)).encode()
+                    
+                    fonts = page['/Resources'].get_object()['/Font'].get_object()
+                    fonts[NameObject('/FPageNo')] = number_font
+                    
+                    content = DecodedStreamObject()
+                    content.set_data(
+                        b"q\n" + page.get_contents().get_data() + b"\nQ\n"
+                        b"BT /FPageNo 9 Tf %.2f 18 Td (%s) Tj ET\n" % (
+                            (A4[0] - pdfmetrics.stringWidth(page_number.decode(), 'Helvetica', 9)) / 2,
+                            page_number
+                        )
+                    )
+                    page.replace_contents(content)
+                    page.compress_content_streams()
+                writer.add_outline_item(segment['heading'], start)
+            
+            with open(filepath, 'wb') as f:
+                writer.write(f)
+        finally:
+            os.remove(front_path)
+        
+        total_pages = front_pages + sum(segment['pages'] for segment in segments)
+        reused = sum(1 for segment in segments if segment.get('reused'))
+        print(f"📄 PDF: {len(segments) - reused} chapters rendered, {reused} reused, {total_pages} pages")
         
         return filepath
     
-    def export_to_epub(self, project_name: str, chapters: list, metadata: dict = None) -> str:
+    def export_to_epub(self, project_name: str, chapters: list, metadata: dict = None,
+                       progress: Callable[[int], None] = None) -> str:
         """Export chapters to EPUB"""
         filename = f"{project_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.epub"
         filepath = os.path.join(self.output_dir, filename)
@@ -131,6 +460,18 @@ class ExportService:
         book.set_language(metadata.get('target_language', 'tr'))
         book.add_author('Novel Translator')
         
+        # Chapter XHTML is rendered while the book is written, reusing cached fragments
+        fragment_dir = os.path.join(self.output_dir, "fragments", "epub")
+        if not os.path.exists(fragment_dir):
+            os.makedirs(fragment_dir)
+        
+        rendered = {'reused': 0, 'new': 0}
+        
+        def on_render(reused: bool):
+            rendered['reused' if reused else 'new'] += 1
+            if progress:
+                progress(rendered['reused'] + rendered['new'])
+        
         # Add chapters
         epub_chapters = []
         spine = ['nav']
@@ -138,28 +479,22 @@ class ExportService:
         for idx, chapter in enumerate(chapters):
             chapter_num = chapter.get('chapter_number', idx + 1)
             title = chapter.get('title', '')
-            text = chapter.get('translated_text', '')
+            text = chapter.get('translated_text', '') or ''
             
             # Create chapter
             chapter_title = f"Bölüm {chapter_num}"
             if title:
                 chapter_title += f": {title}"
             
-            epub_chapter = epub.EpubHtml(
+            epub_chapter = CachedEpubHtml(
+                fragment_dir,
+                text,
+                on_render,
                 title=chapter_title,
                 file_name=f'chapter_{chapter_num}.xhtml',
                 lang=metadata.get('target_language', 'tr')
             )
             
-            # Format content
-            content = f'<h1>{chapter_title}</h1>'
-            paragraphs = text.split('\n\n')
-            for para in paragraphs:
-                if para.strip():
-                    content += f'<p>{para.strip()}</p>'
-            
-            epub_chapter.content = content
-            
             book.add_item(epub_chapter)
             epub_chapters.append(epub_chapter)
             spine.append(epub_chapter)
@@ -200,11 +535,14 @@ class ExportService:
         book.spine = spine
         
         # Write EPUB file
-        epub.write_epub(filepath, book)
+        # Chapters carry no page markers; skip the page-list scan that would re-parse every chapter
+        epub.write_epub(filepath, book, {'epub3_pages': False})
+        print(f"📚 EPUB: {rendered['new']} chapters rendered, {rendered['reused']} reused")
         
         return filepath
     
-    def export_to_docx(self, project_name: str, chapters: list, metadata: dict = None) -> str:
+    def export_to_docx(self, project_name: str, chapters: list, metadata: dict = None,
+                       progress: Callable[[int], None] = None) -> str:
         """Export chapters to DOCX"""
         filename = f"{project_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
         filepath = os.path.join(self.output_dir, filename)
@@ -238,7 +576,7 @@ class ExportService:
         doc.add_page_break()
         
         # Add chapters
-        for chapter in chapters:
+        for idx, chapter in enumerate(chapters):
             chapter_num = chapter.get('chapter_number', 'N/A')
             title = chapter.get('title', '')
             text = chapter.get('translated_text', '')
@@ -263,51 +601,172 @@ class ExportService:
                         run.font.name = 'Georgia'
             
             doc.add_page_break()
+            
+            if progress:
+                progress(idx + 1)
         
         # Save document
         doc.save(filepath)
         
         return filepath
     
+    @staticmethod
+    def iter_chapters(project_id: int, status: str = "completed", batch_size: int = 50,
+                      chapter_ids: List[int] = None, start_chapter: int = None,
+                      end_chapter: int = None) -> Iterator[dict]:
+        """
+        Yield chapter dicts in chapter order, fetching them batch by batch.
+        
+        Uses its own session so it can outlive the request that started it
+        (streaming responses, background exports).
+        """
+        db = SessionLocal()
+        try:
+            query = db.query(
+                Chapter.id,
+                Chapter.chapter_number,
+                Chapter.title,
+                Chapter.translated_text
+            ).filter(
+                Chapter.project_id == project_id,
+                Chapter.status == status
+            )
+            if chapter_ids is not None:
+                query = query.filter(Chapter.id.in_(chapter_ids))
+            if start_chapter is not None:
+                query = query.filter(Chapter.chapter_number >= start_chapter)
+            if end_chapter is not None:
+                query = query.filter(Chapter.chapter_number <= end_chapter)
+            query = query.order_by(Chapter.chapter_number).yield_per(batch_size)
+            
+            for row in query:
+                yield {
+                    "id": row.id,
+                    "chapter_number": row.chapter_number,
+                    "title": row.title,
+                    "translated_text": row.translated_text
+                }
+        finally:
+            db.close()
+    
+    @staticmethod
+    def plan_volumes(project_id: int, start_chapter: int = None, end_chapter: int = None,
+                     volume_chapters: int = None, volume_bytes: int = None) -> List[dict]:
+        """
+        Split completed chapters into consecutive volumes.
+        
+        A volume is closed when it reaches volume_chapters chapters or when the
+        next chapter would take its translated text past volume_bytes; a single
+        chapter larger than volume_bytes still gets a volume of its own.
+        """
+        db = SessionLocal()
+        try:
+            query = db.query(
+                Chapter.chapter_number,
+                func.length(cast(Chapter.translated_text, LargeBinary))
+            ).filter(
+                Chapter.project_id == project_id,
+                Chapter.status == "completed"
+            )
+            if start_chapter is not None:
+                query = query.filter(Chapter.chapter_number >= start_chapter)
+            if end_chapter is not None:
+                query = query.filter(Chapter.chapter_number <= end_chapter)
+            
+            volumes = []
+            current = None
+            for chapter_number, size in query.order_by(Chapter.chapter_number).yield_per(1000):
+                size = size or 0
+                if current is None or (
+                    volume_chapters and current['chapter_count'] >= volume_chapters
+                ) or (
+                    volume_bytes and current['bytes'] + size > volume_bytes
+                ):
+                    current = {
+                        'volume': len(volumes) + 1,
+                        'start_chapter': chapter_number,
+                        'end_chapter': chapter_number,
+                        'chapter_count': 0,
+                        'bytes': 0
+                    }
+                    volumes.append(current)
+                
+                current['end_chapter'] = chapter_number
+                current['chapter_count'] += 1
+                current['bytes'] += size
+            
+            return volumes
+        finally:
+            db.close()
+    
+    def stream_txt(self, project_name: str, chapters: Iterable[dict], chapter_count: int,
+                   metadata: dict = None) -> Iterator[str]:
+        """Yield a plain text export piece by piece, one chapter at a time"""
+        # Title
+        yield (
+            f"{'=' * 60}\n"
+            f"{project_name.center(60)}\n"
+            f"{'=' * 60}\n\n"
+        )
+        
+        # Metadata
+        if metadata:
+            header = ""
+            if metadata.get('description'):
+                header += f"{metadata['description']}\n\n"
+            header += f"Kaynak Dil: {metadata.get('source_language', 'N/A')}\n"
+            header += f"Hedef Dil: {metadata.get('target_language', 'N/A')}\n"
+            header += f"Bölüm Sayısı: {chapter_count}\n"
+            header += f"Oluşturulma: {datetime.now().strftime('%d.%m.%Y %H:%M')}\n\n"
+            yield header
+        
+        yield f"{'=' * 60}\n\n"
+        
+        # Chapters
+        for chapter in chapters:
+            chapter_num = chapter.get('chapter_number', 'N/A')
+            title = chapter.get('title', '')
+            text = chapter.get('translated_text', '')
+            
+            # Chapter title
+            chapter_heading = f"Bölüm {chapter_num}"
+            if title:
+                chapter_heading += f": {title}"
+            
+            yield (
+                f"\n\n{chapter_heading}\n"
+                f"{'-' * len(chapter_heading)}\n\n"
+                f"{text}\n\n"
+            )
+    
+    def stream_txt_volumes(self, project_id: int, project_name: str, volumes: List[dict],
+                           metadata: dict = None) -> Iterator[bytes]:
+        """Yield a ZIP archive with one plain text file per volume"""
+        buffer = ZipStreamBuffer()
+        
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for volume in volumes:
+                volume_name = f"{project_name} - Cilt {volume['volume']}"
+                chapters = self.iter_chapters(
+                    project_id,
+                    start_chapter=volume['start_chapter'],
+                    end_chapter=volume['end_chapter']
+                )
+                
+                with archive.open(f"{volume_name}.txt", 'w') as entry:
+                    for piece in self.stream_txt(volume_name, chapters, volume['chapter_count'], metadata):
+                        entry.write(piece.encode('utf-8'))
+                        yield buffer.drain()
+        
+        yield buffer.drain()
+    
     def export_to_txt(self, project_name: str, chapters: list, metadata: dict = None) -> str:
         """Export chapters to plain text"""
         filename = f"{project_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
         filepath = os.path.join(self.output_dir, filename)
         
         with open(filepath, 'w', encoding='utf-8') as f:
-            # Title
-            f.write(f"{'=' * 60}\n")
-            f.write(f"{project_name.center(60)}\n")
-            f.write(f"{'=' * 60}\n\n")
-            
-            # Metadata
-            if metadata:
-                if metadata.get('description'):
-                    f.write(f"{metadata['description']}\n\n")
-                f.write(f"Kaynak Dil: {metadata.get('source_language', 'N/A')}\n")
-                f.write(f"Hedef Dil: {metadata.get('target_language', 'N/A')}\n")
-                f.write(f"Bölüm Sayısı: {len(chapters)}\n")
-                f.write(f"Oluşturulma: {datetime.now().strftime('%d.%m.%Y %H:%M')}\n\n")
-            
-            f.write(f"{'=' * 60}\n\n")
-            
-            # Chapters
-            for chapter in chapters:
-                chapter_num = chapter.get('chapter_number', 'N/A')
-                title = chapter.get('title', '')
-                text = chapter.get('translated_text', '')
-                
-                # Chapter title
-                chapter_heading = f"Bölüm {chapter_num}"
-                if title:
-                    chapter_heading += f": {title}"
-                
-                f.write(f"\n\n{chapter_heading}\n")
-                f.write(f"{'-' * len(chapter_heading)}\n\n")
-                
-                # Chapter text
-                f.write(text)
-                f.write("\n\n")
+            for piece in self.stream_txt(project_name, chapters, len(chapters), metadata):
+                f.write(piece)
         
         return filepath
-
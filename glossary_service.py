@@ -1,20 +1,351 @@
 """
 Advanced Glossary Service - Enhanced term management
 """
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set, Callable, Iterator, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, func
-from database import GlossaryEntry
+from sqlalchemy import or_, func, case, select, update, delete, inspect, insert
+from database import GlossaryEntry, SessionLocal
+from config import settings
+import pandas as pd
+import numpy as np
+import csv
+import io
+import os
 import re
+import math
+import itertools
+import threading
+import uuid
+from datetime import datetime, timedelta
 from difflib import SequenceMatcher
 
 
+# Global counter so a rebuilt index never reuses an old version number
+_index_versions = itertools.count(1)
+
+# Characters are counted in this many columns (code point modulo)
+CHAR_COLUMNS = 64
+
+
+class LengthBucket:
+    """Character counts of all indexed terms of one length, one row per entry"""
+    
+    def __init__(self):
+        self.ids: List[int] = []
+        self.rows: Dict[int, int] = {}
+        self.counts = np.zeros((16, CHAR_COLUMNS), dtype=np.uint16)
+    
+    @staticmethod
+    def char_counts(key: str) -> np.ndarray:
+        codes = np.frombuffer(key.encode('utf-32-le'), dtype=np.uint32) % CHAR_COLUMNS
+        return np.bincount(codes, minlength=CHAR_COLUMNS)
+    
+    def add(self, entry_id: int, key: str):
+        if len(self.ids) == len(self.counts):
+            self.counts = np.concatenate([self.counts, np.zeros_like(self.counts)])
+        self.rows[entry_id] = len(self.ids)
+        self.counts[len(self.ids)] = self.char_counts(key)
+        self.ids.append(entry_id)
+    
+    def remove(self, entry_id: int):
+        # Move the last row into the freed one
+        row = self.rows.pop(entry_id)
+        last_id = self.ids.pop()
+        if last_id != entry_id:
+            self.counts[row] = self.counts[len(self.ids)]
+            self.ids[row] = last_id
+            self.rows[last_id] = row
+
+
+class TrigramIndex:
+    """In-memory character trigram index over a project's original terms"""
+    
+    def __init__(self):
+        self.entries: Dict[int, Dict] = {}
+        self.keys: Dict[int, str] = {}
+        self.postings: Dict[str, Set[int]] = {}
+        self.lengths: Dict[int, LengthBucket] = {}
+        self.version = next(_index_versions)
+    
+    @staticmethod
+    def trigrams(text: str) -> Set[str]:
+        """Padded character trigrams, so short terms still produce grams"""
+        padded = f"  {text} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+    
+    def add(self, entry_id: int, original_term: str, translated_term: str, term_type: str):
+        """Add or replace an entry"""
+        self.remove(entry_id)
+        
+        key = original_term.lower()
+        self.keys[entry_id] = key
+        self.entries[entry_id] = {
+            'id': entry_id,
+            'original_term': original_term,
+            'translated_term': translated_term,
+            'term_type': term_type
+        }
+        for gram in self.trigrams(key):
+            self.postings.setdefault(gram, set()).add(entry_id)
+        self.lengths.setdefault(len(key), LengthBucket()).add(entry_id, key)
+        self.version = next(_index_versions)
+    
+    def remove(self, entry_id: int):
+        """Remove an entry if present"""
+        key = self.keys.pop(entry_id, None)
+        if key is None:
+            return
+        
+        self.entries.pop(entry_id, None)
+        for gram in self.trigrams(key):
+            ids = self.postings.get(gram)
+            if ids:
+                ids.discard(entry_id)
+                if not ids:
+                    del self.postings[gram]
+        
+        bucket = self.lengths[len(key)]
+        bucket.remove(entry_id)
+        if not bucket.ids:
+            del self.lengths[len(key)]
+        self.version = next(_index_versions)
+    
+    def update_type(self, entry_id: int, term_type: str):
+        """Update the cached term type of an entry"""
+        if entry_id in self.entries:
+            self.entries[entry_id]['term_type'] = term_type
+            self.version = next(_index_versions)
+    
+    def most_similar(self, key: str, threshold: float, limit: int = 5) -> List[Tuple[int, float]]:
+        """
+        The limit best (entry_id, rounded similarity) matches for key, ranked
+        as a full scan with SequenceMatcher(None, key, other).ratio() would
+        rank them: by similarity rounded to two places, ties by entry id.
+        
+        ratio() is 2 * matched / (len_a + len_b), and matched characters can
+        exceed neither the shorter length, nor the characters both terms
+        contain, nor their longest common subsequence. Lengths are visited
+        best bound first and rows by their character bound, so scanning stops
+        as soon as nothing left can reach the current top results; only the
+        few terms passing all three bounds are scored.
+        """
+        length = len(key)
+        query = LengthBucket.char_counts(key)
+        columns = np.flatnonzero(query)
+        
+        # Bit-parallel LCS against key (Hyyrö): one bit mask per character
+        masks: Dict[str, int] = {}
+        for position, char in enumerate(key):
+            masks[char] = masks.get(char, 0) | (1 << position)
+        full = (1 << length) - 1
+        char_mask = masks.get
+        
+        length_bound = lambda other: 2.0 * min(length, other) / ((length + other) or 1)
+        lengths = sorted((other for other in self.lengths if length_bound(other) >= threshold),
+                         key=lambda other: (-length_bound(other), other))
+        
+        best: List[Tuple[float, int]] = []
+        # Lowest similarity that can still round into the results
+        cutoff = threshold
+        
+        for other_length in lengths:
+            if length_bound(other_length) < cutoff:
+                break
+            
+            bucket = self.lengths[other_length]
+            shared = np.minimum(bucket.counts[:len(bucket.ids), columns], query[columns]).sum(1)
+            bounds = 2.0 * shared / ((length + other_length) or 1)
+            rows = np.flatnonzero(bounds >= cutoff)
+            rows = rows[np.argsort(-bounds[rows], kind='stable')]
+            
+            for row, bound in zip(rows.tolist(), bounds[rows].tolist()):
+                if bound < cutoff:
+                    break
+                entry_id = bucket.ids[row]
+                other = self.keys[entry_id]
+                if other == key:
+                    continue
+                
+                vector = full
+                for char in other:
+                    matches = vector & char_mask(char, 0)
+                    vector = (vector + matches) | (vector - matches)
+                common = length - bin(vector & full).count('1')
+                if 2.0 * common / ((length + other_length) or 1) < cutoff:
+                    continue
+                
+                similarity = SequenceMatcher(None, key, other).ratio()
+                if similarity >= threshold:
+                    best.append((-round(similarity, 2), entry_id))
+                    best.sort()
+                    del best[limit:]
+                    if len(best) == limit:
+                        cutoff = max(threshold, -best[-1][0] - 0.00501)
+        
+        return [(entry_id, -rounded) for rounded, entry_id in best]
+    
+    @staticmethod
+    def min_shared_trigrams(length: int, other_length: int, gram_count: int, threshold: float) -> int:
+        """
+        Fewest of its gram_count trigrams a term of this length must share with
+        one of other_length for their ratio() to exceed threshold.
+        
+        That needs matched > threshold * (length + other_length) / 2
+        characters. Each unmatched character of the term spoils at most its
+        three padded trigrams, and each unmatched one of the other term at
+        most two (the gap it leaves), so every other trigram is shared.
+        """
+        matched = int(threshold * (length + other_length) / 2) + 1
+        return gram_count - 3 * (length - matched) - 2 * (other_length - matched)
+    
+    def similar_pairs(self, threshold: float,
+                      progress: Callable[[int], None] = None) -> Iterator[Tuple[int, int, float]]:
+        """
+        Yield (id1, id2, similarity) for entry pairs whose ratio exceeds threshold.
+        
+        Candidates come from prefix filtering: each term's grams are ordered
+        rarest first and only the first len - overlap + 1 are indexed, where
+        overlap is min_shared_trigrams() at the least demanding compatible
+        length, so any pair above threshold meets in some posting list. Terms
+        whose bound is zero (short or repetitive ones) are also compared with
+        each other directly. Everything else is never compared.
+        """
+        gram_order = lambda gram: (len(self.postings.get(gram, ())), gram)
+        lengths = sorted(self.lengths)
+        
+        prefix_postings: Dict[str, List[int]] = {}
+        prefixes: Dict[int, List[str]] = {}
+        gram_sets: Dict[int, Set[str]] = {}
+        unbounded: List[int] = []
+        for entry_id in sorted(self.keys):
+            key = self.keys[entry_id]
+            gram_sets[entry_id] = self.trigrams(key)
+            grams = sorted(gram_sets[entry_id], key=gram_order)
+            overlap = min((
+                self.min_shared_trigrams(len(key), other, len(grams), threshold)
+                for other in lengths
+                if 2.0 * min(len(key), other) / ((len(key) + other) or 1) > threshold
+            ), default=0)
+            if overlap < 1:
+                unbounded.append(entry_id)
+            prefix = grams[:len(grams) - max(overlap, 1) + 1]
+            prefixes[entry_id] = prefix
+            for gram in prefix:
+                prefix_postings.setdefault(gram, []).append(entry_id)
+        unbounded_ids = set(unbounded)
+        
+        total = len(prefixes)
+        matcher = SequenceMatcher()
+        
+        for done, (entry_id, prefix) in enumerate(prefixes.items(), 1):
+            key = self.keys[entry_id]
+            grams = gram_sets[entry_id]
+            matcher.set_seq2(key)
+            
+            seen = set()
+            for gram in prefix:
+                for other_id in prefix_postings[gram]:
+                    # Ids are ascending, so every pair is visited once
+                    if other_id > entry_id:
+                        seen.add(other_id)
+            if entry_id in unbounded_ids:
+                seen.update(other_id for other_id in unbounded if other_id > entry_id)
+            
+            for other_id in sorted(seen):
+                other = self.keys[other_id]
+                length = len(key) + len(other)
+                if 2.0 * min(len(key), len(other)) / (length or 1) <= threshold:
+                    continue
+                
+                # Meeting in a prefix doesn't mean sharing enough grams
+                other_grams = gram_sets[other_id]
+                shared = len(grams & other_grams)
+                if shared < self.min_shared_trigrams(len(key), len(other), len(grams), threshold) \
+                        or shared < self.min_shared_trigrams(len(other), len(key), len(other_grams), threshold):
+                    continue
+                
+                matcher.set_seq1(other)
+                if matcher.quick_ratio() <= threshold:
+                    continue
+                
+                # Same argument order as before, so scores are unchanged
+                similarity = SequenceMatcher(None, key, other).ratio()
+                if similarity > threshold:
+                    yield entry_id, other_id, similarity
+            
+            if progress and (done % 500 == 0 or done == total):
+                progress(int(done / total * 100))
+
+
 class GlossaryService:
     """Advanced glossary management service"""
     
+    # Trigram indexes per project, shared by all service instances
+    _indexes: Dict[int, TrigramIndex] = {}
+    
+    # Consistency analysis jobs and results (keyed by job id / project id)
+    _consistency_jobs: Dict[str, Dict] = {}
+    _consistency_results: Dict[int, Dict] = {}
+    _consistency_lock = threading.Lock()
+    
+    # Glossary import jobs (keyed by job id)
+    _import_jobs: Dict[str, Dict] = {}
+    
+    IMPORT_BATCH_SIZE = 5000
+    
     def __init__(self, db: Session):
         self.db = db
     
+    @staticmethod
+    def _prune_jobs(jobs: Dict[str, Dict]):
+        """Forget jobs that finished more than JOB_RETENTION_MINUTES ago"""
+        cutoff = datetime.utcnow() - timedelta(minutes=settings.JOB_RETENTION_MINUTES)
+        for job_id, job in list(jobs.items()):
+            if job['completed_at'] and datetime.fromisoformat(job['completed_at']) < cutoff:
+                del jobs[job_id]
+    
+    def _get_index(self, project_id: int) -> TrigramIndex:
+        """Get the trigram index for a project, building it on first use"""
+        index = self._indexes.get(project_id)
+        if index is not None:
+            return index
+        
+        index = TrigramIndex()
+        rows = self.db.query(
+            GlossaryEntry.id,
+            GlossaryEntry.original_term,
+            GlossaryEntry.translated_term,
+            GlossaryEntry.term_type
+        ).filter(
+            GlossaryEntry.project_id == project_id
+        ).all()
+        
+        for entry_id, original_term, translated_term, term_type in rows:
+            index.add(entry_id, original_term, translated_term, term_type)
+        
+        self._indexes[project_id] = index
+        return index
+    
+    @classmethod
+    def index_entry(cls, entry: GlossaryEntry):
+        """Reflect an added or edited entry in its project's index (if built)"""
+        index = cls._indexes.get(entry.project_id)
+        if index is not None:
+            index.add(entry.id, entry.original_term, entry.translated_term, entry.term_type)
+    
+    @classmethod
+    def unindex_entries(cls, project_id: int, entry_ids: List[int]):
+        """Drop deleted entries from a project's index (if built)"""
+        index = cls._indexes.get(project_id)
+        if index is not None:
+            for entry_id in entry_ids:
+                index.remove(entry_id)
+    
+    @classmethod
+    def invalidate_index(cls, project_id: int):
+        """Discard a project's index; it is rebuilt on the next lookup"""
+        cls._indexes.pop(project_id, None)
+    
     def search_terms(self, project_id: int, query: str, term_type: str = None,
                     confirmed_only: bool = False) -> List[GlossaryEntry]:
         """Search glossary terms with filters"""
@@ -46,29 +377,13 @@ class GlossaryService:
     def find_similar_terms(self, project_id: int, term: str, threshold: float = 0.7) -> List[Dict]:
         """Find similar terms in glossary (for consistency checking)"""
         
-        all_terms = self.db.query(GlossaryEntry).filter(
-            GlossaryEntry.project_id == project_id
-        ).all()
-        
-        similar = []
-        
-        for entry in all_terms:
-            # Calculate similarity
-            similarity = SequenceMatcher(None, term.lower(), entry.original_term.lower()).ratio()
-            
-            if similarity >= threshold and term.lower() != entry.original_term.lower():
-                similar.append({
-                    'id': entry.id,
-                    'original_term': entry.original_term,
-                    'translated_term': entry.translated_term,
-                    'similarity': round(similarity, 2),
-                    'term_type': entry.term_type
-                })
-        
-        # Sort by similarity
-        similar.sort(key=lambda x: x['similarity'], reverse=True)
+        index = self._get_index(project_id)
         
-        return similar[:5]  # Top 5
+        # Top 5, ties in table order as a full scan would return them
+        return [
+            dict(index.entries[entry_id], similarity=similarity)
+            for entry_id, similarity in index.most_similar(term.lower(), threshold, limit=5)
+        ]
     
     def get_statistics(self, project_id: int) -> Dict:
         """Get comprehensive glossary statistics"""
@@ -152,6 +467,7 @@ class GlossaryService:
         ).delete(synchronize_session=False)
         
         self.db.commit()
+        self.unindex_entries(project_id, term_ids)
         
         return deleted
     
@@ -165,53 +481,327 @@ class GlossaryService:
         
         self.db.commit()
         
+        index = self._indexes.get(project_id)
+        if index is not None:
+            for term_id in term_ids:
+                index.update_type(term_id, new_type)
+        
         return updated
     
+    def _merge_duplicates(self, project_id: Optional[int] = None) -> int:
+        """Merge duplicates with two set-based statements (all projects if project_id is None)"""
+        
+        partition = [GlossaryEntry.project_id, GlossaryEntry.original_term]
+        
+        ranked = select(
+            GlossaryEntry.id,
+            func.row_number().over(
+                partition_by=partition,
+                order_by=[
+                    GlossaryEntry.confirmed.desc(),
+                    GlossaryEntry.usage_count.desc(),
+                    GlossaryEntry.id
+                ]
+            ).label('rank'),
+            func.count().over(partition_by=partition).label('copies'),
+            func.sum(func.coalesce(GlossaryEntry.usage_count, 0)).over(
+                partition_by=partition
+            ).label('total_usage'),
+            func.max(case((GlossaryEntry.confirmed == True, 1), else_=0)).over(
+                partition_by=partition
+            ).label('any_confirmed')
+        )
+        if project_id is not None:
+            ranked = ranked.where(GlossaryEntry.project_id == project_id)
+        ranked = ranked.subquery()
+        
+        # Keep first (most used/confirmed) row and fold the others into it
+        self.db.execute(
+            update(GlossaryEntry).where(
+                GlossaryEntry.id == ranked.c.id,
+                ranked.c.rank == 1,
+                ranked.c.copies > 1
+            ).values(
+                usage_count=ranked.c.total_usage,
+                confirmed=ranked.c.any_confirmed == 1
+            ).execution_options(synchronize_session=False)
+        )
+        
+        result = self.db.execute(
+            delete(GlossaryEntry).where(
+                GlossaryEntry.id.in_(select(ranked.c.id).where(ranked.c.rank > 1))
+            ).execution_options(synchronize_session=False)
+        )
+        
+        return result.rowcount
+    
     def merge_duplicates(self, project_id: int) -> int:
         """Merge duplicate terms (same original_term)"""
         
-        # Find duplicates
-        duplicates = self.db.query(
-            GlossaryEntry.original_term,
-            func.count(GlossaryEntry.id).label('count')
-        ).filter(
-            GlossaryEntry.project_id == project_id
-        ).group_by(
-            GlossaryEntry.original_term
-        ).having(
-            func.count(GlossaryEntry.id) > 1
-        ).all()
+        try:
+            merged_count = self._merge_duplicates(project_id)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
         
-        merged_count = 0
-        
-        for original_term, count in duplicates:
-            # Get all entries for this term
-            entries = self.db.query(GlossaryEntry).filter(
-                GlossaryEntry.project_id == project_id,
-                GlossaryEntry.original_term == original_term
-            ).order_by(
-                GlossaryEntry.confirmed.desc(),
-                GlossaryEntry.usage_count.desc()
-            ).all()
-            
-            if len(entries) <= 1:
-                continue
-            
-            # Keep first (most used/confirmed), merge others
-            keep = entries[0]
-            duplicates_to_remove = entries[1:]
-            
-            for dup in duplicates_to_remove:
-                keep.usage_count += dup.usage_count
-                if not keep.confirmed and dup.confirmed:
-                    keep.confirmed = True
-                self.db.delete(dup)
-                merged_count += 1
+        self.invalidate_index(project_id)
+        
+        return merged_count
+    
+    def ensure_unique_terms(self) -> int:
+        """Merge existing duplicates and add the (project_id, original_term) unique index"""
         
+        bind = self.db.get_bind()
+        unique_index = next(
+            i for i in GlossaryEntry.__table__.indexes if i.name == 'uq_glossary_project_term'
+        )
+        if unique_index.name in {i['name'] for i in inspect(bind).get_indexes('glossary_entries')}:
+            return 0
+        
+        merged_count = self._merge_duplicates()
         self.db.commit()
+        unique_index.create(bind=bind, checkfirst=True)
+        self._indexes.clear()
+        
+        if merged_count:
+            print(f"✅ Merged {merged_count} duplicate glossary terms")
         
         return merged_count
     
+    @staticmethod
+    def stream_csv(project_id: int, batch_size: int = 1000) -> Iterator[str]:
+        """Yield the glossary as CSV text, batch by batch, using its own session"""
+        
+        columns = ['original_term', 'translated_term', 'term_type', 'context', 'usage_count', 'confirmed']
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        
+        # BOM first so Excel detects UTF-8
+        buffer.write('\ufeff')
+        writer.writerow(columns)
+        
+        db = SessionLocal()
+        try:
+            query = db.query(
+                *[getattr(GlossaryEntry, c) for c in columns]
+            ).filter(
+                GlossaryEntry.project_id == project_id
+            ).order_by(GlossaryEntry.id).yield_per(batch_size)
+            
+            for count, row in enumerate(query, 1):
+                writer.writerow(row)
+                if count % batch_size == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+        finally:
+            db.close()
+        
+        yield buffer.getvalue()
+    
+    @classmethod
+    def read_import_file(cls, fileobj, filename: str,
+                         batch_size: int = None) -> Iterator[Tuple[pd.DataFrame, float]]:
+        """
+        Yield (batch, fraction_read) from a CSV/Excel upload without loading it whole.
+        
+        CSV is parsed in pandas chunks and XLSX through openpyxl's read-only mode;
+        legacy XLS has no streaming reader and is read in one go.
+        """
+        batch_size = batch_size or cls.IMPORT_BATCH_SIZE
+        name = filename.lower()
+        
+        fileobj.seek(0, os.SEEK_END)
+        size = fileobj.tell() or 1
+        fileobj.seek(0)
+        
+        if name.endswith('.csv'):
+            for chunk in pd.read_csv(fileobj, chunksize=batch_size, dtype=str, keep_default_na=False):
+                yield chunk, min(fileobj.tell() / size, 1.0)
+        
+        elif name.endswith('.xlsx'):
+            from openpyxl import load_workbook
+            
+            workbook = load_workbook(fileobj, read_only=True, data_only=True)
+            try:
+                sheet = workbook.active
+                total_rows = sheet.max_row or 1
+                rows = sheet.iter_rows(values_only=True)
+                header = [str(h).strip() if h is not None else '' for h in next(rows, ())]
+                
+                batch = []
+                read = 1
+                for row in rows:
+                    batch.append(row)
+                    read += 1
+                    if len(batch) >= batch_size:
+                        yield pd.DataFrame(batch, columns=header, dtype=str), min(read / total_rows, 1.0)
+                        batch = []
+                if batch:
+                    yield pd.DataFrame(batch, columns=header, dtype=str), 1.0
+            finally:
+                workbook.close()
+        
+        elif name.endswith('.xls'):
+            df = pd.read_excel(fileobj, dtype=str)
+            for start in range(0, len(df), batch_size):
+                yield df.iloc[start:start + batch_size], min((start + batch_size) / max(len(df), 1), 1.0)
+        
+        else:
+            raise ValueError("Invalid file format. Use CSV or Excel")
+    
+    def import_terms(self, project_id: int, batches: Iterator[Tuple[pd.DataFrame, float]],
+                     update_existing: bool = False,
+                     progress: Callable[[Dict], None] = None) -> Dict:
+        """
+        Import glossary batches with one lookup query and bulk writes per batch.
+        
+        Rows repeating a term seen earlier in the file are skipped. Terms that
+        already exist are skipped, or overwritten when update_existing is set.
+        """
+        counts = {'rows': 0, 'inserted': 0, 'updated': 0, 'skipped': 0}
+        seen: Set[str] = set()
+        
+        try:
+            for df, fraction in batches:
+                missing = [c for c in ('original_term', 'translated_term') if c not in df.columns]
+                if missing:
+                    raise ValueError("File must contain columns: ['original_term', 'translated_term']")
+                
+                counts['rows'] += len(df)
+                
+                # Normalize the batch column-wise instead of row by row
+                batch = pd.DataFrame({
+                    'original_term': df['original_term'].fillna('').astype(str).str.strip(),
+                    'translated_term': df['translated_term'].fillna('').astype(str).str.strip(),
+                    'term_type': (
+                        df['term_type'].fillna('').astype(str).str.strip()
+                        if 'term_type' in df.columns else ''
+                    ),
+                    'context': (
+                        df['context'].fillna('').astype(str).str.strip()
+                        if 'context' in df.columns else ''
+                    )
+                })
+                batch.loc[batch['term_type'] == '', 'term_type'] = 'general'
+                batch['context'] = batch['context'].where(batch['context'] != '', None)
+                
+                valid = (batch['original_term'] != '') & (batch['translated_term'] != '')
+                batch = batch[valid & ~batch['original_term'].isin(seen)]
+                batch = batch.drop_duplicates('original_term', keep='first')
+                seen.update(batch['original_term'])
+                
+                # Blank rows and repeats within the file
+                counts['skipped'] += len(df) - len(batch)
+                
+                if batch.empty:
+                    if progress:
+                        progress(dict(counts, progress=int(fraction * 100)))
+                    continue
+                
+                # One query resolves every existing term in the batch
+                existing = dict(self.db.execute(
+                    select(GlossaryEntry.original_term, GlossaryEntry.id).where(
+                        GlossaryEntry.project_id == project_id,
+                        GlossaryEntry.original_term.in_(batch['original_term'].tolist())
+                    )
+                ).all())
+                
+                is_new = ~batch['original_term'].isin(existing.keys())
+                new_rows = batch[is_new]
+                old_rows = batch[~is_new]
+                
+                if not new_rows.empty:
+                    records = new_rows.to_dict('records')
+                    for record in records:
+                        record['project_id'] = project_id
+                        record['confirmed'] = True
+                    self.db.execute(insert(GlossaryEntry), records)
+                    counts['inserted'] += len(records)
+                
+                if not old_rows.empty:
+                    if update_existing:
+                        now = datetime.utcnow()
+                        records = [
+                            {
+                                'id': existing[record['original_term']],
+                                'translated_term': record['translated_term'],
+                                'term_type': record['term_type'],
+                                'context': record['context'],
+                                'confirmed': True,
+                                'updated_at': now
+                            }
+                            for record in old_rows.to_dict('records')
+                        ]
+                        self.db.execute(update(GlossaryEntry), records)
+                        counts['updated'] += len(records)
+                    else:
+                        counts['skipped'] += len(old_rows)
+                
+                if progress:
+                    progress(dict(counts, progress=int(fraction * 100)))
+            
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        finally:
+            self.invalidate_index(project_id)
+        
+        return counts
+    
+    @classmethod
+    def start_import_job(cls, project_id: int, path: str, filename: str,
+                         update_existing: bool = False) -> Dict:
+        """Import a spooled upload in a background thread; the file is removed afterwards"""
+        
+        job = {
+            'job_id': uuid.uuid4().hex,
+            'project_id': project_id,
+            'status': 'processing',
+            'progress': 0,
+            'rows': 0,
+            'inserted': 0,
+            'updated': 0,
+            'skipped': 0,
+            'started_at': datetime.utcnow().isoformat(),
+            'completed_at': None
+        }
+        cls._prune_jobs(cls._import_jobs)
+        cls._import_jobs[job['job_id']] = job
+        
+        def run():
+            db = SessionLocal()
+            try:
+                with open(path, 'rb') as f:
+                    counts = cls(db).import_terms(
+                        project_id,
+                        cls.read_import_file(f, filename),
+                        update_existing=update_existing,
+                        progress=job.update
+                    )
+                job.update(counts)
+                job['status'] = 'completed'
+                job['progress'] = 100
+            except Exception as e:
+                job['status'] = 'failed'
+                job['error'] = str(e)
+            finally:
+                db.close()
+                job['completed_at'] = datetime.utcnow().isoformat()
+                if os.path.exists(path):
+                    os.remove(path)
+        
+        threading.Thread(target=run, daemon=True).start()
+        
+        return job
+    
+    @classmethod
+    def get_import_job(cls, job_id: str) -> Optional[Dict]:
+        """Get status of a glossary import job"""
+        return cls._import_jobs.get(job_id)
+    
     def suggest_translations(self, original_term: str, target_lang: str = "tr") -> List[str]:
         """Suggest possible translations based on patterns"""
         
@@ -251,38 +841,128 @@ class GlossaryService:
         
         return suggestions[:3]  # Top 3 suggestions
     
-    def analyze_consistency(self, project_id: int) -> Dict:
+    def analyze_consistency(self, project_id: int, progress: Callable[[int], None] = None) -> Dict:
         """Analyze translation consistency"""
         
-        entries = self.db.query(GlossaryEntry).filter(
-            GlossaryEntry.project_id == project_id
-        ).all()
+        index = self._get_index(project_id)
+        cached = self._consistency_results.get(project_id)
+        if cached and cached['version'] == index.version:
+            return cached
+        
+        # Snapshot, so glossary writes during the analysis can't disturb it
+        version = index.version
+        entries = [dict(e) for e in index.entries.values()]
+        
+        result = self._find_consistency_issues(entries, progress)
+        result['version'] = version
+        self._consistency_results[project_id] = result
+        
+        return result
+    
+    @staticmethod
+    def _find_consistency_issues(entries: List[Dict], progress: Callable[[int], None] = None) -> Dict:
+        """Find similar original terms with different translations"""
+        
+        snapshot = TrigramIndex()
+        for e in entries:
+            snapshot.add(e['id'], e['original_term'], e['translated_term'], e['term_type'])
         
         issues = []
         
-        # Find potential issues
-        for i, entry in enumerate(entries):
-            # Check for similar original terms with different translations
-            for other in entries[i+1:]:
-                similarity = SequenceMatcher(
-                    None,
-                    entry.original_term.lower(),
-                    other.original_term.lower()
-                ).ratio()
-                
-                if similarity > 0.8 and entry.translated_term != other.translated_term:
-                    issues.append({
-                        'type': 'similar_terms_different_translation',
-                        'term1': entry.original_term,
-                        'translation1': entry.translated_term,
-                        'term2': other.original_term,
-                        'translation2': other.translated_term,
-                        'similarity': round(similarity, 2)
-                    })
+        for id1, id2, similarity in snapshot.similar_pairs(0.8, progress=progress):
+            entry = snapshot.entries[id1]
+            other = snapshot.entries[id2]
+            
+            if entry['translated_term'] != other['translated_term']:
+                issues.append({
+                    'type': 'similar_terms_different_translation',
+                    'term1': entry['original_term'],
+                    'translation1': entry['translated_term'],
+                    'term2': other['original_term'],
+                    'translation2': other['translated_term'],
+                    'similarity': round(similarity, 2)
+                })
+        
+        # Most similar (most likely inconsistent) first
+        issues.sort(key=lambda x: x['similarity'], reverse=True)
         
         return {
             'total_entries': len(entries),
-            'consistency_issues': issues[:10],  # Top 10 issues
+            'consistency_issues': issues,
             'issue_count': len(issues)
         }
-
+    
+    def start_consistency_job(self, project_id: int) -> Dict:
+        """Run consistency analysis in a background thread, reusing cached or running work"""
+        
+        index = self._get_index(project_id)
+        version = index.version
+        
+        with self._consistency_lock:
+            cached = self._consistency_results.get(project_id)
+            if cached and cached['version'] == version:
+                return {'status': 'completed', 'progress': 100, 'project_id': project_id, 'version': version}
+            
+            self._prune_jobs(self._consistency_jobs)
+            for job in self._consistency_jobs.values():
+                if job['project_id'] == project_id and job['version'] == version \
+                        and job['status'] == 'processing':
+                    return job
+            
+            job = {
+                'job_id': uuid.uuid4().hex,
+                'project_id': project_id,
+                'version': version,
+                'status': 'processing',
+                'progress': 0,
+                'started_at': datetime.utcnow().isoformat(),
+                'completed_at': None
+            }
+            self._consistency_jobs[job['job_id']] = job
+        
+        entries = [dict(e) for e in index.entries.values()]
+        
+        def run():
+            def report(progress: int):
+                job['progress'] = progress
+            
+            try:
+                result = self._find_consistency_issues(entries, report)
+                result['version'] = version
+                self._consistency_results[project_id] = result
+                job['status'] = 'completed'
+                job['progress'] = 100
+            except Exception as e:
+                job['status'] = 'failed'
+                job['error'] = str(e)
+            finally:
+                job['completed_at'] = datetime.utcnow().isoformat()
+        
+        threading.Thread(target=run, daemon=True).start()
+        
+        return job
+    
+    def get_consistency_job(self, job_id: str) -> Optional[Dict]:
+        """Get status of a consistency analysis job"""
+        return self._consistency_jobs.get(job_id)
+    
+    def get_consistency_page(self, project_id: int, page: int = 1, page_size: int = 50) -> Optional[Dict]:
+        """Get one page of the cached analysis, or None if it is missing or stale"""
+        
+        index = self._get_index(project_id)
+        cached = self._consistency_results.get(project_id)
+        if not cached or cached['version'] != index.version:
+            return None
+        
+        page = max(page, 1)
+        start = (page - 1) * page_size
+        
+        return {
+            'status': 'completed',
+            'total_entries': cached['total_entries'],
+            'issue_count': cached['issue_count'],
+            'page': page,
+            'page_size': page_size,
+            'total_pages': math.ceil(cached['issue_count'] / page_size) if page_size else 0,
+            'consistency_issues': cached['consistency_issues'][start:start + page_size]
+        }
@@ -0,0 +1,106 @@
+"""
+Hedging - Observed provider latency and the budget for duplicate (hedged) requests
+"""
+import math
+import threading
+from collections import deque
+from typing import Dict, Optional
+from config import settings
+
+
+class LatencyTracker:
+    """Durations of a provider's last HEDGE_LATENCY_WINDOW successful requests"""
+    
+    _trackers: Dict[str, "LatencyTracker"] = {}
+    
+    def __init__(self, provider_name: str):
+        self.provider_name = provider_name
+        self.durations = deque(maxlen=settings.HEDGE_LATENCY_WINDOW)
+    
+    @classmethod
+    def for_provider(cls, provider_name: str) -> "LatencyTracker":
+        tracker = cls._trackers.get(provider_name)
+        if tracker is None:
+            tracker = cls._trackers[provider_name] = cls(provider_name)
+        return tracker
+    
+    @classmethod
+    def all_status(cls) -> Dict[str, dict]:
+        return {name: tracker.status() for name, tracker in cls._trackers.items()}
+    
+    def record(self, duration: float):
+        self.durations.append(duration)
+    
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Nearest-rank percentile, None until HEDGE_MIN_SAMPLES requests were observed"""
+        if len(self.durations) < settings.HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.durations)
+        rank = max(math.ceil(percentile / 100 * len(ordered)), 1)
+        return ordered[rank - 1]
+    
+    def hedge_delay(self) -> Optional[float]:
+        """How long to wait for a request before hedging it (None: not enough data yet)"""
+        threshold = self.percentile(settings.HEDGE_PERCENTILE)
+        if threshold is None:
+            return None
+        return max(threshold, settings.HEDGE_MIN_DELAY)
+    
+    def status(self) -> dict:
+        p50 = self.percentile(50)
+        p95 = self.percentile(95)
+        
+        return {
+            'samples': len(self.durations),
+            'p50': round(p50, 3) if p50 is not None else None,
+            'p95': round(p95, 3) if p95 is not None else None,
+            'hedge_delay': round(self.hedge_delay(), 3) if p50 is not None else None
+        }
+
+
+class HedgeBudget:
+    """
+    Caps hedged requests at HEDGE_BUDGET_RATIO of hedge-eligible requests.
+    
+    Every eligible request earns HEDGE_BUDGET_RATIO credit (up to
+    HEDGE_BUDGET_BURST) and every hedge spends one, so the extra spend on
+    duplicates stays a bounded fraction of normal traffic.
+    """
+    
+    _lock = threading.Lock()
+    credits = float(settings.HEDGE_BUDGET_BURST)
+    requests = 0
+    hedges = 0
+    hedges_won = 0
+    hedges_denied = 0
+    
+    @classmethod
+    def earn(cls):
+        with cls._lock:
+            cls.requests += 1
+            cls.credits = min(cls.credits + settings.HEDGE_BUDGET_RATIO, settings.HEDGE_BUDGET_BURST)
+    
+    @classmethod
+    def try_spend(cls) -> bool:
+        with cls._lock:
+            if cls.credits < 1:
+                cls.hedges_denied += 1
+                return False
+            cls.credits -= 1
+            cls.hedges += 1
+            return True
+    
+    @classmethod
+    def record_win(cls):
+        with cls._lock:
+            cls.hedges_won += 1
+    
+    @classmethod
+    def status(cls) -> dict:
+        return {
+            'requests': cls.requests,
+            'hedges': cls.hedges,
+            'hedges_won': cls.hedges_won,
+            'hedges_denied': cls.hedges_denied,
+            'credits': round(cls.credits, 2)
+        }
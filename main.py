@@ -1,6 +1,6 @@
 from fastapi import FastAPI, HTTPException, Depends, UploadFile, File
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from typing import List, Optional
@@ -8,18 +8,30 @@ from pydantic import BaseModel
 from datetime import datetime
 import os
 
-from database import (get_db, init_db, Project, Chapter, GlossaryEntry, APIConfig, 
-                      TranslationJob, CostTracking, ChapterRevision, ProjectBackup, UserSettings)
+from database import (get_db, init_db, SessionLocal, Project, Chapter, GlossaryEntry, APIConfig, 
+                      TranslationJob, CostTracking, ChapterRevision, ProjectBackup, UserSettings,
+                      ChunkCheckpoint)
 from translation_engine import TranslationEngine
 from ai_providers import AIProviderFactory
+from rate_limiter import ProviderRateLimiter
+from circuit_breaker import CircuitBreaker
+from hedging import HedgeBudget, LatencyTracker
+from adaptive_concurrency import AdaptiveConcurrency
 from config import settings
 from contextlib import asynccontextmanager
-from export_service import ExportService
+from export_service import ExportService, ExportCache
+from export_jobs import ExportJobService
 from cost_tracking import CostTracker
 from batch_translation import BatchTranslationService
-from backup_service import BackupService
+from batch_planner import BatchPlanner
+from backup_service import BackupService, AutoBackupScheduler
+from snapshot_service import SnapshotService
 from glossary_service import GlossaryService
+from starlette.concurrency import run_in_threadpool
 import asyncio
+import shutil
+import tempfile
+from urllib.parse import quote
 import pandas as pd
 from io import BytesIO
 
@@ -28,10 +40,21 @@ from io import BytesIO
 async def lifespan(app: FastAPI):
     # Startup
     init_db()
+    db = SessionLocal()
+    try:
+        GlossaryService(db).ensure_unique_terms()
+    finally:
+        db.close()
+    ExportCache().evict()
+    SnapshotService.start_scheduler()
+    AutoBackupScheduler.start()
     print(f"🚀 {settings.APP_NAME} v{settings.APP_VERSION} - Server started successfully!")
     print(f"📍 Open: http://localhost:8000")
     yield
     # Shutdown (cleanup if needed)
+    ExportJobService.shutdown()
+    SnapshotService.stop_scheduler()
+    AutoBackupScheduler.stop()
     print("👋 Shutting down...")
 
 # Initialize FastAPI app
@@ -59,6 +82,7 @@ class ProjectCreate(BaseModel):
     target_language: str = "tr"
     ai_provider: str = "gemini"
     ai_model: Optional[str] = None
+    failover_providers: Optional[List[str]] = None  # tried in order while ai_provider is down
 
 class ProjectUpdate(BaseModel):
     name: Optional[str] = None
@@ -67,6 +91,7 @@ class ProjectUpdate(BaseModel):
     target_language: Optional[str] = None
     ai_provider: Optional[str] = None
     ai_model: Optional[str] = None
+    failover_providers: Optional[List[str]] = None
 
 class ChapterCreate(BaseModel):
     chapter_number: int
@@ -92,10 +117,18 @@ class APIConfigCreate(BaseModel):
     max_tokens: int = 4000
     temperature: float = 0.7
     enabled: bool = True
+    extra_config: Optional[dict] = None  # e.g. {"rpm": 500, "tpm": 200000}
+
+class BackupScheduleUpdate(BaseModel):
+    enabled: bool = True
+    interval_hours: Optional[float] = None
+    keep: Optional[int] = None
+    incremental: Optional[bool] = None
 
 class TranslationRequest(BaseModel):
     chapter_id: int
     extract_terms: bool = True
+    hedge: Optional[bool] = None  # duplicate slow chunk requests; default HEDGE_ENABLED
 
 # ============= API ENDPOINTS =============
 
@@ -125,6 +158,12 @@ async def list_projects(db: Session = Depends(get_db)):
         for p in projects
     ]
 
+def _validate_failover_providers(providers: List[str]) -> List[str]:
+    unknown = [p for p in providers if p not in AIProviderFactory.PROVIDERS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown providers: {', '.join(unknown)}")
+    return providers
+
 @app.post("/api/projects")
 async def create_project(project: ProjectCreate, db: Session = Depends(get_db)):
     """Create a new project"""
@@ -134,7 +173,8 @@ async def create_project(project: ProjectCreate, db: Session = Depends(get_db)):
         source_language=project.source_language,
         target_language=project.target_language,
         ai_provider=project.ai_provider,
-        ai_model=project.ai_model
+        ai_model=project.ai_model,
+        settings_data={"failover_providers": _validate_failover_providers(project.failover_providers or [])}
     )
     db.add(new_project)
     db.commit()
@@ -157,6 +197,7 @@ async def get_project(project_id: int, db: Session = Depends(get_db)):
         "target_language": project.target_language,
         "ai_provider": project.ai_provider,
         "ai_model": project.ai_model,
+        "failover_providers": (project.settings_data or {}).get("failover_providers", []),
         "created_at": project.created_at.isoformat(),
         "updated_at": project.updated_at.isoformat(),
         "chapters": [
@@ -190,6 +231,12 @@ async def update_project(project_id: int, project: ProjectUpdate, db: Session =
         db_project.ai_provider = project.ai_provider
     if project.ai_model is not None:
         db_project.ai_model = project.ai_model
+    if project.failover_providers is not None:
+        # Reassigned, not mutated, so the JSON column is written
+        db_project.settings_data = {
+            **(db_project.settings_data or {}),
+            "failover_providers": _validate_failover_providers(project.failover_providers)
+        }
     
     db.commit()
     return {"message": "Project updated successfully"}
@@ -201,8 +248,12 @@ async def delete_project(project_id: int, db: Session = Depends(get_db)):
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
+    db.query(ChunkCheckpoint).filter(
+        ChunkCheckpoint.chapter_id.in_(db.query(Chapter.id).filter(Chapter.project_id == project_id))
+    ).delete(synchronize_session=False)
     db.delete(project)
     db.commit()
+    GlossaryService.invalidate_index(project_id)
     return {"message": "Project deleted successfully"}
 
 # ============= CHAPTER ENDPOINTS =============
@@ -271,6 +322,7 @@ async def delete_chapter(chapter_id: int, db: Session = Depends(get_db)):
     if not chapter:
         raise HTTPException(status_code=404, detail="Chapter not found")
     
+    db.query(ChunkCheckpoint).filter(ChunkCheckpoint.chapter_id == chapter_id).delete(synchronize_session=False)
     db.delete(chapter)
     db.commit()
     return {"message": "Chapter deleted successfully"}
@@ -282,7 +334,8 @@ async def translate_chapter(request: TranslationRequest, db: Session = Depends(g
     """Translate a chapter"""
     try:
         engine = TranslationEngine(db)
-        result = await engine.translate_chapter(request.chapter_id, request.extract_terms)
+        hedge = settings.HEDGE_ENABLED if request.hedge is None else request.hedge
+        result = await engine.translate_chapter(request.chapter_id, request.extract_terms, hedge=hedge)
         
         if not result["success"]:
             error_msg = result.get("error", "Translation failed")
@@ -338,6 +391,13 @@ async def add_glossary_entry(project_id: int, entry: GlossaryCreate, db: Session
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
+    existing = db.query(GlossaryEntry).filter(
+        GlossaryEntry.project_id == project_id,
+        GlossaryEntry.original_term == entry.original_term
+    ).first()
+    if existing:
+        raise HTTPException(status_code=400, detail="Glossary term already exists")
+    
     new_entry = GlossaryEntry(
         project_id=project_id,
         original_term=entry.original_term,
@@ -349,6 +409,7 @@ async def add_glossary_entry(project_id: int, entry: GlossaryCreate, db: Session
     db.add(new_entry)
     db.commit()
     db.refresh(new_entry)
+    GlossaryService.index_entry(new_entry)
     
     return {"id": new_entry.id, "message": "Glossary entry added"}
 
@@ -359,6 +420,14 @@ async def update_glossary_entry(entry_id: int, entry: GlossaryCreate, db: Sessio
     if not db_entry:
         raise HTTPException(status_code=404, detail="Glossary entry not found")
     
+    duplicate = db.query(GlossaryEntry).filter(
+        GlossaryEntry.project_id == db_entry.project_id,
+        GlossaryEntry.original_term == entry.original_term,
+        GlossaryEntry.id != entry_id
+    ).first()
+    if duplicate:
+        raise HTTPException(status_code=400, detail="Glossary term already exists")
+    
     db_entry.original_term = entry.original_term
     db_entry.translated_term = entry.translated_term
     db_entry.term_type = entry.term_type
@@ -366,6 +435,7 @@ async def update_glossary_entry(entry_id: int, entry: GlossaryCreate, db: Sessio
     db_entry.confirmed = True
     
     db.commit()
+    GlossaryService.index_entry(db_entry)
     return {"message": "Glossary entry updated"}
 
 @app.delete("/api/glossary/{entry_id}")
@@ -375,8 +445,10 @@ async def delete_glossary_entry(entry_id: int, db: Session = Depends(get_db)):
     if not entry:
         raise HTTPException(status_code=404, detail="Glossary entry not found")
     
+    project_id = entry.project_id
     db.delete(entry)
     db.commit()
+    GlossaryService.unindex_entries(project_id, [entry_id])
     return {"message": "Glossary entry deleted"}
 
 # ============= ADVANCED GLOSSARY ENDPOINTS =============
@@ -465,11 +537,37 @@ async def merge_duplicate_terms(project_id: int, db: Session = Depends(get_db)):
     return {"message": f"{merged} duplicate terms merged"}
 
 @app.get("/api/glossary/{project_id}/consistency")
-async def check_consistency(project_id: int, db: Session = Depends(get_db)):
-    """Check glossary consistency and find issues"""
+async def check_consistency(
+    project_id: int,
+    page: int = 1,
+    page_size: int = 50,
+    db: Session = Depends(get_db)
+):
+    """Check glossary consistency and find issues (paginated)"""
+    if page_size < 1 or page_size > 500:
+        raise HTTPException(status_code=400, detail="page_size must be between 1 and 500")
+    
     glossary_service = GlossaryService(db)
-    analysis = glossary_service.analyze_consistency(project_id)
-    return analysis
+    analysis = glossary_service.get_consistency_page(project_id, page, page_size)
+    if analysis:
+        return analysis
+    
+    # Not analyzed for the current glossary yet - run it in the background
+    job = glossary_service.start_consistency_job(project_id)
+    if job['status'] == 'completed':
+        return glossary_service.get_consistency_page(project_id, page, page_size)
+    
+    return job
+
+@app.get("/api/glossary/consistency/jobs/{job_id}")
+async def get_consistency_job(job_id: str, db: Session = Depends(get_db)):
+    """Get progress of a consistency analysis job"""
+    glossary_service = GlossaryService(db)
+    job = glossary_service.get_consistency_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job
 
 # ============= AI CONFIG ENDPOINTS =============
 
@@ -479,6 +577,16 @@ async def list_providers():
     providers = AIProviderFactory.get_available_providers()
     return {"providers": providers}
 
+@app.get("/api/ai-providers/metrics")
+async def get_provider_metrics():
+    """Circuit breaker state, concurrency window, latency and hedging of every provider used since startup"""
+    return {
+        "circuits": CircuitBreaker.all_status(),
+        "concurrency": AdaptiveConcurrency.all_status(),
+        "latency": LatencyTracker.all_status(),
+        "hedging": HedgeBudget.status()
+    }
+
 @app.get("/api/ai-configs")
 async def list_ai_configs(db: Session = Depends(get_db)):
     """List all AI configurations"""
@@ -493,6 +601,7 @@ async def list_ai_configs(db: Session = Depends(get_db)):
             "max_tokens": c.max_tokens,
             "temperature": c.temperature,
             "enabled": c.enabled,
+            "extra_config": c.extra_config or {},
             "has_api_key": bool(c.api_key)
         }
         for c in configs
@@ -501,6 +610,11 @@ async def list_ai_configs(db: Session = Depends(get_db)):
 @app.post("/api/ai-configs")
 async def create_ai_config(config: APIConfigCreate, db: Session = Depends(get_db)):
     """Create or update AI configuration"""
+    try:
+        ProviderRateLimiter.validate_config(config.extra_config)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     existing = db.query(APIConfig).filter(
         APIConfig.provider_name == config.provider_name
     ).first()
@@ -514,6 +628,8 @@ async def create_ai_config(config: APIConfigCreate, db: Session = Depends(get_db
         existing.max_tokens = config.max_tokens
         existing.temperature = config.temperature
         existing.enabled = config.enabled
+        if config.extra_config is not None:
+            existing.extra_config = config.extra_config
         db.commit()
         return {"message": "AI configuration updated"}
     else:
@@ -524,7 +640,8 @@ async def create_ai_config(config: APIConfigCreate, db: Session = Depends(get_db
             model=config.model,
             max_tokens=config.max_tokens,
             temperature=config.temperature,
-            enabled=config.enabled
+            enabled=config.enabled,
+            extra_config=config.extra_config or {}
         )
         db.add(new_config)
         db.commit()
@@ -570,21 +687,69 @@ async def export_chapter(chapter_id: int, format: str = "txt", db: Session = Dep
 class BatchTranslateRequest(BaseModel):
     project_id: int
     chapter_ids: List[int]
+    sharded: bool = False  # spread chapters across several providers
+    providers: Optional[List[str]] = None  # sharded only; default: every enabled provider
+    concurrency: Optional[int] = None  # sharded only; default: each provider's concurrency window
+
+async def _run_batch_job(job_id: int, providers: Optional[List[str]], concurrency: Optional[int]):
+    """Batch job in the background, with its own session - the request's closes with the response"""
+    db = SessionLocal()
+    try:
+        await BatchTranslationService(db).process_batch_job(job_id, providers, concurrency)
+    finally:
+        db.close()
 
 @app.post("/api/batch/translate")
 async def start_batch_translation(request: BatchTranslateRequest, db: Session = Depends(get_db)):
     """Start batch translation of multiple chapters"""
     try:
         batch_service = BatchTranslationService(db)
+        
+        providers = None
+        lanes = None
+        if request.sharded:
+            providers = request.providers or [
+                config.provider_name
+                for config in db.query(APIConfig).filter(APIConfig.enabled == True)
+                if config.api_key
+            ]
+            # Validated up front; the job re-plans with the latest measurements when it starts
+            lanes = batch_service.plan_shards(request.project_id, providers, request.concurrency)
+        
         job_id = await batch_service.create_batch_job(request.project_id, request.chapter_ids)
         
         # Start processing in background
-        asyncio.create_task(batch_service.process_batch_job(job_id))
+        asyncio.create_task(_run_batch_job(job_id, providers, request.concurrency))
         
-        return {"job_id": job_id, "message": "Batch translation started"}
+        return {"job_id": job_id, "message": "Batch translation started", "lanes": lanes}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+class BatchPlanRequest(BaseModel):
+    project_id: int
+    chapter_ids: Optional[List[int]] = None  # default: every chapter not yet completed
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    concurrency: int = 1
+    extract_terms: bool = True
+
+@app.post("/api/batch/plan")
+async def plan_batch_translation(request: BatchPlanRequest, db: Session = Depends(get_db)):
+    """Estimate tokens, cost and duration of a batch translation before starting it"""
+    try:
+        planner = BatchPlanner(db)
+        return await run_in_threadpool(
+            planner.plan,
+            request.project_id,
+            request.chapter_ids,
+            request.provider,
+            request.model,
+            request.concurrency,
+            request.extract_terms
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/api/batch/status/{job_id}")
 async def get_batch_status(job_id: int, db: Session = Depends(get_db)):
     """Get status of a batch translation job"""
@@ -656,37 +821,83 @@ def _group_costs_by_provider(costs):
 
 # ============= EXPORT ENDPOINTS =============
 
+def _validate_export_range(start_chapter: Optional[int], end_chapter: Optional[int]):
+    if start_chapter is not None and end_chapter is not None and start_chapter > end_chapter:
+        raise HTTPException(status_code=400, detail="start_chapter must not be greater than end_chapter")
+
+def _count_export_chapters(db: Session, project_id: int, start_chapter: Optional[int],
+                           end_chapter: Optional[int]) -> int:
+    query = db.query(Chapter).filter(
+        Chapter.project_id == project_id,
+        Chapter.status == "completed"
+    )
+    if start_chapter is not None:
+        query = query.filter(Chapter.chapter_number >= start_chapter)
+    if end_chapter is not None:
+        query = query.filter(Chapter.chapter_number <= end_chapter)
+    
+    return query.count()
+
+def _plan_export_volumes(project_id: int, start_chapter: Optional[int], end_chapter: Optional[int],
+                         volume_chapters: Optional[int], volume_size_mb: Optional[float]) -> List[dict]:
+    if volume_chapters is not None and volume_chapters < 1:
+        raise HTTPException(status_code=400, detail="volume_chapters must be at least 1")
+    if volume_size_mb is not None and volume_size_mb <= 0:
+        raise HTTPException(status_code=400, detail="volume_size_mb must be positive")
+    
+    return ExportService.plan_volumes(
+        project_id,
+        start_chapter=start_chapter,
+        end_chapter=end_chapter,
+        volume_chapters=volume_chapters,
+        volume_bytes=int(volume_size_mb * 1024 * 1024) if volume_size_mb else None
+    )
+
+@app.get("/api/export/project/{project_id}/volumes")
+async def get_export_volumes(project_id: int, start_chapter: Optional[int] = None,
+                             end_chapter: Optional[int] = None, volume_chapters: Optional[int] = None,
+                             volume_size_mb: Optional[float] = None, db: Session = Depends(get_db)):
+    """Preview how a project export would be split into volumes"""
+    
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    _validate_export_range(start_chapter, end_chapter)
+    
+    volumes = _plan_export_volumes(project_id, start_chapter, end_chapter, volume_chapters, volume_size_mb)
+    
+    return {"project_id": project_id, "volumes": volumes}
+
 @app.get("/api/export/project/{project_id}/{format}")
-async def export_project(project_id: int, format: str, db: Session = Depends(get_db)):
-    """Export entire project in various formats"""
+async def export_project(project_id: int, format: str, parallel: Optional[bool] = None,
+                         start_chapter: Optional[int] = None, end_chapter: Optional[int] = None,
+                         volume_chapters: Optional[int] = None, volume_size_mb: Optional[float] = None,
+                         db: Session = Depends(get_db)):
+    """
+    Export entire project in various formats.
+    
+    start_chapter/end_chapter limit the export to a chapter number range;
+    volume_chapters/volume_size_mb split it into volumes downloaded as one ZIP.
+    parallel toggles segmented PDF rendering (default: by size).
+    """
     
     # Validate format
     if format not in ['pdf', 'epub', 'docx', 'txt']:
         raise HTTPException(status_code=400, detail="Invalid format. Use: pdf, epub, docx, or txt")
     
+    _validate_export_range(start_chapter, end_chapter)
+    
     # Get project and chapters
     project = db.query(Project).filter(Project.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    chapters = db.query(Chapter).filter(
-        Chapter.project_id == project_id,
-        Chapter.status == "completed"
-    ).order_by(Chapter.chapter_number).all()
+    chapter_count = _count_export_chapters(db, project_id, start_chapter, end_chapter)
     
-    if not chapters:
+    if not chapter_count:
         raise HTTPException(status_code=400, detail="No completed chapters to export")
     
-    # Prepare chapter data
-    chapter_data = [
-        {
-            "chapter_number": c.chapter_number,
-            "title": c.title,
-            "translated_text": c.translated_text
-        }
-        for c in chapters
-    ]
-    
     # Prepare metadata
     metadata = {
         "description": project.description,
@@ -697,32 +908,122 @@ async def export_project(project_id: int, format: str, db: Session = Depends(get
     # Export
     export_service = ExportService()
     
-    try:
-        if format == 'pdf':
-            filepath = export_service.export_to_pdf(project.name, chapter_data, metadata)
-        elif format == 'epub':
-            filepath = export_service.export_to_epub(project.name, chapter_data, metadata)
-        elif format == 'docx':
-            filepath = export_service.export_to_docx(project.name, chapter_data, metadata)
-        else:  # txt
-            filepath = export_service.export_to_txt(project.name, chapter_data, metadata)
+    # Multi-volume export: every volume is its own (cached) export, sent as one ZIP
+    if volume_chapters or volume_size_mb:
+        volumes = _plan_export_volumes(project_id, start_chapter, end_chapter, volume_chapters, volume_size_mb)
+        filename = f"{project.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{format}.zip"
         
-        return FileResponse(
-            filepath,
+        if format == 'txt':
+            content = export_service.stream_txt_volumes(project_id, project.name, volumes, metadata)
+        else:
+            # Queue every volume up front so the pool renders them side by side
+            jobs = []
+            for volume in volumes:
+                jobs.append(await ExportJobService.start_job(
+                    project_id, format, volume['chapter_count'], parallel,
+                    volume['start_chapter'], volume['end_chapter'], volume['volume']
+                ))
+            content = ExportJobService.stream_volumes(jobs)
+        
+        return StreamingResponse(
+            content,
+            media_type='application/zip',
+            headers={"Content-Disposition": f"attachment; filename*=utf-8''{quote(filename)}"}
+        )
+    
+    # Plain text is streamed chapter by chapter instead of going through exports/
+    if format == 'txt':
+        filename = f"{project.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+        return StreamingResponse(
+            export_service.stream_txt(
+                project.name,
+                ExportService.iter_chapters(project_id, start_chapter=start_chapter, end_chapter=end_chapter),
+                chapter_count,
+                metadata
+            ),
             media_type='application/octet-stream',
-            filename=os.path.basename(filepath)
+            headers={"Content-Disposition": f"attachment; filename*=utf-8''{quote(filename)}"}
         )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
+    
+    # Render in the export process pool so the event loop stays free
+    job = await ExportJobService.start_job(
+        project_id, format, chapter_count, parallel, start_chapter, end_chapter
+    )
+    job = await ExportJobService.wait(job['job_id'])
+    
+    if job['status'] != 'completed':
+        raise HTTPException(status_code=500, detail=f"Export failed: {job['error']}")
+    
+    return FileResponse(
+        job['filepath'],
+        media_type='application/octet-stream',
+        filename=job['filename']
+    )
+
+@app.post("/api/export/project/{project_id}/{format}/jobs")
+async def start_export_job(project_id: int, format: str, parallel: Optional[bool] = None,
+                           start_chapter: Optional[int] = None, end_chapter: Optional[int] = None,
+                           volume: Optional[int] = None, db: Session = Depends(get_db)):
+    """Start a PDF/EPUB/DOCX export (optionally one chapter range / volume) in the background"""
+    
+    if format not in ExportJobService.FORMATS:
+        raise HTTPException(status_code=400, detail="Invalid format. Use: pdf, epub, or docx")
+    
+    _validate_export_range(start_chapter, end_chapter)
+    
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    chapter_count = _count_export_chapters(db, project_id, start_chapter, end_chapter)
+    
+    if not chapter_count:
+        raise HTTPException(status_code=400, detail="No completed chapters to export")
+    
+    return await ExportJobService.start_job(
+        project_id, format, chapter_count, parallel, start_chapter, end_chapter, volume
+    )
+
+@app.get("/api/export/jobs/{job_id}")
+async def get_export_job(job_id: str):
+    """Get progress of an export job"""
+    job = ExportJobService.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job
+
+@app.get("/api/export/jobs/{job_id}/download")
+async def download_export_job(job_id: str):
+    """Download the file of a finished export job"""
+    job = ExportJobService.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if job['status'] != 'completed':
+        raise HTTPException(status_code=409, detail=f"Export is {job['status']}")
+    
+    if not os.path.exists(job['filepath']):
+        raise HTTPException(status_code=410, detail="Export file no longer exists")
+    
+    return FileResponse(
+        job['filepath'],
+        media_type='application/octet-stream',
+        filename=job['filename']
+    )
 
 # ============= BACKUP ENDPOINTS =============
 
 @app.post("/api/backup/create/{project_id}")
-async def create_backup(project_id: int, db: Session = Depends(get_db)):
-    """Create a backup of a project"""
+async def create_backup(project_id: int, incremental: bool = False, db: Session = Depends(get_db)):
+    """Create a backup of a project (incremental: only what changed since the last manifest)"""
     try:
         backup_service = BackupService(db)
-        filepath = backup_service.create_backup(project_id, backup_type="manual")
+        # Streams the whole project to disk - keep it off the event loop
+        if incremental:
+            filepath = await run_in_threadpool(backup_service.create_incremental_backup, project_id)
+        else:
+            filepath = await run_in_threadpool(backup_service.create_backup, project_id, backup_type="manual")
         
         return {
             "message": "Backup created successfully",
@@ -741,16 +1042,16 @@ async def list_backups(project_id: Optional[int] = None, db: Session = Depends(g
 @app.post("/api/backup/restore")
 async def restore_backup(file: UploadFile = File(...), db: Session = Depends(get_db)):
     """Restore a project from backup"""
+    temp_path = None
     try:
-        # Save uploaded file temporarily
-        temp_path = f"temp_backup_{datetime.now().timestamp()}.zip"
-        with open(temp_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        # Stream the upload to disk in chunks instead of reading it into memory
+        fd, temp_path = tempfile.mkstemp(prefix="temp_backup_", suffix=".zip")
+        with os.fdopen(fd, "wb") as f:
+            await run_in_threadpool(shutil.copyfileobj, file.file, f, 1024 * 1024)
         
         # Restore
         backup_service = BackupService(db)
-        project_id = backup_service.restore_backup(temp_path)
+        project_id = await run_in_threadpool(backup_service.restore_backup, temp_path)
         
         # Clean up
         os.remove(temp_path)
@@ -760,84 +1061,197 @@ async def restore_backup(file: UploadFile = File(...), db: Session = Depends(get
             "project_id": project_id
         }
     except Exception as e:
-        if os.path.exists(temp_path):
+        if temp_path and os.path.exists(temp_path):
             os.remove(temp_path)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/backup/schedule/{project_id}")
+async def get_backup_schedule(project_id: int, db: Session = Depends(get_db)):
+    """Get a project's automatic backup schedule"""
+    return BackupService(db).get_schedule(project_id)
+
+@app.put("/api/backup/schedule/{project_id}")
+async def set_backup_schedule(project_id: int, update: BackupScheduleUpdate, db: Session = Depends(get_db)):
+    """Enable, disable or change a project's automatic backups"""
+    try:
+        return BackupService(db).set_schedule(
+            project_id,
+            enabled=update.enabled,
+            interval_hours=update.interval_hours,
+            keep=update.keep,
+            incremental=update.incremental
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/backup/schedule/run")
+async def run_scheduled_backups():
+    """Run due automatic backups now instead of waiting for the next check"""
+    done = await run_in_threadpool(AutoBackupScheduler.run_once)
+    return {"backed_up_projects": done}
+
+@app.post("/api/backup/{backup_id}/restore")
+async def restore_stored_backup(backup_id: int, db: Session = Depends(get_db)):
+    """Restore a project from a stored backup (any point in time for incremental ones)"""
+    try:
+        backup_service = BackupService(db)
+        project_id = await run_in_threadpool(backup_service.restore_backup_record, backup_id)
+        
+        return {
+            "message": "Backup restored successfully",
+            "project_id": project_id
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/backup/gc")
+async def collect_backup_garbage(keep_last: Optional[int] = None, db: Session = Depends(get_db)):
+    """Compact incremental backups (keeping the newest keep_last per project) and drop unreferenced blobs"""
+    if keep_last is not None and keep_last < 1:
+        raise HTTPException(status_code=400, detail="keep_last must be at least 1")
+    
+    backup_service = BackupService(db)
+    return await run_in_threadpool(backup_service.collect_garbage, keep_last)
+
 @app.delete("/api/backup/{backup_id}")
 async def delete_backup(backup_id: int, db: Session = Depends(get_db)):
     """Delete a backup"""
     try:
         backup_service = BackupService(db)
-        backup_service.delete_backup(backup_id)
+        await run_in_threadpool(backup_service.delete_backup, backup_id)
         return {"message": "Backup deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# ============= SNAPSHOT ENDPOINTS =============
+
+@app.post("/api/snapshots")
+async def create_snapshot(compression: Optional[str] = None):
+    """Take a consistent snapshot of the whole database"""
+    try:
+        return await run_in_threadpool(SnapshotService().create_snapshot, compression)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/snapshots")
+async def list_snapshots():
+    """List database snapshots, newest first"""
+    return SnapshotService().list_snapshots()
+
+@app.post("/api/snapshots/prune")
+async def prune_snapshots(keep_last: Optional[int] = None, keep_daily: Optional[int] = None,
+                          keep_weekly: Optional[int] = None):
+    """Apply the snapshot retention schedule now"""
+    try:
+        removed = SnapshotService().prune(keep_last, keep_daily, keep_weekly)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"removed": removed}
+
+@app.get("/api/snapshots/{name}/download")
+async def download_snapshot(name: str):
+    """Download a database snapshot"""
+    try:
+        path = SnapshotService().get_snapshot_path(name)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    return FileResponse(path, media_type='application/octet-stream', filename=name)
+
+@app.delete("/api/snapshots/{name}")
+async def delete_snapshot(name: str):
+    """Delete a database snapshot"""
+    try:
+        SnapshotService().delete_snapshot(name)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    return {"message": "Snapshot deleted successfully"}
+
 # ============= GLOSSARY IMPORT/EXPORT ENDPOINTS =============
 
 @app.post("/api/glossary/{project_id}/import")
-async def import_glossary(project_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)):
-    """Import glossary from CSV/Excel"""
+async def import_glossary(
+    project_id: int,
+    file: UploadFile = File(...),
+    update_existing: bool = False,
+    background: bool = False,
+    db: Session = Depends(get_db)
+):
+    """Import glossary from CSV/Excel (streamed in batches)"""
+    if not file.filename.lower().endswith(('.csv', '.xlsx', '.xls')):
+        raise HTTPException(status_code=400, detail="Invalid file format. Use CSV or Excel")
+    
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
     try:
-        # Read file
-        content = await file.read()
-        
-        # Determine file type and read
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(BytesIO(content))
-        elif file.filename.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(BytesIO(content))
-        else:
-            raise HTTPException(status_code=400, detail="Invalid file format. Use CSV or Excel")
-        
-        # Validate columns
-        required_cols = ['original_term', 'translated_term']
-        if not all(col in df.columns for col in required_cols):
-            raise HTTPException(status_code=400, detail=f"File must contain columns: {required_cols}")
-        
-        # Import entries
-        imported = 0
-        for _, row in df.iterrows():
-            # Check if entry exists
-            existing = db.query(GlossaryEntry).filter(
-                GlossaryEntry.project_id == project_id,
-                GlossaryEntry.original_term == row['original_term']
-            ).first()
+        if background:
+            # The upload is closed after this request, so keep our own copy on disk
+            suffix = os.path.splitext(file.filename)[1]
+            fd, temp_path = tempfile.mkstemp(prefix="glossary_import_", suffix=suffix)
+            with os.fdopen(fd, "wb") as f:
+                await run_in_threadpool(shutil.copyfileobj, file.file, f, 1024 * 1024)
             
-            if not existing:
-                entry = GlossaryEntry(
-                    project_id=project_id,
-                    original_term=row['original_term'],
-                    translated_term=row['translated_term'],
-                    term_type=row.get('term_type', 'general'),
-                    context=row.get('context'),
-                    confirmed=True
-                )
-                db.add(entry)
-                imported += 1
+            job = GlossaryService.start_import_job(project_id, temp_path, file.filename, update_existing)
+            return {"message": "Glossary import started", **job}
         
-        db.commit()
+        glossary_service = GlossaryService(db)
+        counts = await run_in_threadpool(
+            glossary_service.import_terms,
+            project_id,
+            GlossaryService.read_import_file(file.file, file.filename),
+            update_existing
+        )
         
         return {
-            "message": f"Successfully imported {imported} glossary terms",
-            "imported_count": imported
+            "message": f"Successfully imported {counts['inserted']} glossary terms",
+            "imported_count": counts['inserted'],
+            **counts
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/glossary/import/jobs/{job_id}")
+async def get_glossary_import_job(job_id: str):
+    """Get progress and counts of a background glossary import"""
+    job = GlossaryService.get_import_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job
+
 @app.get("/api/glossary/{project_id}/export")
 async def export_glossary(project_id: int, format: str = "csv", db: Session = Depends(get_db)):
     """Export glossary to CSV/Excel"""
     
+    has_entries = db.query(GlossaryEntry.id).filter(
+        GlossaryEntry.project_id == project_id
+    ).first()
+    
+    if not has_entries:
+        raise HTTPException(status_code=400, detail="No glossary terms to export")
+    
+    # CSV is written row by row while the client downloads it
+    if format == "csv":
+        return StreamingResponse(
+            GlossaryService.stream_csv(project_id),
+            media_type="text/csv",
+            headers={"Content-Disposition": f"attachment; filename=glossary_{project_id}.csv"}
+        )
+    
     # Get glossary
     entries = db.query(GlossaryEntry).filter(
         GlossaryEntry.project_id == project_id
     ).all()
     
-    if not entries:
-        raise HTTPException(status_code=400, detail="No glossary terms to export")
-    
     # Prepare data
     data = [
         {
@@ -853,20 +1267,14 @@ async def export_glossary(project_id: int, format: str = "csv", db: Session = De
     
     df = pd.DataFrame(data)
     
-    # Export
+    # Export (excel)
     output = BytesIO()
-    if format == "csv":
-        df.to_csv(output, index=False, encoding='utf-8-sig')
-        filename = f"glossary_{project_id}.csv"
-        media_type = "text/csv"
-    else:  # excel
-        df.to_excel(output, index=False, engine='openpyxl')
-        filename = f"glossary_{project_id}.xlsx"
-        media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    df.to_excel(output, index=False, engine='openpyxl')
+    filename = f"glossary_{project_id}.xlsx"
+    media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     
     output.seek(0)
     
-    from fastapi.responses import StreamingResponse
     return StreamingResponse(
         output,
         media_type=media_type,
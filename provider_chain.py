@@ -0,0 +1,182 @@
+"""
+Provider Chain - A project's provider followed by its failover providers
+"""
+import asyncio
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from database import Project, APIConfig
+from ai_providers import AIProvider, AIProviderFactory, ProviderError
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from hedging import HedgeBudget, LatencyTracker
+from retry_policy import RetryPolicy
+from config import settings
+
+
+class ProviderChain:
+    """
+    Sends each request to the first provider in the chain whose circuit is
+    closed, so chunks reroute while the primary is down and return to it
+    once it recovers.
+    
+    The failover order comes from Project.settings_data["failover_providers"],
+    e.g. ["openai", "deepseek"]; providers without an enabled APIConfig are skipped.
+    """
+    
+    def __init__(self, configs: List[APIConfig], project_model: str = None, project_provider: str = None):
+        self.configs = configs
+        self.project_model = project_model
+        self.project_provider = project_provider or configs[0].provider_name
+        self._providers: Dict[str, AIProvider] = {}
+        self.hedges = 0
+        self.hedges_won = 0
+    
+    @classmethod
+    def for_project(cls, db: Session, project: Project, provider: str = None) -> "ProviderChain":
+        """
+        The chain of a project; provider puts another configured provider
+        first (sharded batches), followed by the project's own.
+        """
+        names = [provider or project.ai_provider]
+        for name in [project.ai_provider] + ((project.settings_data or {}).get('failover_providers') or []):
+            if name not in names:
+                names.append(name)
+        
+        configs = {
+            config.provider_name: config
+            for config in db.query(APIConfig).filter(
+                APIConfig.provider_name.in_(names),
+                APIConfig.enabled == True
+            )
+            if config.api_key
+        }
+        
+        if names[0] not in configs:
+            raise ValueError(f"AI provider '{names[0]}' not configured or disabled")
+        
+        return cls([configs[name] for name in names if name in configs], project.ai_model, project.ai_provider)
+    
+    @property
+    def provider_names(self) -> List[str]:
+        return [config.provider_name for config in self.configs]
+    
+    def model_for(self, provider_name: str) -> Optional[str]:
+        config = next(c for c in self.configs if c.provider_name == provider_name)
+        # The project's model only applies to its own provider
+        if provider_name == self.project_provider:
+            return config.model or self.project_model
+        return config.model
+    
+    def provider(self, provider_name: str) -> AIProvider:
+        """Provider client, created on first use"""
+        if provider_name not in self._providers:
+            config = next(c for c in self.configs if c.provider_name == provider_name)
+            self._providers[provider_name] = AIProviderFactory.create_provider(
+                provider_name=config.provider_name,
+                api_key=config.api_key,
+                model=self.model_for(provider_name),
+                temperature=config.temperature,
+                max_tokens=config.max_tokens,
+                rate_limits=config.extra_config
+            )
+        return self._providers[provider_name]
+    
+    async def _attempt(self, position: int, on_retry: Callable[[ProviderError, float], None],
+                       request: Dict) -> Dict:
+        """
+        The request on the provider at position, through its circuit breaker.
+        
+        While another provider is left to fail over to, a provider gets only
+        FAILOVER_MAX_ATTEMPTS attempts instead of the full retry policy, and
+        an open circuit fails over at once. The last provider waits an open
+        circuit out like any other retryable error.
+        """
+        name = self.provider_names[position]
+        breaker = CircuitBreaker.for_provider(name)
+        provider = self.provider(name)
+        is_last = position == len(self.configs) - 1
+        retry_policy = RetryPolicy() if is_last else RetryPolicy(max_attempts=settings.FAILOVER_MAX_ATTEMPTS)
+        
+        async def attempt() -> Dict:
+            try:
+                return await breaker.call(
+                    lambda admitted: provider.limited_translate(**request, on_admitted=admitted)
+                )
+            except CircuitOpenError as e:
+                if is_last:
+                    raise
+                raise CircuitOpenError(str(e)) from e
+        
+        return await retry_policy.run(attempt, on_retry=on_retry)
+    
+    async def translate(self, on_retry: Callable[[ProviderError, float], None] = None,
+                        hedge: bool = False, **request) -> Tuple[str, Dict]:
+        """
+        Translate with the first available provider; returns (provider name, result).
+        
+        With hedge, a request that runs unusually long is duplicated (see _hedged).
+        """
+        errors = []
+        if hedge:
+            HedgeBudget.earn()
+        
+        for position, name in enumerate(self.provider_names):
+            try:
+                if hedge:
+                    return await self._hedged(position, on_retry, request)
+                return name, await self._attempt(position, on_retry, request)
+            except ProviderError as e:
+                errors.append(str(e))
+                if position < len(self.configs) - 1:
+                    print(f"↪️ {e} - failing over to {self.provider_names[position + 1]}")
+        
+        raise ProviderError("; ".join(errors))
+    
+    async def _hedged(self, position: int, on_retry: Callable[[ProviderError, float], None],
+                      request: Dict) -> Tuple[str, Dict]:
+        """
+        Send the request to the provider at position; if it is still running
+        past that provider's HEDGE_PERCENTILE latency and the hedge budget
+        allows, send a duplicate to the next healthy provider in the chain
+        (or the same provider). The first answer wins, the other is cancelled.
+        """
+        name = self.provider_names[position]
+        primary = asyncio.ensure_future(self._attempt(position, on_retry, request))
+        tasks = {primary: name}
+        
+        try:
+            delay = LatencyTracker.for_provider(name).hedge_delay()
+            if delay is None:
+                return name, await primary
+            
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or not HedgeBudget.try_spend():
+                return name, await primary
+            
+            hedge_position = self._hedge_position(position)
+            hedge = asyncio.ensure_future(self._attempt(hedge_position, on_retry, request))
+            tasks[hedge] = self.provider_names[hedge_position]
+            self.hedges += 1
+            print(f"🪁 {name} still running after {delay:.1f}s - hedging with {tasks[hedge]}")
+            
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedges_won += 1
+                            HedgeBudget.record_win()
+                        return tasks[task], task.result()
+            
+            # Both failed - the primary's error decides the failover
+            return name, primary.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    def _hedge_position(self, position: int) -> int:
+        """The next provider whose circuit is closed, else the same provider"""
+        for candidate in range(position + 1, len(self.configs)):
+            if CircuitBreaker.for_provider(self.provider_names[candidate]).state == CircuitBreaker.CLOSED:
+                return candidate
+        return position
@@ -0,0 +1,136 @@
+"""
+Rate Limiter - Per-provider request (RPM) and token (TPM) budgets
+"""
+import asyncio
+import time
+from typing import Dict, Optional
+from config import settings
+
+
+class TokenBucket:
+    """Refills continuously up to one minute's budget; may go negative after reconciliation"""
+    
+    def __init__(self, per_minute: float):
+        self.set_rate(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+    
+    def set_rate(self, per_minute: float):
+        self.capacity = per_minute * settings.RATE_LIMIT_HEADROOM
+        self.rate = self.capacity / 60
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount can be taken (requests larger than the bucket wait for a full one)"""
+        self._refill()
+        missing = min(amount, self.capacity) - self.level
+        return max(missing / self.rate, 0.0)
+    
+    def take(self, amount: float):
+        self._refill()
+        self.level -= amount
+    
+    def remaining(self) -> float:
+        """What is left of the current minute's budget"""
+        self._refill()
+        return max(self.level, 0.0)
+    
+    def give_back(self, amount: float):
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+
+class ProviderRateLimiter:
+    """
+    Request and token budgets of one provider, shared by every translation
+    that uses it.
+    
+    Tokens are reserved from an estimate before a request is sent and
+    reconciled with the usage the provider reports afterwards, so the
+    sustained rate stays just under the configured quota.
+    """
+    
+    CONFIG_KEYS = ('rpm', 'tpm')
+    
+    _limiters: Dict[str, "ProviderRateLimiter"] = {}
+    
+    def __init__(self, rpm: float = None, tpm: float = None):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+    
+    @classmethod
+    def validate_config(cls, extra_config: Optional[dict]):
+        for key in cls.CONFIG_KEYS:
+            value = (extra_config or {}).get(key)
+            if value is not None and (not isinstance(value, (int, float)) or isinstance(value, bool) or value <= 0):
+                raise ValueError(f"{key} must be a positive number")
+    
+    @classmethod
+    def for_provider(cls, provider_name: str, extra_config: Optional[dict]) -> Optional["ProviderRateLimiter"]:
+        """The shared limiter of a provider, following its current rpm/tpm settings"""
+        extra_config = extra_config or {}
+        rpm = extra_config.get('rpm')
+        tpm = extra_config.get('tpm')
+        
+        if not rpm and not tpm:
+            cls._limiters.pop(provider_name, None)
+            return None
+        
+        limiter = cls._limiters.get(provider_name)
+        if limiter is None:
+            limiter = cls._limiters[provider_name] = cls(rpm, tpm)
+        else:
+            limiter._update(rpm, tpm)
+        
+        return limiter
+    
+    def _update(self, rpm: Optional[float], tpm: Optional[float]):
+        """Apply changed limits without forgetting what was already spent"""
+        for attribute, limit in (('requests', rpm), ('tokens', tpm)):
+            bucket = getattr(self, attribute)
+            if not limit:
+                setattr(self, attribute, None)
+            elif bucket is None:
+                setattr(self, attribute, TokenBucket(limit))
+            elif bucket.capacity != limit * settings.RATE_LIMIT_HEADROOM:
+                bucket.set_rate(limit)
+    
+    async def acquire(self, estimated_tokens: int) -> int:
+        """Wait until one request and estimated_tokens fit the budget, then reserve them"""
+        # Waiters are served in arrival order, so large requests are not starved
+        async with self._lock:
+            while True:
+                wait = max(
+                    self.paused_until - time.monotonic(),
+                    self.requests.wait_time(1) if self.requests else 0.0,
+                    self.tokens.wait_time(estimated_tokens) if self.tokens else 0.0
+                )
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(estimated_tokens)
+        
+        return estimated_tokens
+    
+    def reconcile(self, reserved_tokens: int, actual_tokens: int):
+        """Correct a reservation with the tokens the provider actually counted"""
+        if not self.tokens:
+            return
+        if actual_tokens > reserved_tokens:
+            self.tokens.take(actual_tokens - reserved_tokens)
+        else:
+            self.tokens.give_back(reserved_tokens - actual_tokens)
+    
+    def pause(self, seconds: float):
+        """Hold every request back for a while, e.g. after a 429 with Retry-After"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
@@ -0,0 +1,51 @@
+"""
+Retry Policy - Retries transient provider failures with jittered exponential backoff
+"""
+import asyncio
+import random
+from typing import Awaitable, Callable, Optional, TypeVar
+from ai_providers import ProviderError
+from config import settings
+
+T = TypeVar('T')
+
+
+class RetryPolicy:
+    """
+    Retries provider requests that failed for transient reasons (timeouts,
+    dropped connections, 429, 5xx). Fatal errors - bad keys, invalid
+    requests, exhausted quota - are raised at once.
+    """
+    
+    def __init__(self, max_attempts: int = None, base_delay: float = None, max_delay: float = None):
+        self.max_attempts = max_attempts or settings.RETRY_MAX_ATTEMPTS
+        self.base_delay = settings.RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = settings.RETRY_MAX_DELAY if max_delay is None else max_delay
+    
+    def delay(self, attempt: int, error: ProviderError) -> float:
+        """Seconds to wait before the next attempt"""
+        if error.retry_after is not None:
+            # The provider said when; a little jitter keeps parallel chunks from returning together
+            return min(error.retry_after, settings.RETRY_AFTER_MAX) + random.uniform(0, self.base_delay)
+        
+        # Full jitter: anywhere up to the exponential backoff ceiling
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+    
+    async def run(self, request: Callable[[], Awaitable[T]],
+                  on_retry: Optional[Callable[[ProviderError, float], None]] = None) -> T:
+        """Await request(), calling it again after retryable failures"""
+        attempt = 1
+        while True:
+            try:
+                return await request()
+            except ProviderError as e:
+                if not e.retryable or attempt >= self.max_attempts:
+                    raise
+                
+                delay = self.delay(attempt, e)
+                print(f"🔁 {e} - retry {attempt}/{self.max_attempts - 1} in {delay:.1f}s")
+                if on_retry:
+                    on_retry(e, delay)
+                
+                await asyncio.sleep(delay)
+                attempt += 1
@@ -0,0 +1,206 @@
+"""
+Snapshot Service - Consistent whole-database snapshots via SQLite's online backup API
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+import schedule
+from sqlalchemy.engine import make_url
+from config import settings
+
+try:
+    import zstandard
+except ImportError:  # optional - snapshots are stored uncompressed without it
+    zstandard = None
+
+
+SNAPSHOT_PATTERN = re.compile(r'^snapshot_(\d{8}_\d{6}_\d{6})\.db(\.zst)?$')
+
+
+class SnapshotService:
+    """
+    Full copies of the database file, including API configs, translation
+    cache, costs and revisions that project backups do not cover.
+    
+    The copy is taken with sqlite3's online backup API inside one read
+    transaction; with the database in WAL mode translations keep writing
+    while a snapshot runs, and the snapshot still reflects a single point
+    in time.
+    """
+    
+    COMPRESSIONS = ('none', 'zstd')
+    
+    _lock = threading.Lock()
+    _scheduler: Optional[schedule.Scheduler] = None
+    _thread: Optional[threading.Thread] = None
+    _stop: Optional[threading.Event] = None
+    
+    def __init__(self, snapshot_dir: str = None):
+        self.snapshot_dir = snapshot_dir or settings.SNAPSHOT_DIR
+        if not os.path.exists(self.snapshot_dir):
+            os.makedirs(self.snapshot_dir)
+    
+    @staticmethod
+    def database_path() -> str:
+        """Path of the SQLite database file behind DATABASE_URL"""
+        url = make_url(settings.DATABASE_URL)
+        if url.get_backend_name() != 'sqlite' or not url.database or url.database == ':memory:':
+            raise ValueError("Snapshots are only available for file-based SQLite databases")
+        return url.database
+    
+    def create_snapshot(self, compression: str = None) -> dict:
+        """Copy the live database into snapshots/, optionally zstd-compressed"""
+        compression = compression or settings.SNAPSHOT_COMPRESSION
+        if compression not in self.COMPRESSIONS:
+            raise ValueError(f"Invalid compression. Use: {', '.join(self.COMPRESSIONS)}")
+        if compression == 'zstd' and zstandard is None:
+            raise ValueError("zstd compression requires the zstandard package")
+        
+        database_path = self.database_path()
+        
+        # One snapshot at a time; a second copy would only double the I/O
+        with self._lock:
+            started = time.time()
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+            filename = f"snapshot_{timestamp}.db" + ('.zst' if compression == 'zstd' else '')
+            filepath = os.path.join(self.snapshot_dir, filename)
+            copy_path = os.path.join(self.snapshot_dir, f"snapshot_{timestamp}.db.tmp")
+            
+            source = sqlite3.connect(database_path)
+            target = sqlite3.connect(copy_path)
+            try:
+                # One step = one read transaction, i.e. one consistent view of the
+                # database. Stepwise copies restart whenever another connection
+                # commits in between, so they never finish under load; with WAL the
+                # single step does not block writers either.
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+            
+            if compression == 'zstd':
+                compressed_path = f"{filepath}.tmp"
+                with open(copy_path, 'rb') as src, open(compressed_path, 'wb') as dst:
+                    zstandard.ZstdCompressor(level=3, threads=-1).copy_stream(src, dst)
+                os.remove(copy_path)
+                copy_path = compressed_path
+            
+            # Only complete snapshots ever carry the final name
+            os.replace(copy_path, filepath)
+        
+        snapshot = self._describe(filename)
+        snapshot['duration'] = round(time.time() - started, 3)
+        print(f"📸 Snapshot {filename}: {snapshot['size']} bytes in {snapshot['duration']}s")
+        
+        return snapshot
+    
+    def list_snapshots(self) -> List[dict]:
+        """All complete snapshots, newest first"""
+        names = [name for name in os.listdir(self.snapshot_dir) if SNAPSHOT_PATTERN.match(name)]
+        return [self._describe(name) for name in sorted(names, reverse=True)]
+    
+    def get_snapshot_path(self, name: str) -> str:
+        if not SNAPSHOT_PATTERN.match(name) or not os.path.exists(os.path.join(self.snapshot_dir, name)):
+            raise ValueError("Snapshot not found")
+        return os.path.join(self.snapshot_dir, name)
+    
+    def delete_snapshot(self, name: str):
+        os.remove(self.get_snapshot_path(name))
+    
+    def prune(self, keep_last: int = None, keep_daily: int = None, keep_weekly: int = None) -> List[str]:
+        """
+        Apply the retention schedule: keep the newest keep_last snapshots, plus
+        the newest snapshot of each of the last keep_daily days and keep_weekly
+        ISO weeks. Returns the names of deleted snapshots.
+        """
+        keep_last = settings.SNAPSHOT_KEEP_LAST if keep_last is None else keep_last
+        keep_daily = settings.SNAPSHOT_KEEP_DAILY if keep_daily is None else keep_daily
+        keep_weekly = settings.SNAPSHOT_KEEP_WEEKLY if keep_weekly is None else keep_weekly
+        if min(keep_last, keep_daily, keep_weekly) < 0:
+            raise ValueError("keep_last, keep_daily and keep_weekly must not be negative")
+        
+        snapshots = self.list_snapshots()
+        keep = {snapshot['name'] for snapshot in snapshots[:keep_last]}
+        
+        for period, limit in (('%Y-%m-%d', keep_daily), ('%G-W%V', keep_weekly)):
+            seen = []
+            for snapshot in snapshots:
+                bucket = snapshot['taken_at'].strftime(period)
+                if bucket in seen:
+                    continue
+                if len(seen) >= limit:
+                    break
+                seen.append(bucket)
+                keep.add(snapshot['name'])
+        
+        removed = []
+        for snapshot in snapshots:
+            if snapshot['name'] not in keep:
+                self.delete_snapshot(snapshot['name'])
+                removed.append(snapshot['name'])
+        
+        if removed:
+            print(f"🧹 Snapshot retention: removed {len(removed)} snapshots")
+        
+        return removed
+    
+    def _describe(self, name: str) -> dict:
+        match = SNAPSHOT_PATTERN.match(name)
+        path = os.path.join(self.snapshot_dir, name)
+        
+        return {
+            'name': name,
+            'size': os.path.getsize(path),
+            'compression': 'zstd' if match.group(2) else 'none',
+            'taken_at': datetime.strptime(match.group(1), '%Y%m%d_%H%M%S_%f')
+        }
+    
+    # ============= SCHEDULER =============
+    
+    @classmethod
+    def start_scheduler(cls):
+        """Take a snapshot every SNAPSHOT_INTERVAL_HOURS and apply retention, in a daemon thread"""
+        if cls._thread is not None or settings.SNAPSHOT_INTERVAL_HOURS <= 0:
+            return
+        
+        try:
+            cls.database_path()
+        except ValueError as e:
+            print(f"⚠️ Snapshot scheduler disabled: {e}")
+            return
+        
+        cls._scheduler = schedule.Scheduler()
+        cls._scheduler.every(settings.SNAPSHOT_INTERVAL_HOURS).hours.do(cls._scheduled_snapshot)
+        cls._stop = threading.Event()
+        
+        def run():
+            while not cls._stop.wait(60):
+                cls._scheduler.run_pending()
+        
+        cls._thread = threading.Thread(target=run, daemon=True)
+        cls._thread.start()
+    
+    @classmethod
+    def stop_scheduler(cls):
+        if cls._thread is None:
+            return
+        cls._stop.set()
+        cls._thread.join(timeout=5)
+        cls._thread = None
+        cls._scheduler = None
+    
+    @classmethod
+    def _scheduled_snapshot(cls):
+        try:
+            service = cls()
+            compression = settings.SNAPSHOT_COMPRESSION
+            if compression == 'zstd' and zstandard is None:
+                compression = 'none'
+            service.create_snapshot(compression)
+            service.prune()
+        except Exception as e:
+            print(f"❌ Scheduled snapshot failed: {e}")
@@ -0,0 +1,28 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# A throwaway database, set before config/database are imported
+_tmp = tempfile.mkdtemp(prefix="novel_translator_tests_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmp, 'test.db')}")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A session on the test database, run from an empty directory (backups, exports)"""
+    from database import SessionLocal, APIConfig, init_db
+    
+    monkeypatch.chdir(tmp_path)
+    init_db()
+    session = SessionLocal()
+    yield session
+    
+    # Provider configs are global, unlike projects
+    session.rollback()
+    session.query(APIConfig).delete()
+    session.commit()
+    session.close()
@@ -0,0 +1,84 @@
+import json
+import os
+
+import pytest
+
+from backup_service import BackupService
+from database import Project, Chapter, GlossaryEntry, ProjectBackup
+from snapshot_service import SnapshotService
+
+
+@pytest.fixture
+def project(db):
+    project = Project(name="Backup test")
+    db.add(project)
+    db.commit()
+    return project
+
+
+def add_chapter(db, project, number):
+    db.add(Chapter(project_id=project.id, chapter_number=number, original_text=f"Chapter {number}"))
+    db.commit()
+
+
+def test_dropping_a_manifest_renumbers_its_descendants(db, project):
+    service = BackupService(db)
+    paths = []
+    for number in range(1, 5):
+        add_chapter(db, project, number)
+        paths.append(service.create_incremental_backup(project.id))
+    
+    backup = db.query(ProjectBackup).filter(ProjectBackup.backup_path == paths[1]).one()
+    service.delete_backup(backup.id)
+    
+    depths = []
+    for path in paths[2:]:
+        with open(path, encoding='utf-8') as f:
+            depths.append(json.load(f)['depth'])
+    assert not os.path.exists(paths[1])
+    assert depths == [1, 2]
+    
+    # The folded chain still restores every chapter
+    restored_id = service.restore_backup(paths[3])
+    assert db.query(Chapter).filter(Chapter.project_id == restored_id).count() == 4
+
+
+def test_back_to_back_backups_get_distinct_files(db, project):
+    service = BackupService(db)
+    add_chapter(db, project, 1)
+    
+    paths = [service.create_backup(project.id, backup_type="auto") for _ in range(3)]
+    
+    assert len(set(paths)) == 3
+    assert all(os.path.exists(path) for path in paths)
+
+
+
+def test_glossary_edit_rewrites_only_its_block(db, project, monkeypatch):
+    monkeypatch.setattr(BackupService, 'GLOSSARY_BLOCK_SIZE', 10)
+    service = BackupService(db)
+    db.add_all([GlossaryEntry(project_id=project.id, original_term=f"term {i}", translated_term=f"terim {i}")
+                for i in range(30)])
+    db.commit()
+    
+    def glossary_digests():
+        with open(service.create_incremental_backup(project.id), encoding='utf-8') as f:
+            return json.load(f)['glossary']
+    
+    before = glossary_digests()
+    entries = db.query(GlossaryEntry).filter(GlossaryEntry.project_id == project.id).order_by(GlossaryEntry.id).all()
+    deleted = entries[12]
+    neighbour = next(e for e in entries if e.id != deleted.id and e.id // 10 == deleted.id // 10)
+    db.delete(deleted)
+    neighbour.usage_count += 1
+    db.commit()
+    after = glossary_digests()
+    
+    assert len(before) == len(after)
+    assert sum(old != new for old, new in zip(before, after)) == 1
+
+
+@pytest.mark.parametrize('keep', [{'keep_last': -1}, {'keep_daily': -2}, {'keep_weekly': -1}])
+def test_snapshot_prune_rejects_negative_counts(tmp_path, keep):
+    with pytest.raises(ValueError):
+        SnapshotService(str(tmp_path / 'snapshots')).prune(**keep)
@@ -0,0 +1,107 @@
+import asyncio
+import gc
+
+import pytest
+from sqlalchemy import insert
+
+from adaptive_concurrency import AdaptiveConcurrency
+from ai_providers import AIProvider, AIProviderFactory
+from batch_translation import BatchTranslationService
+from circuit_breaker import CircuitBreaker
+from config import settings
+from database import Project, Chapter, APIConfig
+from hedging import LatencyTracker
+from rate_limiter import ProviderRateLimiter
+
+
+@pytest.fixture(autouse=True)
+def fresh_registries(monkeypatch):
+    monkeypatch.setattr(CircuitBreaker, '_breakers', {})
+    monkeypatch.setattr(ProviderRateLimiter, '_limiters', {})
+
+
+@pytest.fixture
+def project(db):
+    project = Project(name="Sharding test", ai_provider="fast")
+    db.add(project)
+    db.add(APIConfig(provider_name="fast", api_key="key", enabled=True))
+    db.add(APIConfig(provider_name="capped", api_key="key", enabled=True, extra_config={"tpm": 60000}))
+    db.commit()
+    return project
+
+
+def test_lanes_follow_remaining_quota(db, project):
+    service = BatchTranslationService(db)
+    
+    assert service.plan_shards(project.id, ["fast", "capped"], 8) == {"fast": 4, "capped": 4}
+    
+    # Another translation used most of this minute's budget
+    tokens = ProviderRateLimiter.for_provider("capped", {"tpm": 60000}).tokens
+    tokens.take(tokens.remaining() - 4000)
+    
+    assert service.plan_shards(project.id, ["fast", "capped"], 8) == {"fast": 7, "capped": 1}
+
+
+def test_plan_shards_errors(db, project):
+    service = BatchTranslationService(db)
+    
+    with pytest.raises(ValueError, match="At least one provider"):
+        service.plan_shards(project.id, [])
+    
+    CircuitBreaker.for_provider("fast")._open()
+    CircuitBreaker.for_provider("capped")._open()
+    with pytest.raises(ValueError, match="every circuit is open"):
+        service.plan_shards(project.id, ["fast", "capped"])
+
+
+class SteadyProvider(AIProvider):
+    """Always healthy, records how many requests it has in flight"""
+    
+    in_flight = 0
+    peak = 0
+    
+    async def translate(self, text, source_lang, target_lang, glossary=None, context=None, extract_terms=False):
+        SteadyProvider.in_flight += 1
+        SteadyProvider.peak = max(SteadyProvider.peak, SteadyProvider.in_flight)
+        try:
+            await asyncio.sleep(0.03)
+        finally:
+            SteadyProvider.in_flight -= 1
+        return self._with_usage(f"translated {text[:12]}", extract_terms, 10, 10)
+
+
+def test_sharded_batch_follows_a_growing_window(db, monkeypatch):
+    monkeypatch.setattr(AdaptiveConcurrency, '_controllers', {})
+    monkeypatch.setattr(LatencyTracker, '_trackers', {})
+    monkeypatch.setitem(AIProviderFactory.PROVIDERS, 'steady', SteadyProvider)
+    
+    project = Project(name="Window test", ai_provider="steady")
+    db.add(project)
+    db.add(APIConfig(provider_name="steady", api_key="key", enabled=True))
+    db.commit()
+    db.execute(insert(Chapter), [
+        dict(project_id=project.id, chapter_number=number, original_text=f"Chapter {number} text.", status="pending")
+        for number in range(1, 201)
+    ])
+    db.commit()
+    chapter_ids = [chapter_id for chapter_id, in db.query(Chapter.id).filter(Chapter.project_id == project.id)]
+    
+    async def run():
+        service = BatchTranslationService(db)
+        job_id = await service.create_batch_job(project.id, chapter_ids)
+        await service.process_batch_job(job_id, providers=["steady"])
+        return service.get_job_status(job_id)
+    
+    # A full collection of the suite's heap mid-run reads as a latency spike
+    gc.collect()
+    gc.freeze()
+    try:
+        status = asyncio.run(run())
+    finally:
+        gc.unfreeze()
+    window = AdaptiveConcurrency.for_provider("steady")
+    
+    assert status['completed_chapters'] == 200
+    assert window.window > settings.AIMD_INITIAL_WINDOW + 2
+    assert SteadyProvider.peak > settings.AIMD_INITIAL_WINDOW + 2
+    assert window.decreases == 0
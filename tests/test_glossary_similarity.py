@@ -0,0 +1,145 @@
+import random
+import time
+from difflib import SequenceMatcher
+
+import pytest
+
+from glossary_service import TrigramIndex
+
+SYLLABLES = ['ka', 'lo', 'to', 'mi', 'ra', 'an', 'vin', 'thi', 'mor', 'el', 'dra', 'gon', 'sha',
+             'ru', 'ne', 'ix', 'qu', 'zel', 'or', 'ba', 'dor', 'fa', 'ye', 'li', 'sur']
+
+
+def make_terms(count, seed=7):
+    rng = random.Random(seed)
+    terms = set()
+    while len(terms) < count:
+        term = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 5)))
+        if rng.random() < 0.3:
+            term += ' ' + ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3)))
+        terms.add(term)
+    terms = sorted(terms)
+    rng.shuffle(terms)
+    return terms
+
+
+def build_index(terms):
+    index = TrigramIndex()
+    for entry_id, term in enumerate(terms, 1):
+        index.add(entry_id, term, term.upper(), 'general')
+    return index
+
+
+def full_scan(index, key, threshold, limit=5):
+    found = []
+    for entry_id, other in index.keys.items():
+        if other == key:
+            continue
+        similarity = SequenceMatcher(None, key, other).ratio()
+        if similarity >= threshold:
+            found.append((-round(similarity, 2), entry_id))
+    return [(entry_id, -similarity) for similarity, entry_id in sorted(found)[:limit]]
+
+
+def test_most_similar_matches_full_scan():
+    terms = make_terms(5000)
+    index = build_index(terms)
+    rng = random.Random(1)
+    queries = rng.sample(terms, 40) + ['kalotox', 'xyzq', 'a', '', 'dragon sur']
+    
+    for threshold in (0.7, 0.8):
+        for query in queries:
+            assert index.most_similar(query, threshold) == full_scan(index, query, threshold), query
+
+
+def test_most_similar_after_removals():
+    terms = make_terms(2000, seed=3)
+    index = build_index(terms)
+    for entry_id in range(1, 2001, 3):
+        index.remove(entry_id)
+    index.add(5000, 'Kaloto', 'x', 'general')
+    
+    for query in ['kaloto', 'morthiloto', terms[1], terms[4]]:
+        assert index.most_similar(query, 0.7) == full_scan(index, query, 0.7)
+
+
+def test_most_similar_scores_few_candidates(monkeypatch):
+    terms = make_terms(50000)
+    index = build_index(terms)
+    
+    scored = []
+    real_ratio = SequenceMatcher.ratio
+    
+    def counting_ratio(matcher):
+        scored.append(1)
+        return real_ratio(matcher)
+    
+    monkeypatch.setattr(SequenceMatcher, 'ratio', counting_ratio)
+    queries = random.Random(2).sample(terms, 50)
+    
+    started = time.perf_counter()
+    per_query = []
+    for query in queries:
+        scored.clear()
+        index.most_similar(query, 0.7)
+        per_query.append(len(scored))
+    elapsed = (time.perf_counter() - started) / len(queries)
+    
+    # A few dozen of 50k terms are scored, not every term sharing a trigram
+    assert max(per_query) < 200
+    assert sorted(per_query)[len(per_query) // 2] < 50
+    print(f"\n50k terms: {elapsed * 1000:.2f} ms per lookup, "
+          f"median {sorted(per_query)[len(per_query) // 2]} terms scored")
+
+
+def make_variants(count, seed=11):
+    """Syllable terms plus one- and two-character edits of them"""
+    rng = random.Random(seed)
+    letters = 'aeioklmnrtvh'
+    terms = set(make_terms(count // 3, seed))
+    bases = sorted(terms)
+    while len(terms) < count:
+        term = list(rng.choice(bases))
+        for _ in range(rng.randint(1, 2)):
+            position = rng.randrange(len(term))
+            edit = rng.random()
+            if edit < 0.4:
+                term[position] = rng.choice(letters)
+            elif edit < 0.7:
+                term.insert(position, rng.choice(letters))
+            elif len(term) > 2:
+                del term[position]
+        terms.add(''.join(term))
+    return sorted(terms)
+
+
+def all_pairs(index, threshold):
+    pairs = set()
+    ids = sorted(index.keys)
+    for position, entry_id in enumerate(ids):
+        matcher = SequenceMatcher(None, index.keys[entry_id])
+        for other_id in ids[position + 1:]:
+            matcher.set_seq2(index.keys[other_id])
+            if matcher.real_quick_ratio() > threshold and matcher.quick_ratio() > threshold \
+                    and matcher.ratio() > threshold:
+                pairs.add((entry_id, other_id))
+    return pairs
+
+
+@pytest.mark.parametrize('terms', [
+    ['kaloto', 'kaoito'],
+    ['navin', 'anauvin'],
+    ['morthiloto', 'morathito'],
+    ['aaaa', 'aaaaa'],
+])
+def test_similar_pairs_known_pairs(terms):
+    index = build_index(terms)
+    assert {(a, b) for a, b, _ in index.similar_pairs(0.8)} == {(1, 2)}
+
+
+def test_similar_pairs_recall_matches_full_scan():
+    index = build_index(make_variants(900))
+    
+    found = {(a, b) for a, b, _ in index.similar_pairs(0.8)}
+    
+    assert found == all_pairs(index, 0.8)
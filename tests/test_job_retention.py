@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+from export_jobs import ExportJobService
+from glossary_service import GlossaryService
+
+
+def finished(minutes_ago):
+    return {'status': 'completed', 'completed_at': (datetime.utcnow() - timedelta(minutes=minutes_ago)).isoformat()}
+
+
+def test_consistency_jobs_pruned_after_retention():
+    jobs = {
+        'old': finished(120),
+        'recent': finished(5),
+        'running': {'status': 'processing', 'completed_at': None}
+    }
+    
+    GlossaryService._prune_jobs(jobs)
+    
+    assert set(jobs) == {'recent', 'running'}
+
+
+def test_import_jobs_pruned_when_a_new_import_starts(tmp_path, monkeypatch):
+    monkeypatch.setattr(GlossaryService, '_import_jobs', {'old': finished(120), 'recent': finished(5)})
+    monkeypatch.setattr('glossary_service.threading.Thread.start', lambda self: None)
+    
+    job = GlossaryService.start_import_job(1, str(tmp_path / 'terms.csv'), 'terms.csv')
+    
+    assert set(GlossaryService._import_jobs) == {'recent', job['job_id']}
+
+
+def test_export_jobs_pruned_after_retention(monkeypatch):
+    monkeypatch.setattr(ExportJobService, '_jobs', {
+        'old': finished(120),
+        'recent': finished(5),
+        'running': {'status': 'processing', 'completed_at': None}
+    })
+    
+    ExportJobService._prune_jobs()
+    
+    assert set(ExportJobService._jobs) == {'recent', 'running'}
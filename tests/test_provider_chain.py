@@ -0,0 +1,104 @@
+import asyncio
+import time
+
+import pytest
+
+from adaptive_concurrency import AdaptiveConcurrency
+from ai_providers import AIProvider, AIProviderFactory, ProviderError
+from circuit_breaker import CircuitBreaker
+from config import settings
+from database import APIConfig
+from provider_chain import ProviderChain
+
+
+class FlakyProvider(AIProvider):
+    """Answers 503 for its first `failures` calls"""
+    
+    failures = {}
+    calls = {}
+    
+    delay = 0.0
+    
+    async def translate(self, text, source_lang, target_lang, glossary=None, context=None, extract_terms=False):
+        name = self.config['name']
+        FlakyProvider.calls[name] = FlakyProvider.calls.get(name, 0) + 1
+        if FlakyProvider.calls[name] <= FlakyProvider.failures.get(name, 0):
+            raise ProviderError(f"{name}: 503 overloaded", retryable=True, status_code=503)
+        await asyncio.sleep(self.delay)
+        return self._with_usage(f"{name}:{text}", extract_terms, 1, 1)
+
+
+def register(monkeypatch, name, failures):
+    provider_class = type(name, (FlakyProvider,), {'__init__': lambda self, **kw: FlakyProvider.__init__(self, name=name, **kw)})
+    monkeypatch.setitem(AIProviderFactory.PROVIDERS, name, provider_class)
+    monkeypatch.setitem(FlakyProvider.failures, name, failures)
+    monkeypatch.setitem(FlakyProvider.calls, name, 0)
+    return APIConfig(provider_name=name, api_key='key', temperature=0.3, max_tokens=100)
+
+
+@pytest.fixture(autouse=True)
+def fast_breakers(monkeypatch):
+    monkeypatch.setattr(CircuitBreaker, '_breakers', {})
+    monkeypatch.setattr(settings, 'CIRCUIT_OPEN_SECONDS', 0.3)
+    monkeypatch.setattr(settings, 'RETRY_BASE_DELAY', 0.01)
+    monkeypatch.setattr(settings, 'RETRY_MAX_ATTEMPTS', 5)
+
+
+def test_single_provider_waits_out_an_open_circuit(monkeypatch):
+    chain = ProviderChain([register(monkeypatch, 'solo', failures=5)])
+    
+    async def run():
+        # Five 503s exhaust the retries and open the circuit
+        with pytest.raises(ProviderError):
+            await chain.translate(text='one', source_lang='en', target_lang='tr')
+        assert CircuitBreaker.for_provider('solo').is_open
+        
+        # The next chapter backs off until the half-open probe instead of failing at once
+        started = time.monotonic()
+        name, result = await chain.translate(text='two', source_lang='en', target_lang='tr')
+        return name, result, time.monotonic() - started
+    
+    name, result, elapsed = asyncio.run(run())
+    
+    assert (name, result['translation']) == ('solo', 'solo:two')
+    assert elapsed >= 0.2
+    assert CircuitBreaker.for_provider('solo').state == CircuitBreaker.CLOSED
+
+
+def test_open_circuit_fails_over_without_waiting(monkeypatch):
+    chain = ProviderChain([register(monkeypatch, 'primary', failures=100), register(monkeypatch, 'backup', failures=0)])
+    CircuitBreaker.for_provider('primary')._open()
+    
+    async def run():
+        started = time.monotonic()
+        result = await chain.translate(text='one', source_lang='en', target_lang='tr')
+        return result, time.monotonic() - started
+    
+    (name, _), elapsed = asyncio.run(run())
+    
+    assert name == 'backup'
+    assert elapsed < 0.2
+    assert FlakyProvider.calls['primary'] == 0
+
+
+def test_waiting_for_a_concurrency_slot_is_not_a_slow_call(monkeypatch):
+    monkeypatch.setattr(AdaptiveConcurrency, '_controllers', {})
+    monkeypatch.setattr(settings, 'AIMD_INITIAL_WINDOW', 1)
+    monkeypatch.setattr(settings, 'AIMD_MAX_WINDOW', 1.0)
+    monkeypatch.setattr(settings, 'CIRCUIT_SLOW_CALL_SECONDS', 0.1)
+    config = register(monkeypatch, 'queued', failures=0)
+    monkeypatch.setattr(AIProviderFactory.PROVIDERS['queued'], 'delay', 0.03)
+    chain = ProviderChain([config])
+    
+    async def run():
+        # One slot: most requests wait far longer than CIRCUIT_SLOW_CALL_SECONDS for it
+        return await asyncio.gather(*(
+            chain.translate(text=str(number), source_lang='en', target_lang='tr') for number in range(12)
+        ))
+    
+    results = asyncio.run(run())
+    breaker = CircuitBreaker.for_provider('queued')
+    
+    assert len(results) == 12
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert not any(slow for _, slow in breaker.outcomes)
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event
+
+from ai_providers import AIProvider, AIProviderFactory
+from circuit_breaker import CircuitBreaker
+from database import SessionLocal, Project, Chapter, GlossaryEntry, APIConfig
+from translation_engine import TranslationEngine
+
+
+class EchoProvider(AIProvider):
+    async def translate(self, text, source_lang, target_lang, glossary=None, context=None, extract_terms=False):
+        return self._with_usage(f"echo {text}", extract_terms, 5, 5)
+
+
+@pytest.fixture
+def project(db, monkeypatch):
+    monkeypatch.setattr(CircuitBreaker, '_breakers', {})
+    monkeypatch.setitem(AIProviderFactory.PROVIDERS, 'echo', EchoProvider)
+    project = Project(name="Engine test", ai_provider="echo")
+    db.add(project)
+    db.add(APIConfig(provider_name="echo", api_key="key", enabled=True))
+    db.commit()
+    return project
+
+
+def terms(*names):
+    return {'character': [{'original': name, 'translation': name.upper()} for name in names]}
+
+
+def test_term_added_meanwhile_by_another_chapter_is_skipped(db, project):
+    def add_conflicting_term(session):
+        other = SessionLocal()
+        other.add(GlossaryEntry(project_id=project.id, original_term="Aria", translated_term="ARYA"))
+        other.commit()
+        other.close()
+    
+    # The other chapter commits between this one's existence check and its commit
+    event.listen(db, 'before_commit', add_conflicting_term, once=True)
+    
+    added = TranslationEngine(db)._add_terms_to_glossary(project.id, terms("Aria", "Bren"))
+    
+    assert added == 1
+    entries = {e.original_term: e.translated_term for e in db.query(GlossaryEntry).filter_by(project_id=project.id)}
+    assert entries == {"Aria": "ARYA", "Bren": "BREN"}
+
+
+def test_failed_flush_still_marks_the_chapter_as_failed(db, project, monkeypatch):
+    db.add(GlossaryEntry(project_id=project.id, original_term="Aria", translated_term="ARYA"))
+    chapter = Chapter(project_id=project.id, chapter_number=1, original_text="Aria walks.")
+    db.add(chapter)
+    db.commit()
+    
+    engine = TranslationEngine(db)
+    
+    def broken_checkpoint(*args):
+        db.add(GlossaryEntry(project_id=project.id, original_term="Aria", translated_term="?"))
+        db.flush()
+    
+    monkeypatch.setattr(engine, '_save_checkpoint', broken_checkpoint)
+    
+    result = asyncio.run(engine.translate_chapter(chapter.id, extract_terms=False))
+    
+    assert result['success'] is False
+    assert 'UNIQUE' in result['error']
+    check = SessionLocal()
+    assert check.get(Chapter, chapter.id).status == "error"
+    check.close()
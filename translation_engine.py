@@ -1,10 +1,14 @@
 from typing import Dict, List, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from database import Project, Chapter, GlossaryEntry, TranslationCache, APIConfig, CostTracking
-from ai_providers import AIProviderFactory
+from database import Project, Chapter, GlossaryEntry, TranslationCache, CostTracking, ChunkCheckpoint
+from provider_chain import ProviderChain
 from cost_tracking import CostTracker
+from glossary_service import GlossaryService
+import asyncio
 import hashlib
 import re
+import time
 from datetime import datetime
 
 
@@ -56,6 +60,7 @@ class TranslationEngine:
             self.db.add(entry)
         
         self.db.commit()
+        GlossaryService.index_entry(entry)
     
     def _add_terms_to_glossary(self, project_id: int, terms_dict: dict):
         """Add extracted terms to glossary automatically"""
@@ -68,6 +73,8 @@ class TranslationEngine:
         }
         
         added_count = 0
+        added_entries = []
+        seen = set()
         
         for term_type, terms_list in terms_dict.items():
             if not isinstance(terms_list, list):
@@ -80,7 +87,9 @@ class TranslationEngine:
                     original = term['original'].strip()
                     translation = term['translation'].strip()
                     
-                    if original and translation:
+                    if original and translation and original not in seen:
+                        seen.add(original)
+                        
                         # Check if term already exists
                         existing = self.db.query(GlossaryEntry).filter(
                             GlossaryEntry.project_id == project_id,
@@ -97,14 +106,34 @@ class TranslationEngine:
                                 confirmed=False  # Auto-added terms are unconfirmed
                             )
                             self.db.add(entry)
-                            added_count += 1
+                            added_entries.append(entry)
         
-        if added_count > 0:
-            self.db.commit()
-            print(f"✅ Auto-added {added_count} terms to glossary")
+        if added_entries:
+            try:
+                self.db.commit()
+            except IntegrityError:
+                # Another chapter of the project (sharded batch) added some of them meanwhile
+                self.db.rollback()
+                added_entries = [entry for entry in added_entries if self._insert_term(entry)]
+            
+            for entry in added_entries:
+                GlossaryService.index_entry(entry)
+            added_count = len(added_entries)
+            if added_count:
+                print(f"✅ Auto-added {added_count} terms to glossary")
         
         return added_count
     
+    def _insert_term(self, entry: GlossaryEntry) -> bool:
+        """Insert one glossary entry; False if the project already has the term"""
+        self.db.add(entry)
+        try:
+            self.db.commit()
+            return True
+        except IntegrityError:
+            self.db.rollback()
+            return False
+    
     def _check_cache(self, text: str, project_id: int, 
                     source_lang: str, target_lang: str) -> Optional[str]:
         """Check if translation exists in cache"""
@@ -140,6 +169,61 @@ class TranslationEngine:
         self.db.add(cache_entry)
         self.db.commit()
     
+    def _load_checkpoints(self, chapter_id: int, chunks: List[str]) -> Dict[int, ChunkCheckpoint]:
+        """Chunks translated by an interrupted run whose source text is unchanged"""
+        checkpoints = self.db.query(ChunkCheckpoint).filter(
+            ChunkCheckpoint.chapter_id == chapter_id
+        ).all()
+        
+        return {
+            checkpoint.chunk_index: checkpoint
+            for checkpoint in checkpoints
+            if checkpoint.chunk_index < len(chunks)
+            and checkpoint.source_hash == self._get_text_hash(chunks[checkpoint.chunk_index])
+        }
+    
+    def _save_checkpoint(self, chapter_id: int, chunk_index: int, chunk: str,
+                         translated_chunk: str, usage: Optional[Dict], ai_provider: str):
+        """Persist one translated chunk so a re-run resumes after it"""
+        self.db.query(ChunkCheckpoint).filter(
+            ChunkCheckpoint.chapter_id == chapter_id,
+            ChunkCheckpoint.chunk_index == chunk_index
+        ).delete(synchronize_session=False)
+        
+        self.db.add(ChunkCheckpoint(
+            chapter_id=chapter_id,
+            chunk_index=chunk_index,
+            source_hash=self._get_text_hash(chunk),
+            translated_text=translated_chunk,
+            ai_provider=ai_provider,
+            input_tokens=usage['input_tokens'] if usage else None,
+            output_tokens=usage['output_tokens'] if usage else None
+        ))
+        self.db.commit()
+    
+    @staticmethod
+    def _add_usage(usage_by_provider: Dict[str, Dict], provider_name: str, usage: Optional[Dict],
+                   chunk: str, translated_chunk: str):
+        """Add one chunk's usage to its provider's totals (or queue it for local counting)"""
+        totals = usage_by_provider.setdefault(
+            provider_name, {'chunks': 0, 'input_tokens': 0, 'output_tokens': 0, 'uncounted': []}
+        )
+        totals['chunks'] += 1
+        if usage:
+            totals['input_tokens'] += usage['input_tokens']
+            totals['output_tokens'] += usage['output_tokens']
+        else:
+            totals['uncounted'].append((chunk, translated_chunk))
+    
+    def _count_tokens_locally(self, pairs: List[Tuple[str, str]], provider: str,
+                              model: str) -> Tuple[int, int]:
+        """Fallback token count for (source, translation) pairs the provider reported no usage for"""
+        counts = self.cost_tracker.count_tokens_batch(
+            [source for source, _ in pairs] + [translation for _, translation in pairs],
+            provider, model
+        )
+        return sum(counts[:len(pairs)]), sum(counts[len(pairs):])
+    
     def _split_into_chunks(self, text: str, max_chunk_size: int = 3000) -> List[str]:
         """Split text into manageable chunks for translation"""
         # Split by paragraphs first
@@ -161,8 +245,15 @@ class TranslationEngine:
         return chunks
     
     async def translate_chapter(self, chapter_id: int, 
-                               extract_terms: bool = True) -> Dict:
-        """Translate a chapter with memory and consistency"""
+                               extract_terms: bool = True,
+                               hedge: bool = False,
+                               provider: str = None) -> Dict:
+        """
+        Translate a chapter with memory and consistency
+        
+        hedge duplicates unusually slow chunk requests (interactive use; see ProviderChain._hedged)
+        provider overrides the project's provider for this chapter (sharded batches)
+        """
         
         # Get chapter and project
         chapter = self.db.query(Chapter).filter(Chapter.id == chapter_id).first()
@@ -173,19 +264,19 @@ class TranslationEngine:
         if not project:
             raise ValueError("Project not found")
         
-        # Get AI configuration
-        api_config = self.db.query(APIConfig).filter(
-            APIConfig.provider_name == project.ai_provider,
-            APIConfig.enabled == True
-        ).first()
-        
-        if not api_config or not api_config.api_key:
-            raise ValueError(f"AI provider '{project.ai_provider}' not configured or disabled")
+        # The project's provider, then its failover providers
+        chain = ProviderChain.for_project(self.db, project, provider)
         
         # Update chapter status
         chapter.status = "processing"
         self.db.commit()
         
+        translated_chunks = []
+        checkpoints = {}
+        chunk_index = None
+        retries = []
+        usage_by_provider = {}
+        
         try:
             # Get glossary
             glossary = self._get_project_glossary(project.id)
@@ -203,15 +294,6 @@ class TranslationEngine:
                 if context_paragraphs:
                     context = context_paragraphs[-1][:500]  # Last 500 chars
             
-            # Create AI provider
-            provider = AIProviderFactory.create_provider(
-                provider_name=api_config.provider_name,
-                api_key=api_config.api_key,
-                model=api_config.model or project.ai_model,
-                temperature=api_config.temperature,
-                max_tokens=api_config.max_tokens
-            )
-            
             # Check cache first
             cached_translation = self._check_cache(
                 chapter.original_text,
@@ -221,6 +303,7 @@ class TranslationEngine:
             )
             
             chunks = []  # Initialize chunks variable
+            duration = None
             
             if cached_translation:
                 translated_text = cached_translation
@@ -228,27 +311,47 @@ class TranslationEngine:
             else:
                 # Split text into chunks if needed
                 chunks = self._split_into_chunks(chapter.original_text)
-                translated_chunks = []
+                checkpoints = self._load_checkpoints(chapter.id, chunks)
+                started = time.monotonic()
                 
                 for i, chunk in enumerate(chunks):
+                    chunk_index = i
+                    
+                    # Translated before an interruption - resume after it
+                    checkpoint = checkpoints.get(i)
+                    if checkpoint:
+                        translated_chunks.append(checkpoint.translated_text)
+                        usage = None
+                        if checkpoint.input_tokens is not None:
+                            usage = {'input_tokens': checkpoint.input_tokens,
+                                     'output_tokens': checkpoint.output_tokens}
+                        self._add_usage(usage_by_provider, checkpoint.ai_provider or chain.provider_names[0],
+                                        usage, chunk, checkpoint.translated_text)
+                        continue
+                    
                     # Use context only for first chunk
                     chunk_context = context if i == 0 else None
                     
                     # Extract terms from first chunk only to avoid redundancy
                     should_extract = extract_terms and i == 0
                     
-                    result = await provider.translate(
+                    # Transient failures retry (or fail over) this chunk only; earlier chunks are kept
+                    provider_name, result = await chain.translate(
                         text=chunk,
                         source_lang=project.source_language,
                         target_lang=project.target_language,
                         glossary=glossary,
                         context=chunk_context,
-                        extract_terms=should_extract
+                        extract_terms=should_extract,
+                        on_retry=lambda error, delay: retries.append(str(error)),
+                        hedge=hedge
                     )
                     
                     # Handle both dict and string responses
+                    usage = None
                     if isinstance(result, dict):
                         translated_chunks.append(result.get('translation', result.get('text', chunk)))
+                        usage = result.get('usage')
                         
                         # Process extracted terms
                         if should_extract and result.get('terms'):
@@ -256,9 +359,36 @@ class TranslationEngine:
                             self._add_terms_to_glossary(project.id, extracted_terms)
                     else:
                         translated_chunks.append(result)
+                    
+                    # Usage as billed by the provider, prompt/glossary/context overhead included
+                    self._add_usage(usage_by_provider, provider_name, usage, chunk, translated_chunks[-1])
+                    self._save_checkpoint(chapter.id, i, chunk, translated_chunks[-1], usage, provider_name)
+                
+                # Only chunks without reported usage are tokenized locally, off the event loop
+                for provider_name, totals in usage_by_provider.items():
+                    if totals['uncounted']:
+                        counted_input, counted_output = await asyncio.to_thread(
+                            self._count_tokens_locally, totals['uncounted'],
+                            provider_name, chain.model_for(provider_name)
+                        )
+                        totals['input_tokens'] += counted_input
+                        totals['output_tokens'] += counted_output
+                
+                uncounted = sum(len(totals['uncounted']) for totals in usage_by_provider.values())
+                if not uncounted:
+                    usage_source = "provider"
+                elif uncounted == len(chunks):
+                    usage_source = "local"
+                else:
+                    usage_source = "mixed"
                 
                 translated_text = "\n\n".join(translated_chunks)
                 from_cache = False
+                # Provider that translated most of the chapter
+                chapter_provider = max(usage_by_provider, key=lambda name: usage_by_provider[name]['chunks'],
+                                       default=chain.provider_names[0])
+                # Provider time, for throughput-based planning of later batches
+                duration = round(time.monotonic() - started, 3)
                 
                 # Save to cache
                 self._save_to_cache(
@@ -267,7 +397,7 @@ class TranslationEngine:
                     project.id,
                     project.source_language,
                     project.target_language,
-                    api_config.provider_name
+                    chapter_provider
                 )
             
             # Extract and update terms if requested
@@ -279,29 +409,47 @@ class TranslationEngine:
                 # For now, we'll just note them
                 new_terms = potential_names
             
-            # Track costs if not from cache
+            # Track costs if not from cache - one record per provider used
             cost_data = {}
             if not from_cache:
-                input_tokens = self.cost_tracker.count_tokens(chapter.original_text)
-                output_tokens = self.cost_tracker.count_tokens(translated_text)
-                cost_data = self.cost_tracker.estimate_cost(
-                    api_config.provider_name,
-                    api_config.model or project.ai_model or "",
-                    input_tokens,
-                    output_tokens
-                )
+                provider_costs = {}
+                for provider_name, totals in usage_by_provider.items():
+                    provider_costs[provider_name] = self.cost_tracker.estimate_cost(
+                        provider_name,
+                        chain.model_for(provider_name) or "",
+                        totals['input_tokens'],
+                        totals['output_tokens']
+                    )
+                    
+                    # Save cost tracking
+                    cost_record = CostTracking(
+                        project_id=project.id,
+                        chapter_id=chapter.id,
+                        ai_provider=provider_name,
+                        input_tokens=totals['input_tokens'],
+                        output_tokens=totals['output_tokens'],
+                        total_tokens=totals['input_tokens'] + totals['output_tokens'],
+                        estimated_cost=provider_costs[provider_name]['total_cost']
+                    )
+                    self.db.add(cost_record)
                 
-                # Save cost tracking
-                cost_record = CostTracking(
-                    project_id=project.id,
-                    chapter_id=chapter.id,
-                    ai_provider=api_config.provider_name,
-                    input_tokens=input_tokens,
-                    output_tokens=output_tokens,
-                    total_tokens=input_tokens + output_tokens,
-                    estimated_cost=cost_data['total_cost']
-                )
-                self.db.add(cost_record)
+                if len(provider_costs) == 1:
+                    cost_data = next(iter(provider_costs.values()))
+                elif provider_costs:
+                    cost_data = {
+                        key: round(sum(cost[key] for cost in provider_costs.values()), 6)
+                        for key in ('input_cost', 'output_cost', 'total_cost',
+                                    'input_tokens', 'output_tokens', 'total_tokens')
+                    }
+                    cost_data['currency'] = 'USD'
+                    cost_data['by_provider'] = provider_costs
+                if cost_data:
+                    cost_data['usage_source'] = usage_source
+            
+            # Completed - the chunk checkpoints are no longer needed
+            self.db.query(ChunkCheckpoint).filter(
+                ChunkCheckpoint.chapter_id == chapter.id
+            ).delete(synchronize_session=False)
             
             # Update chapter
             chapter.translated_text = translated_text
@@ -310,7 +458,13 @@ class TranslationEngine:
                 "original_length": len(chapter.original_text),
                 "translated_length": len(translated_text),
                 "chunks_processed": len(chunks) if not from_cache else 1,
+                "chunks_resumed": len(checkpoints) if not from_cache else 0,
                 "from_cache": from_cache,
+                "ai_provider": chapter_provider if not from_cache else None,
+                "providers": {name: totals['chunks'] for name, totals in usage_by_provider.items()},
+                "duration": duration,
+                "retries": len(retries),
+                "hedges": {"sent": chain.hedges, "won": chain.hedges_won} if hedge else None,
                 "new_terms_found": len(new_terms),
                 "glossary_size": len(glossary),
                 "translated_at": datetime.utcnow().isoformat(),
@@ -328,9 +482,14 @@ class TranslationEngine:
             }
             
         except Exception as e:
+            # A failed flush leaves the session unusable until rolled back
+            self.db.rollback()
             chapter.status = "error"
             chapter.translation_stats = {
                 "error": str(e),
+                "failed_chunk": chunk_index,
+                "chunks_completed": len(translated_chunks),
+                "retries": len(retries),
                 "timestamp": datetime.utcnow().isoformat()
             }
             self.db.commit()